@@ -1,49 +1,240 @@
 """AI-powered analysis and summarization using OpenAI API."""
 
 import json
-from config import client
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+import openai
+
+import config
+from config import (
+    LLM_REQUESTS_PER_SECOND,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE,
+    LLM_BACKOFF_MAX,
+    SCORING_CHUNK_TOKENS,
+    SCORING_CHUNK_ITEMS,
+    SCORING_WORKERS,
+)
+from ratelimit import TokenBucket
+import llm_cache
+import metrics
+
+MODEL = "gpt-4-turbo"
+
+# Bump these whenever the corresponding prompt template changes so cached
+# responses produced by the old prompt are no longer used.
+RELEVANCE_PROMPT_VERSION = "relevance-v2"
+SUMMARY_PROMPT_VERSION = "summary-v1"
+
+# Shared across threads so the whole process stays under the model rate limit
+_llm_bucket = TokenBucket(LLM_REQUESTS_PER_SECOND)
+
+
+def _is_retryable(error):
+    """Return True for rate-limit, server-side and connection errors."""
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    status = getattr(error, "status_code", None)
+    return status == 429 or (status is not None and status >= 500)
 
-def analyse_with_ai(titles):
-    """Use OpenAI to analyze article relevance for CS students.
+
+def _create_completion(client=None, **kwargs):
+    """Call chat.completions.create with rate limiting and exponential backoff.
 
     Args:
-        titles: List of article titles to analyze
+        client: OpenAI-compatible client (defaults to config.get_client())
+        **kwargs: Arguments passed to chat.completions.create
+
+    Returns:
+        The completion response
+
+    Raises:
+        The last error once retries are exhausted or for non-retryable errors
+    """
+    client = client or config.get_client()
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        _llm_bucket.acquire()
+        started = time.perf_counter()
+        try:
+            response = client.chat.completions.create(**kwargs)
+        except Exception as e:
+            metrics.record("llm", seconds=time.perf_counter() - started, calls=1, errors=1)
+            if attempt == LLM_MAX_RETRIES or not _is_retryable(e):
+                raise
+            metrics.count("llm_retries")
+            delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2**attempt)
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            continue
+        usage = getattr(response, "usage", None)
+        metrics.record(
+            "llm",
+            seconds=time.perf_counter() - started,
+            calls=1,
+            tokens=getattr(usage, "total_tokens", 0) or 0,
+        )
+        return response
+
+
+def estimate_tokens(text):
+    """Roughly estimate the number of model tokens in ``text``."""
+    return len(text) // 4 + 1
+
+
+def chunk_titles(titles_by_id, max_tokens=SCORING_CHUNK_TOKENS, max_items=SCORING_CHUNK_ITEMS):
+    """Split titles into chunks that fit a prompt token budget.
+
+    Args:
+        titles_by_id: Dictionary mapping stable IDs to titles
+        max_tokens: Approximate token budget for the titles in one chunk
+        max_items: Maximum number of titles per chunk
+
+    Returns:
+        List of lists of (id, title) pairs, in input order
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for item_id, title in titles_by_id.items():
+        # Each entry costs its title plus a few tokens of JSON framing
+        cost = estimate_tokens(title) + 8
+        if current and (current_tokens + cost > max_tokens or len(current) >= max_items):
+            chunks.append(current)
+            current = []
+            current_tokens = 0
+        current.append((item_id, title))
+        current_tokens += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _score_chunk(chunk, client=None):
+    """Score one chunk of (id, title) pairs with a single model call.
+
+    Titles are sent with short positional IDs; the model echoes those IDs back
+    so results never depend on it reproducing a title verbatim.
 
     Returns:
-        Dictionary containing parsed JSON response from OpenAI
+        Dictionary mapping the caller's IDs to relevance scores
     """
+    local_ids = {str(i): item_id for i, (item_id, _) in enumerate(chunk, start=1)}
+    payload = json.dumps(
+        [{"id": str(i), "title": title} for i, (_, title) in enumerate(chunk, start=1)],
+        ensure_ascii=False,
+    )
     prompt = (
         "You are an expert in computer science education. "
-        "Given the following list of article titles, for each title: "
-        "Rate its relevance for CS students (programming, AI, systems, security, data science, industry changes) on a scale from 0 to 10. "
+        "Given the following list of articles, for each article: "
+        "Rate the relevance of its title for CS students (programming, AI, systems, security, data science, industry changes) on a scale from 0 to 10. "
         "Return a valid JSON object with a key 'articles' containing an array of objects. "
-        "Each object should have keys: 'title' (string) and 'relevance' (number).\n\n"
-        "Article titles:\n" + str(titles)
+        "Each object should have keys: 'id' (string, copied unchanged from the input) and 'relevance' (number).\n\n"
+        "Articles:\n" + payload
     )
 
+    # Only complete answers are cached: a cached answer that left titles out
+    # would be replayed on every retry and those titles never scored
+    cache_key = llm_cache.make_key(MODEL, RELEVANCE_PROMPT_VERSION, payload)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        scores = _parse_scores(cached, local_ids)
+        if len(scores) == len(local_ids):
+            return scores
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",
+        response = _create_completion(
+            client,
+            model=MODEL,
             messages=[{"role": "user", "content": prompt}],
             response_format={"type": "json_object"},
         )
-
         ai_answer = response.choices[0].message.content
-        if not ai_answer:
-            return {"articles": []}
-        parsed_response = json.loads(ai_answer)
-        return parsed_response
     except Exception as e:
         print(f"Error calling OpenAI API: {e}")
-        return {"articles": []}
+        return {}
+
+    scores = _parse_scores(ai_answer, local_ids)
+    if len(scores) == len(local_ids):
+        llm_cache.put(cache_key, ai_answer)
+    return scores
+
+
+def _parse_scores(ai_answer, local_ids):
+    """Map a scoring answer's positional IDs back to the caller's IDs.
+
+    Returns:
+        Dictionary mapping the caller's IDs to relevance scores; empty if the
+        answer is not valid JSON
+    """
+    try:
+        parsed_response = json.loads(ai_answer or "")
+    except ValueError as e:
+        print(f"Error parsing OpenAI response: {e}")
+        return {}
+
+    articles = parsed_response.get("articles") if isinstance(parsed_response, dict) else None
+    scores = {}
+    for item in articles or []:
+        if not isinstance(item, dict):
+            continue
+        item_id = local_ids.get(str(item.get("id")))
+        relevance = item.get("relevance")
+        if item_id is None or not isinstance(relevance, (int, float)):
+            continue
+        scores[item_id] = float(relevance)
+    return scores
 
 
-def summarise_content(content):
+def score_titles(titles_by_id, client=None, workers=SCORING_WORKERS):
+    """Score every title for CS-student relevance in concurrent chunks.
+
+    Args:
+        titles_by_id: Dictionary mapping stable IDs (e.g. URLs) to titles
+        client: Optional OpenAI-compatible client (defaults to config.get_client())
+        workers: Maximum number of chunks scored concurrently
+
+    Returns:
+        Dictionary mapping IDs to relevance scores; IDs the model did not
+        score are omitted.
+    """
+    chunks = chunk_titles(titles_by_id)
+    if not chunks:
+        return {}
+
+    scores = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as pool:
+        for chunk_scores in pool.map(lambda c: _score_chunk(c, client), chunks):
+            scores.update(chunk_scores)
+    return scores
+
+
+def analyse_with_ai(titles, client=None):
+    """Use OpenAI to analyze article relevance for CS students.
+
+    Args:
+        titles: List of article titles to analyze
+        client: Optional OpenAI-compatible client (defaults to config.get_client())
+
+    Returns:
+        Dictionary with an 'articles' list of {'title', 'relevance'} objects
+    """
+    titles = list(dict.fromkeys(titles))
+    scores = score_titles(dict(enumerate(titles)), client=client)
+    return {
+        "articles": [
+            {"title": titles[i], "relevance": relevance}
+            for i, relevance in sorted(scores.items())
+        ]
+    }
+
+
+def summarise_content(content, client=None):
     """Generate a summary of article content using AI.
 
     Args:
         content: String containing the article text
+        client: Optional OpenAI-compatible client (defaults to config.get_client())
 
     Returns:
         String containing the generated summary
@@ -77,9 +268,15 @@ def summarise_content(content):
         + content
     )
 
+    cache_key = llm_cache.make_key(MODEL, SUMMARY_PROMPT_VERSION, content)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",
+        response = _create_completion(
+            client,
+            model=MODEL,
             messages=[{"role": "user", "content": prompt}],
         )
 
@@ -92,8 +289,9 @@ def summarise_content(content):
                 + summary
             )
             try:
-                retry_response = client.chat.completions.create(
-                    model="gpt-4-turbo",
+                retry_response = _create_completion(
+                    client,
+                    model=MODEL,
                     messages=[{"role": "user", "content": retry_prompt}],
                 )
                 retry_summary = retry_response.choices[0].message.content or summary
@@ -101,6 +299,7 @@ def summarise_content(content):
                     summary = retry_summary
             except Exception:
                 pass
+        llm_cache.put(cache_key, summary)
         return summary
     except Exception as e:
         print(f"Error summarizing content with OpenAI API: {e}")
@@ -0,0 +1,122 @@
+"""Token savings, overhead and fact retention of content_prep.prepare_content.
+
+Usage:
+    python benchmarks/bench_content_prep.py [--articles 200] [--paragraphs 40]
+        [--budget 1200] [--recorded .page_cache]
+
+Articles are synthetic: a lead paragraph full of names and figures, body
+paragraphs, a repeated pull quote and typical page furniture (credits,
+newsletter prompts, related links). With --recorded, real pages from a page
+cache directory are extracted with scraper.extract_article_page instead.
+
+Reports input tokens before and after preparation (the model's input cost
+and prefill time scale with it), p50/p95 preparation time, and fact recall:
+the share of numbers and capitalised names from the first two paragraphs
+that survive, a proxy for the summary keeping its key facts.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fixture_server import VOCABULARY, load_recorded  # noqa: E402
+
+FURNITURE = [
+    "Image Credits: Getty Images",
+    "Sign up for our daily newsletter to get the best stories in your inbox.",
+    "Related: More stories about startups",
+    "Advertisement",
+    "Comments (12)",
+]
+COMPANIES = ["Acme Robotics", "Northwind Labs", "Globex Systems", "Initech", "Umbrella Compute"]
+
+
+def _sentence(rng, words=18):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words)).capitalize() + "."
+
+
+def synthetic_article(n, paragraphs):
+    rng = random.Random(n)
+    company = rng.choice(COMPANIES)
+    lead = (
+        f"{company} said on Tuesday it raised ${rng.randint(5, 500)} million led by "
+        f"Sequoia Capital, valuing the company at ${rng.randint(1, 40)} billion. "
+        f"Chief executive Dana Whitfield said the {rng.randint(120, 900)} engineers "
+        f"will ship the Orion platform in {rng.choice(['March', 'June', 'October'])} 2025."
+    )
+    second = (
+        f"The round follows a {rng.randint(10, 90)}% rise in revenue, according to "
+        f"filings with the Securities and Exchange Commission. " + _sentence(rng)
+    )
+    quote = f'"{_sentence(rng, 12)}" Whitfield said.'
+    body = [" ".join(_sentence(rng) for _ in range(3)) for _ in range(paragraphs)]
+    body.insert(len(body) // 3, quote)
+    body.insert(2 * len(body) // 3, quote)
+    parts = [FURNITURE[0], lead, second] + body
+    for i, furniture in enumerate(FURNITURE[1:], start=1):
+        parts.insert(min(len(parts), i * len(parts) // len(FURNITURE)), furniture)
+    return f"{company} raises new funding", "\n\n".join(parts)
+
+
+def recorded_articles(directory):
+    from scraper import extract_article_page
+
+    for n, body in enumerate(load_recorded(directory)):
+        html = body.decode("utf-8", "replace")
+        page = extract_article_page(html, f"https://example.com/recorded/{n}")
+        if page["content"]:
+            yield None, page["content"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=40, help="body paragraphs per synthetic article")
+    parser.add_argument("--budget", type=int, default=None, help="token budget (default: CONTENT_TOKEN_BUDGET)")
+    parser.add_argument("--recorded", help="page cache directory of real pages to use instead")
+    args = parser.parse_args()
+
+    from config import CONTENT_TOKEN_BUDGET
+    from content_prep import (
+        _FACT, _get_encoding, clean_text, is_boilerplate, prepare_content, split_paragraphs,
+    )
+
+    budget = args.budget or CONTENT_TOKEN_BUDGET
+    if args.recorded:
+        articles = list(recorded_articles(args.recorded))
+    else:
+        articles = [synthetic_article(n, args.paragraphs) for n in range(args.articles)]
+
+    before, after, timings, recalls = [], [], [], []
+    for title, text in articles:
+        started = time.perf_counter()
+        prepared = prepare_content(text, title=title, max_tokens=budget)
+        timings.append(time.perf_counter() - started)
+        before.append(prepared.original_tokens)
+        after.append(prepared.tokens)
+        paragraphs = [p for p in split_paragraphs(clean_text(text)) if not is_boilerplate(p)]
+        lead = " ".join(paragraphs[:2])
+        facts = set(_FACT.findall(lead))
+        if facts:
+            recalls.append(sum(fact in prepared.text for fact in facts) / len(facts))
+
+    timings.sort()
+    print(f"articles:        {len(articles)}  (budget {budget} tokens, "
+          f"{'tiktoken' if _get_encoding() is not None else 'estimated'} counts)")
+    print(f"input tokens:    {statistics.mean(before):.0f} -> {statistics.mean(after):.0f} "
+          f"per article ({1 - sum(after) / sum(before):.0%} fewer)")
+    print(f"prepare time:    p50 {statistics.median(timings) * 1e3:.2f} ms, "
+          f"p95 {timings[int(0.95 * (len(timings) - 1))] * 1e3:.2f} ms")
+    if recalls:
+        print(f"fact recall:     {statistics.mean(recalls):.1%} of lead numbers and names kept")
+
+
+if __name__ == "__main__":
+    main()
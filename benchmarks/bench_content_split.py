@@ -0,0 +1,101 @@
+"""Report size and scan-speed effects of moving article bodies out of articles.
+
+Usage:
+    python benchmarks/bench_content_split.py [--rows 20000] [--db news.db]
+
+Builds a database in the pre-migration-6 layout (content stored inline in
+articles), or copies an existing one with --db, VACUUMs it, measures file
+size and a full-scan query over articles, then applies the remaining
+migrations (which compress bodies into article_content and VACUUM the
+file) and measures again.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+WORDS = (
+    "kernel compiler network latency model training dataset security patch "
+    "cloud startup funding developer open source protocol encryption chip"
+).split()
+
+SCAN_QUERY = (
+    "SELECT category, COUNT(*), AVG(relevance_score) FROM articles "
+    "WHERE relevance_score >= 5 GROUP BY category"
+)
+
+
+def synthetic_body(rng):
+    paragraphs = []
+    for _ in range(rng.randint(8, 20)):
+        paragraphs.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 90))) + ".")
+    return " ".join(paragraphs)
+
+
+def build_legacy(rows):
+    rng = random.Random(42)
+    for version, migrate in database.MIGRATIONS:
+        if version >= 6:
+            break
+        with database.transaction() as conn:
+            migrate(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {version}")
+    with database.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO articles (url, title, relevance_score, category, content) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                (f"https://example.com/{i}", f"Headline {i}", i % 11, rng.choice(WORDS), synthetic_body(rng))
+                for i in range(rows)
+            ),
+        )
+
+
+def measure(path, vacuum=False):
+    conn = sqlite3.connect(path)
+    if vacuum:
+        conn.execute("VACUUM")
+    start = time.perf_counter()
+    for _ in range(5):
+        conn.execute(SCAN_QUERY).fetchall()
+    elapsed = (time.perf_counter() - start) / 5
+    conn.close()
+    return os.path.getsize(path), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--db", help="existing database to copy instead of synthetic data")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NEWS = os.path.join(tmp, "bench.db")
+        if args.db:
+            shutil.copyfile(args.db, database.DB_NEWS)
+        else:
+            build_legacy(args.rows)
+        database.get_pool().close()
+
+        size_before, scan_before = measure(database.DB_NEWS, vacuum=True)
+        database.create_database()
+        database.get_pool().close()
+        size_after, scan_after = measure(database.DB_NEWS)
+
+    print(f"file size: {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB "
+          f"({1 - size_after / size_before:.0%} smaller)")
+    print(f"articles scan: {scan_before * 1e3:.2f} ms -> {scan_after * 1e3:.2f} ms "
+          f"({scan_before / scan_after:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
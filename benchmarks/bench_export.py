@@ -0,0 +1,114 @@
+"""Bulk export throughput and memory against archive size.
+
+Usage:
+    python benchmarks/bench_export.py [--sizes 10000,100000] [--page 50]
+
+For each size, fills a temporary database with published articles (the
+bench_search.py archive) and measures:
+
+- export.export() to a null file as NDJSON, CSV and NDJSON with bodies;
+- streaming GET /api/export through the Flask test client;
+- the old way: paging through /api/articles with offset and a page of
+  --page articles, for the first 5000 rows only (it is quadratic).
+
+Reports rows per second and the peak Python heap during each export
+(tracemalloc, in a second pass so tracing does not skew the timings).
+Flat peaks across sizes mean memory does not grow with the archive.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import database  # noqa: E402
+import export  # noqa: E402
+import server  # noqa: E402
+from bench_search import fill  # noqa: E402
+
+PAGED_ROWS = 5000
+
+
+def measure(run):
+    """Return (seconds, peak heap MB, rows) for a callable returning a row count."""
+    started = time.perf_counter()
+    rows = run()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6, rows
+
+
+def cli_export(fmt, include_content=False):
+    def run():
+        with open(os.devnull, "w", newline="") as output:
+            rows, _, _ = export.export(output, fmt, include_content=include_content)
+        return rows
+
+    return run
+
+
+def http_export(client):
+    def run():
+        response = client.get("/api/export", buffered=False)
+        lines = sum(chunk.count(b"\n") for chunk in response.response)
+        response.close()
+        return lines
+
+    return run
+
+
+def http_paged(client, page):
+    def run():
+        rows = offset = 0
+        while rows < PAGED_ROWS:
+            data = client.get(
+                "/api/articles", query_string={"limit": page, "offset": offset}
+            ).get_json()
+            rows += len(data["articles"])
+            offset = data["next_offset"]
+            if not data["has_more"]:
+                break
+        return rows
+
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--page", type=int, default=50, help="page size for offset paging")
+    args = parser.parse_args()
+
+    print(f"{'articles':>9} {'method':<24} {'rows':>8} {'rows/s':>10} {'peak MB':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            database.DB_NEWS = os.path.join(tmp, "bench.db")
+            database.create_database()
+            fill(size)
+            # Every request hits SQLite
+            server.response_cache = server.ResponseCache(0)
+            client = server.app.test_client()
+
+            for method, run in (
+                ("export.py ndjson", cli_export("ndjson")),
+                ("export.py csv", cli_export("csv")),
+                ("export.py ndjson+content", cli_export("ndjson", include_content=True)),
+                ("/api/export ndjson", http_export(client)),
+                (f"/api/articles x{args.page}", http_paged(client, args.page)),
+            ):
+                elapsed, peak, rows = measure(run)
+                print(f"{size:>9} {method:<24} {rows:>8} {rows / elapsed:>10.0f} {peak:>8.2f}")
+            database.get_pool().close()
+
+
+if __name__ == "__main__":
+    main()
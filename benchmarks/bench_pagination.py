@@ -0,0 +1,97 @@
+"""Benchmark offset vs cursor pagination of the feed query.
+
+Usage:
+    python benchmarks/bench_pagination.py [--rows 200000] [--pages 1,100,1000,10000]
+
+Fills a temporary database with synthetic articles, then times fetching
+page N with LIMIT/OFFSET and with a (created_at, id) keyset cursor. Cursor
+pages should cost the same at any depth.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import server  # noqa: E402
+
+PAGE_SIZE = 5
+REPEAT = 20
+
+
+def fill(rows):
+    data = (
+        (
+            f"https://example.com/{i}",
+            f"Headline {i}",
+            5 + i % 6,
+            "Summary sentence. Another one.",
+            f"2025-{1 + i % 12:02d}-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:{(i // 60) % 60:02d}",
+        )
+        for i in range(rows)
+    )
+    with database.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO articles (url, title, relevance_score, summary, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            data,
+        )
+        database.refresh_feed(conn, range(1, rows + 1))
+
+
+def timed(func):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = func()
+    return (time.perf_counter() - start) / REPEAT, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--pages", default="1,100,1000,10000")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NEWS = os.path.join(tmp, "bench.db")
+        database.create_database()
+        fill(args.rows)
+
+        # Record the cursor at the start of every requested page by walking
+        # the feed once with the keyset query
+        pages = sorted(int(p) for p in args.pages.split(","))
+        cursors = {}
+        after = None
+        for page in range(1, pages[-1] + 1):
+            if page in pages:
+                cursors[page] = after
+            rows = server.fetch_articles_from_db(limit=PAGE_SIZE, after=after)
+            if not rows:
+                break
+            after = (rows[-1][4], rows[-1][0])
+
+        print(f"{'page':>8} {'offset (ms)':>12} {'cursor (ms)':>12}")
+        for page in pages:
+            if page not in cursors:
+                break
+            offset_time, offset_rows = timed(
+                lambda: server.fetch_articles_from_db(
+                    limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE
+                )
+            )
+            cursor_time, cursor_rows = timed(
+                lambda: server.fetch_articles_from_db(
+                    limit=PAGE_SIZE, after=cursors[page]
+                )
+            )
+            assert offset_rows == cursor_rows
+            print(f"{page:>8} {offset_time * 1e3:>12.3f} {cursor_time * 1e3:>12.3f}")
+        database.get_pool().close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Compare full and selective article-page parsing on a saved corpus.
+
+Usage:
+    python benchmarks/bench_parsing.py [--corpus tests/fixtures/pages] [--repeat 3]
+        [--stop-marker "</article>"]
+
+The corpus is a page cache directory (see page_cache.py): every
+``<hash>.body`` file with a ``<hash>.json`` sidecar naming its URL. The
+default is the small set of TechCrunch and Wired sample pages in
+tests/fixtures/pages; pass --corpus .page_cache to use pages recorded by
+real runs.
+
+Each page is extracted with selective parsing off and on. The script fails
+if the outputs differ from each other, from the original one-fetch-per-field
+scraper code (baseline_extract), or from the output for the page cut short
+at its source's stop_marker (or, for sources without one, at --stop-marker,
+default config.ARTICLE_END_MARKER). Run it on a recorded corpus before
+setting a stop_marker on a source. It reports mean parse time and peak
+traced memory per page.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from urllib.parse import urljoin, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from config import (  # noqa: E402
+    ARTICLE_END_MARKER,
+    TECHCRUNCH_CLASS_PARAGRAPH,
+    TECHCRUNCH_CLASS_CATEGORY,
+    TECHCRUNCH_CLASS_IMAGE,
+    WIRED_PARAGRAPH_CLASS,
+    WIRED_CATEGORY_CLASS,
+    WIRED_IMAGE,
+)
+from scraper import extract_article_page  # noqa: E402
+from sources import source_for_url  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(ROOT, "tests", "fixtures", "pages")
+
+
+def baseline_extract(html, url):
+    """Extract a page the way the original fetch_article_content,
+    fetch_article_category and fetch_article_image did, one parse each.
+
+    Returns:
+        Dictionary with 'paragraphs' (list of texts), 'category',
+        'image_url' and 'image_alt'
+    """
+    domain = urlparse(url).netloc
+
+    soup = BeautifulSoup(html, "html.parser")
+    if "techcrunch.com" in domain:
+        paragraphs = soup.find_all("p", class_=TECHCRUNCH_CLASS_PARAGRAPH)
+    elif "wired.com" in domain:
+        paragraphs = soup.find_all("p", class_=WIRED_PARAGRAPH_CLASS)
+    else:
+        paragraphs = []
+    if not paragraphs:
+        paragraphs = soup.select("article p") or soup.find_all("p")
+    texts = [p.get_text(strip=True) for p in paragraphs]
+
+    soup = BeautifulSoup(html, "html.parser")
+    category_el = None
+    if "techcrunch.com" in domain:
+        category_el = soup.find("a", class_=TECHCRUNCH_CLASS_CATEGORY)
+    elif "wired.com" in domain:
+        category_el = soup.find("a", class_=WIRED_CATEGORY_CLASS)
+    if category_el is None:
+        category_el = soup.select_one(
+            "a[rel='category tag'], a[href*='/category/'], a[href*='/tag/']"
+        )
+    category = category_el.get_text(strip=True) if category_el else None
+
+    soup = BeautifulSoup(html, "html.parser")
+    image = None
+    if "techcrunch.com" in domain:
+        image = soup.find("img", class_=TECHCRUNCH_CLASS_IMAGE)
+    elif "wired.com" in domain:
+        image = soup.find("img", class_=WIRED_IMAGE)
+    if image is None:
+        image = soup.select_one("article img")
+    image_url = image_alt = None
+    if image:
+        src = str(image.get("src") or image.get("data-src") or "")
+        if src.startswith("//"):
+            src = "https:" + src
+        elif src.startswith("/"):
+            src = urljoin(url, src)
+        image_url, image_alt = src, image.get("alt")
+
+    return {
+        "paragraphs": texts,
+        "category": category,
+        "image_url": image_url,
+        "image_alt": image_alt,
+    }
+
+
+def baseline_differences(html, url, result):
+    """Names of the fields where ``result`` disagrees with baseline_extract.
+
+    Paragraphs are compared without whitespace: the current extractor puts
+    a space between inline elements and drops empty paragraphs.
+    """
+    baseline = baseline_extract(html, url)
+
+    def squash(texts):
+        return [text for text in ("".join(t.split()) for t in texts) if text]
+
+    differences = []
+    if squash(baseline["paragraphs"]) != squash(result["content"].split("\n\n")):
+        differences.append("content")
+    for field in ("category", "image_url", "image_alt"):
+        if baseline[field] != result[field]:
+            differences.append(field)
+    return differences
+
+
+def truncate(html, url, marker=None):
+    """The page as fetched with its source's stop_marker (else ``marker``).
+
+    Returns None if there is no marker or the page does not contain it.
+    """
+    source = source_for_url(url)
+    marker = (source.stop_marker if source is not None else None) or marker
+    if not marker or marker not in html:
+        return None
+    return html[: html.index(marker) + len(marker)]
+
+
+def load_corpus(directory):
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            meta = json.load(f)
+        if "html" not in (meta.get("headers", {}).get("Content-Type") or "text/html"):
+            continue
+        with open(os.path.join(directory, name[: -len(".json")] + ".body"), "rb") as f:
+            body = f.read()
+        pages.append((meta["url"], body.decode(meta.get("encoding") or "utf-8", "replace")))
+    return pages
+
+
+def run(pages, selective, repeat):
+    results = []
+    elapsed = 0.0
+    peak = 0
+    for url, html in pages:
+        tracemalloc.start()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = extract_article_page(html, url, selective=selective)
+        elapsed += (time.perf_counter() - start) / repeat
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        results.append(result)
+    return results, elapsed / len(pages), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--stop-marker",
+        default=ARTICLE_END_MARKER,
+        help="marker checked for sources without a stop_marker",
+    )
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.corpus):
+        sys.exit(f"No page cache directory at {args.corpus}")
+    pages = load_corpus(args.corpus)
+    if not pages:
+        sys.exit(f"No cached pages found in {args.corpus}")
+
+    full, full_time, full_peak = run(pages, False, args.repeat)
+    selective, sel_time, sel_peak = run(pages, True, args.repeat)
+
+    mismatches = []
+    for (url, html), a, b in zip(pages, full, selective):
+        if a != b:
+            mismatches.append((url, "selective"))
+        for field in baseline_differences(html, url, a):
+            mismatches.append((url, f"baseline {field}"))
+        truncated = truncate(html, url, args.stop_marker)
+        if truncated is not None and extract_article_page(truncated, url) != a:
+            mismatches.append((url, "stop_marker"))
+    print(f"pages: {len(pages)}, mismatches: {len(mismatches)}")
+    for url, check in mismatches:
+        print(f"  differs ({check}): {url}")
+    print(f"{'mode':>10} {'ms/page':>10} {'peak MB':>10}")
+    print(f"{'full':>10} {full_time * 1e3:>10.2f} {full_peak / 1e6:>10.2f}")
+    print(f"{'selective':>10} {sel_time * 1e3:>10.2f} {sel_peak / 1e6:>10.2f}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""End-to-end pipeline and web benchmark against local stand-ins.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 10,1000,100000]
+        [--latency 0.0] [--llm-latency 0.0] [--workers 16] [--json results.json]
+
+For each archive size a fresh subprocess (so peak RSS is per size):
+
+1. starts fixture_server.FixtureServer with that many articles and points the
+   source registry and the shared fetcher at it (no politeness limits);
+2. installs fake_openai.FakeOpenAI with config.set_client() and disables the
+   LLM cache and model rate limit;
+3. times main.main() end to end, then clears the summaries and times
+   process_relevant_articles() on its own;
+4. times the Flask endpoints (/, /api/articles cursor pages, /api/search,
+   /img/<id> thumbnails) with the response cache disabled.
+
+Reports throughput (articles/sec), p50/p95 latency (per summarised article
+and per request) and peak RSS. Nothing touches the network, so the numbers
+can be tracked in CI.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+REQUESTS_PER_ENDPOINT = 50
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def latency_summary(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": round(statistics.median(samples) * 1e3, 3) if samples else 0.0,
+        "p95_ms": round(percentile(samples, 0.95) * 1e3, 3),
+    }
+
+
+def _time_requests(client, paths):
+    samples = []
+    for path in paths:
+        started = time.perf_counter()
+        response = client.get(path)
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, (path, response.status_code)
+    return samples
+
+
+def run_single(size, latency, llm_latency, workers):
+    """Benchmark one archive size in this process and return the results."""
+    workdir = tempfile.mkdtemp(prefix="bench-pipeline-")
+    os.chdir(workdir)
+    import config
+    from fake_openai import FakeOpenAI
+    from fixture_server import FixtureServer
+
+    fake = FakeOpenAI(latency=llm_latency)
+    config.set_client(fake)
+
+    import ai_analyzer
+    import content_processor
+    import database
+    import fetcher
+    import llm_cache
+    import main as pipeline
+    import server
+    import sources
+    from ratelimit import TokenBucket
+    from response_cache import ResponseCache
+
+    database.DB_NEWS = os.path.join(workdir, "news.db")
+    llm_cache.LLM_CACHE_ENABLED = False
+    ai_analyzer._llm_bucket = TokenBucket(0)
+
+    # Per-article latency of the summarise step
+    summarise_samples = []
+    summarise_article = content_processor._summarise_article
+
+    def timed_summarise(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return summarise_article(*args, **kwargs)
+        finally:
+            summarise_samples.append(time.perf_counter() - started)
+
+    content_processor._summarise_article = timed_summarise
+
+    results = {"articles": size}
+    with FixtureServer(size, latency=latency) as site:
+        sources.load_sources([site.source_config()])
+        fetcher.set_fetcher(
+            fetcher.Fetcher(workers=workers, max_per_host=workers, rate_per_host=0)
+        )
+
+        # 1. Whole pipeline: scrape, score, save, summarise
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            pipeline.main()
+        elapsed = time.perf_counter() - started
+        with database.get_connection() as conn:
+            published = conn.execute("SELECT COUNT(*) FROM feed").fetchone()[0]
+            image_ids = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT article_id FROM feed WHERE image_url IS NOT NULL LIMIT ?",
+                    (REQUESTS_PER_ENDPOINT,),
+                )
+            ]
+        results["pipeline"] = {
+            "seconds": round(elapsed, 3),
+            "articles_per_sec": round(size / elapsed, 2),
+            "published": published,
+            "model_calls": fake.calls,
+            "model_tokens": fake.tokens,
+            "summarise": latency_summary(summarise_samples),
+        }
+
+        # 2. Summarisation alone, from stored content
+        with database.transaction() as conn:
+            conn.execute("UPDATE articles SET summary = NULL, duplicate_of = NULL")
+            conn.execute("DELETE FROM fingerprint_bands WHERE kind = 'content'")
+        summarise_samples.clear()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            content_processor.process_relevant_articles(
+                threshold=config.DEFAULT_RELEVANCE_THRESHOLD
+            )
+        elapsed = time.perf_counter() - started
+        results["process_relevant_articles"] = {
+            "seconds": round(elapsed, 3),
+            "articles_per_sec": round(len(summarise_samples) / elapsed, 2) if elapsed else 0.0,
+            "summarise": latency_summary(summarise_samples),
+        }
+
+    # 3. Web endpoints, uncached
+    server.response_cache = ResponseCache(0)
+    client = server.app.test_client()
+    pages = []
+    cursor = None
+    for _ in range(REQUESTS_PER_ENDPOINT):
+        pages.append("/api/articles?limit=5" + (f"&cursor={cursor}" if cursor else ""))
+        cursor = client.get(pages[-1]).get_json()["next_cursor"]
+        if not cursor:
+            cursor = None
+    results["endpoints"] = {
+        "/": latency_summary(_time_requests(client, ["/"] * REQUESTS_PER_ENDPOINT)),
+        "/api/articles": latency_summary(_time_requests(client, pages)),
+        "/api/search": latency_summary(
+            _time_requests(client, ["/api/search?q=kernel"] * REQUESTS_PER_ENDPOINT)
+        ),
+        "/img/<id>": latency_summary(
+            _time_requests(client, [f"/img/{article_id}" for article_id in image_ids])
+        ),
+    }
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results["peak_rss_mb"] = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    database.get_pool().close()
+    os.chdir(BENCH_DIR)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def print_table(all_results):
+    print(
+        f"{'articles':>9} {'pipeline/s':>11} {'summarise/s':>12} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'peak MB':>8}"
+    )
+    for r in all_results:
+        summarise = r["process_relevant_articles"]["summarise"]
+        print(
+            f"{r['articles']:>9} {r['pipeline']['articles_per_sec']:>11.1f} "
+            f"{r['process_relevant_articles']['articles_per_sec']:>12.1f} "
+            f"{summarise['p50_ms']:>8.2f} {summarise['p95_ms']:>8.2f} {r['peak_rss_mb']:>8.1f}"
+        )
+    print(f"\n{'articles':>9} {'endpoint':<14} {'p50 ms':>8} {'p95 ms':>8}")
+    for r in all_results:
+        for endpoint, stats in r["endpoints"].items():
+            print(f"{r['articles']:>9} {endpoint:<14} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,1000,100000")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per fixture HTTP response")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per fake model call")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        result = run_single(args.single, args.latency, args.llm_latency, args.workers)
+        print(json.dumps(result))
+        return
+
+    all_results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        print(f"Running {size} articles...", file=sys.stderr)
+        output = subprocess.run(
+            [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--single",
+                str(size),
+                "--latency",
+                str(args.latency),
+                "--llm-latency",
+                str(args.llm_latency),
+                "--workers",
+                str(args.workers),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        all_results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print_table(all_results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(all_results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
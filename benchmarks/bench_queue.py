@@ -0,0 +1,85 @@
+"""Job queue throughput at different worker counts, offline.
+
+Usage:
+    python benchmarks/bench_queue.py [--articles 400] [--workers 1,2,4,8]
+        [--threads 1] [--latency 0.02] [--llm-latency 0.2]
+
+For each worker count, against a fresh database, the fixture site
+(fixture_server.py) and the fake model client (fake_openai.py), it queues
+one scrape per source with scheduler.schedule_due() and times
+worker.run(processes=N, once=True) until the queue is drained. Reports
+published articles per second and the job counts by status. Worker
+processes are forked, so they inherit the stand-ins.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--articles", type=int, default=400)
+    parser.add_argument("--workers", default="1,2,4,8", help="worker process counts")
+    parser.add_argument("--threads", type=int, default=1, help="worker threads per process")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per fixture HTTP response")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per fake model call")
+    args = parser.parse_args()
+
+    import ai_analyzer
+    import config
+    import database
+    import fetcher
+    import jobs
+    import llm_cache
+    import scheduler
+    import sources
+    import worker
+    from fake_openai import FakeOpenAI
+    from fixture_server import FixtureServer
+    from ratelimit import TokenBucket
+
+    config.set_client(FakeOpenAI(latency=args.llm_latency))
+    llm_cache.LLM_CACHE_ENABLED = False
+    ai_analyzer._llm_bucket = TokenBucket(0)
+
+    print(f"{'workers':>8} {'seconds':>8} {'articles/s':>11} {'published':>10}  jobs")
+    with FixtureServer(args.articles, latency=args.latency) as site:
+        sources.load_sources([site.source_config()])
+        # Every process gets its own, unused copy of this fetcher
+        fetcher.set_fetcher(fetcher.Fetcher(workers=8, max_per_host=64, rate_per_host=0))
+
+        for count in (int(w) for w in args.workers.split(",")):
+            workdir = tempfile.mkdtemp(prefix="bench-queue-")
+            database.DB_NEWS = os.path.join(workdir, "news.db")
+            database.create_database()
+            scheduler.schedule_due()
+
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                worker.run(processes=count, threads=args.threads, once=True)
+            elapsed = time.perf_counter() - started
+
+            with database.get_connection() as conn:
+                published = conn.execute("SELECT COUNT(*) FROM feed").fetchone()[0]
+            statuses = {}
+            for by_status in jobs.stats().values():
+                for status, n in by_status.items():
+                    statuses[status] = statuses.get(status, 0) + n
+            print(
+                f"{count:>8} {elapsed:>8.2f} {published / elapsed:>11.1f} {published:>10}  "
+                + ", ".join(f"{status} {n}" for status, n in sorted(statuses.items()))
+            )
+            database.get_pool().close()
+
+
+if __name__ == "__main__":
+    main()
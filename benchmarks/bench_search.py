@@ -0,0 +1,140 @@
+"""Benchmark /api/search query latency on a synthetic archive.
+
+Usage:
+    python benchmarks/bench_search.py [--rows 500000] [--repeat 50]
+
+Fills a temporary database with published articles (title, summary,
+category and a compressed body) through the normal schema, so the FTS5
+triggers build the index as the pipeline would. Then times ranked,
+highlighted searches for common, rare, multi-word and prefix queries and
+reports p50/p95 latency per query and per result page.
+"""
+
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import server  # noqa: E402
+
+BATCH = 10000
+CATEGORIES = ["AI", "Security", "Startups", "Hardware", "Science", "Policy"]
+TOPICS = ["kubernetes", "rust", "quantum", "ransomware", "compiler", "gpu"]
+QUERIES = [
+    "rust",  # topic word: ~1 in 6 rows
+    "quantum startups",  # two words, title/body and category
+    "rust hardware",  # two common words that never co-occur
+    "compil*",  # prefix
+    "zyxwv",  # rare word: a handful of rows
+]
+
+
+def make_vocabulary(rng, size=5000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return [
+        "".join(rng.choice(letters) for _ in range(rng.randint(3, 9)))
+        for _ in range(size)
+    ]
+
+
+def fill(rows, seed=0):
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng)
+    # Zipf-like word frequencies, as in real prose
+    cum_weights = list(
+        itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary)))
+    )
+
+    def words(count):
+        return " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=count))
+
+    for start in range(0, rows, BATCH):
+        ids = range(start + 1, min(start + BATCH, rows) + 1)
+        contents = []
+        articles = []
+        for i in ids:
+            topic = TOPICS[i % len(TOPICS)]
+            extra = " zyxwv" if i % 100000 == 7 else ""
+            contents.append((i, f"{words(60)} {topic} {words(90)}{extra}"))
+            articles.append(
+                (
+                    i,
+                    f"https://example.com/{i}",
+                    f"{words(3).title()} {topic} {words(4)}",
+                    5 + i % 6,
+                    CATEGORIES[i % len(CATEGORIES)],
+                    f"{topic.title()} [a topic] {words(25)}.",
+                    f"2025-{1 + i % 12:02d}-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:00",
+                )
+            )
+        with database.transaction() as conn:
+            # Bodies first, then the published articles: the articles insert
+            # trigger indexes each row together with its plain-text body
+            conn.executemany(
+                "INSERT INTO article_content (article_id, content, raw_size) VALUES (?, ?, ?)",
+                database._content_rows(contents),
+            )
+            conn.executemany(
+                "INSERT INTO article_search_text (article_id, content) VALUES (?, ?)", contents
+            )
+            conn.executemany(
+                "INSERT INTO articles (id, url, title, relevance_score, category, summary, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                articles,
+            )
+            database.refresh_feed(conn, ids)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NEWS = os.path.join(tmp, "bench.db")
+        database.create_database()
+
+        start = time.perf_counter()
+        fill(args.rows)
+        build = time.perf_counter() - start
+        size_mb = os.path.getsize(database.DB_NEWS) / 1e6
+        print(f"{args.rows} articles indexed in {build:.1f}s ({size_mb:.0f} MB)\n")
+
+        client = server.app.test_client()
+        print(f"{'query':<22} {'offset':>6} {'hits':>5} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+        for text in QUERIES:
+            for offset in (0, 100):
+                samples = []
+                for _ in range(args.repeat):
+                    # Bypass the response cache so every request hits SQLite
+                    server.response_cache = server.ResponseCache(1)
+                    started = time.perf_counter()
+                    response = client.get(
+                        "/api/search", query_string={"q": text, "offset": offset}
+                    )
+                    samples.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.get_data()
+                hits = len(response.get_json()["results"])
+                print(
+                    f"{text:<22} {offset:>6} {hits:>5} "
+                    f"{statistics.median(samples) * 1e3:>9.2f} "
+                    f"{percentile(samples, 0.95) * 1e3:>9.2f}"
+                )
+        database.get_pool().close()
+
+
+if __name__ == "__main__":
+    main()
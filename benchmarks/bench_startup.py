@@ -0,0 +1,137 @@
+"""Cold-start time and memory of the web server and pipeline entry points.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--repo PATH] [--json results.json]
+
+Each target is imported in a fresh ``python -X importtime`` subprocess, as a
+new web worker or cron run would. For every target it reports the median
+wall time of the whole process, the import time reported by -X importtime,
+peak RSS, which heavy third-party packages got loaded and the slowest
+modules it imports directly.
+
+To compare against an older revision, check it out next to this one and
+point --repo at it:
+
+    git worktree add /tmp/before <rev>
+    python benchmarks/bench_startup.py --repo /tmp/before
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What each entry point imports before it can do any work
+TARGETS = {
+    "server": "import server",
+    "main": "import main",
+    "pipeline": "import main, scraper, ai_analyzer, content_processor",
+}
+HEAVY_PACKAGES = ("openai", "requests", "bs4", "flask", "httpx", "pydantic")
+
+_CHILD = """
+import json, resource, sys
+{statement}
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "peak_kb": peak // 1024 if sys.platform == "darwin" else peak,
+    "loaded": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def parse_importtime(stderr):
+    """Return (total microseconds, {module: cumulative microseconds}).
+
+    The dictionary covers the modules imported directly by the top-level
+    ones, i.e. what the entry point itself chose to import.
+    """
+    total = 0
+    direct = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        total += int(self_us)
+        # Nested imports are indented two spaces per level after the "| "
+        if name[1:3] == "  " and not name[3:].startswith(" "):
+            direct[name.strip()] = int(cumulative_us)
+    return total, direct
+
+
+def measure(target, statement, repo, runs):
+    """Import ``statement`` ``runs`` times in fresh interpreters."""
+    env = dict(os.environ, PYTHONPATH=repo)
+    # Older revisions build the OpenAI client at import time and need a key
+    env.setdefault("OPENAI_API_KEY", "startup-benchmark")
+    child = _CHILD.format(statement=statement, heavy=HEAVY_PACKAGES)
+
+    walls, imports, peaks, loaded, slowest = [], [], [], [], {}
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", child],
+            cwd=repo,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        walls.append(time.perf_counter() - started)
+        if proc.returncode:
+            raise RuntimeError(f"{target}: {proc.stderr.strip().splitlines()[-1]}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        total, direct = parse_importtime(proc.stderr)
+        imports.append(total)
+        peaks.append(result["peak_kb"])
+        loaded = result["loaded"]
+        for name, us in direct.items():
+            slowest.setdefault(name, []).append(us)
+
+    top = sorted(
+        ((name, statistics.median(samples)) for name, samples in slowest.items()),
+        key=lambda item: -item[1],
+    )[:5]
+    return {
+        "target": target,
+        "statement": statement,
+        "wall_ms": round(statistics.median(walls) * 1e3, 1),
+        "import_ms": round(statistics.median(imports) / 1e3, 1),
+        "peak_rss_mb": round(statistics.median(peaks) / 1024, 1),
+        "loaded": loaded,
+        "slowest_imports_ms": {name: round(us / 1e3, 1) for name, us in top},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--repo", default=REPO_DIR, help="checkout to measure (default: this one)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    repo = os.path.abspath(args.repo)
+    results = [measure(target, statement, repo, args.runs) for target, statement in TARGETS.items()]
+
+    print(f"{'target':<10} {'wall ms':>8} {'import ms':>10} {'peak MB':>8}  heavy packages loaded")
+    for r in results:
+        print(
+            f"{r['target']:<10} {r['wall_ms']:>8.1f} {r['import_ms']:>10.1f} "
+            f"{r['peak_rss_mb']:>8.1f}  {', '.join(r['loaded']) or '-'}"
+        )
+    print("\nSlowest direct imports (ms):")
+    for r in results:
+        slowest = ", ".join(f"{name} {ms:.0f}" for name, ms in r["slowest_imports_ms"].items())
+        print(f"  {r['target']:<10} {slowest}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark summary updates by primary key as the articles table grows.
+
+Usage:
+    python benchmarks/bench_updates.py [--sizes 1000,10000,100000,1000000]
+
+For each size a fresh database is migrated with create_database(), filled
+with synthetic rows and then updated through write_summary_batch(). The
+per-update cost should stay flat; the legacy title-keyed UPDATE is timed
+alongside for comparison.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+UPDATES = 200
+
+
+def fill(size):
+    rows = (
+        (f"https://example.com/{i}", f"Headline {i}", i % 11, "source")
+        for i in range(size)
+    )
+    with database.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO articles (url, title, relevance_score, source) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+
+
+def time_by_id(size):
+    step = max(1, size // UPDATES)
+    batch = [(article_id, "summary") for article_id in range(1, size + 1, step)]
+    start = time.perf_counter()
+    database.write_summary_batch([], batch)
+    return (time.perf_counter() - start) / len(batch)
+
+
+def time_by_title(size, updates=20):
+    step = max(1, size // updates)
+    titles = [f"Headline {i}" for i in range(0, size, step)]
+    start = time.perf_counter()
+    with database.transaction() as conn:
+        for title in titles:
+            conn.execute("UPDATE articles SET summary = ? WHERE title = ?", ("s", title))
+    return (time.perf_counter() - start) / len(titles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'by id (us)':>12} {'by title (us)':>14}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            database.DB_NEWS = os.path.join(tmp, "bench.db")
+            database.create_database()
+            fill(size)
+            by_id = time_by_id(size)
+            by_title = time_by_title(size)
+            database.get_pool().close()
+        print(f"{size:>10} {by_id * 1e6:>12.1f} {by_title * 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""OpenAI-compatible stand-in for offline benchmarks.
+
+FakeOpenAI implements just ``client.chat.completions.create`` as used by
+ai_analyzer: JSON relevance scores for scoring prompts (anything mentioning
+a yacht, sneakers or a celebrity scores low) and a short bracketed summary
+otherwise. Each call sleeps for a configurable latency and reports token
+usage, so model-bound stages can be timed without network access.
+"""
+
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+LOW_RELEVANCE_WORDS = ("yacht", "sneaker", "celebrity")
+
+
+def _estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+class _Completions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, model=None, messages=None, response_format=None, **kwargs):
+        owner = self._owner
+        if owner.latency:
+            time.sleep(owner.latency)
+        prompt = messages[0]["content"]
+
+        if response_format and response_format.get("type") == "json_object":
+            items = json.loads(prompt.split("Articles:\n", 1)[1])
+            content = json.dumps(
+                {
+                    "articles": [
+                        {
+                            "id": item["id"],
+                            "relevance": 2
+                            if any(w in item["title"].lower() for w in LOW_RELEVANCE_WORDS)
+                            else 8,
+                        }
+                        for item in items
+                    ]
+                }
+            )
+        else:
+            content = (
+                "The article describes a change relevant to engineers "
+                "[people who build software systems]. It explains the impact "
+                "on production systems."
+            )
+
+        prompt_tokens = _estimate_tokens(prompt)
+        completion_tokens = _estimate_tokens(content)
+        with owner._lock:
+            owner.calls += 1
+            owner.tokens += prompt_tokens + completion_tokens
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+
+class FakeOpenAI:
+    """Drop-in replacement for ``openai.OpenAI`` (install with config.set_client).
+
+    Args:
+        latency: Seconds each completion call takes
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self.tokens = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=_Completions(self))
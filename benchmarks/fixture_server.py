@@ -0,0 +1,297 @@
+"""Local stand-in for the news sites, for offline benchmarks.
+
+Usage:
+    python benchmarks/fixture_server.py [--articles 1000] [--latency 0.05] [--port 8765]
+
+Serves, for one fake site:
+
+    /feed.xml          RSS feed listing every article
+    /list.html         front page linking every article (TechCrunch markup)
+    /article/<n>.html  article page with paragraphs, category and image
+    /images/<n>.png    the article's hero image (1200x675 PNG)
+
+Article pages are generated with the markup the TechCrunch entry in
+config.SOURCES expects, or, with --recorded, taken round-robin from a page
+cache directory of real recorded pages (see page_cache.py). Every response
+is delayed by --latency seconds to simulate a remote host.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import struct
+import sys
+import threading
+import time
+import zlib
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (  # noqa: E402
+    TECHCRUNCH_CLASS,
+    TECHCRUNCH_CLASS_PARAGRAPH,
+    TECHCRUNCH_CLASS_CATEGORY,
+    TECHCRUNCH_CLASS_IMAGE,
+)
+
+# One topic word per article; fake_openai scores the lifestyle ones low
+TOPICS = ["kernel", "compiler", "ransomware", "quantum", "yacht", "kubernetes", "sneaker", "database"]
+CATEGORIES = ["AI", "Security", "Startups", "Hardware", "Lifestyle"]
+IMAGE_VARIANTS = 16
+
+# Every article gets its own words so the pipeline's near-duplicate
+# detection treats them as distinct stories
+_vocabulary_rng = random.Random(0)
+VOCABULARY = [
+    "".join(
+        _vocabulary_rng.choice("abcdefghijklmnopqrstuvwxyz")
+        for _ in range(_vocabulary_rng.randint(4, 9))
+    )
+    for _ in range(4000)
+]
+
+
+def _words(rng, count):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(count))
+
+
+def article_title(n):
+    rng = random.Random(n)
+    return f"{_words(rng, 4).capitalize()}: {TOPICS[n % len(TOPICS)]} {_words(rng, 2)}"
+
+
+def article_html(n, paragraphs=8):
+    rng = random.Random(-n - 1)
+    topic = TOPICS[n % len(TOPICS)]
+    body = "\n".join(
+        f'<p class="{TECHCRUNCH_CLASS_PARAGRAPH}">{_words(rng, 20).capitalize()} '
+        f"{topic} {_words(rng, 25)}.</p>"
+        for _ in range(paragraphs)
+    )
+    return f"""<!doctype html>
+<html><head><title>{escape(article_title(n))}</title>
+<script>window.analytics = {{"page": {n}}};</script></head>
+<body>
+<nav><a href="/">Home</a> <a href="/category/ai/">AI</a></nav>
+<article>
+<h1>{escape(article_title(n))}</h1>
+<a class="{TECHCRUNCH_CLASS_CATEGORY}" href="/category/x/">{CATEGORIES[n % len(CATEGORIES)]}</a>
+<img class="{TECHCRUNCH_CLASS_IMAGE}" src="/images/{n}.png" alt="Illustration for article {n}">
+{body}
+</article>
+<footer><p>Related: article {n + 1}, article {n + 2}</p></footer>
+</body></html>"""
+
+
+def image_png(n, width=1200, height=675):
+    """A hero-sized PNG (a gradient in the article's own colour), built without Pillow."""
+    shade = (n * 37) % 256
+    row_pixels = bytes(
+        channel for x in range(width) for channel in (x * 255 // width, shade, 255 - shade)
+    )
+    # Each row is shifted a little so the image does not compress to nothing
+    raw = b"".join(
+        b"\x00" + row_pixels[3 * (y % 64) :] + row_pixels[: 3 * (y % 64)] for y in range(height)
+    )
+
+    def chunk(kind, data):
+        return (
+            struct.pack(">I", len(data)) + kind + data
+            + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+        )
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw, 6)) + chunk(b"IEND", b"")
+    )
+
+
+def load_recorded(directory):
+    """Return the HTML bodies stored in a page cache directory."""
+    bodies = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            meta = json.load(f)
+        if "html" not in (meta.get("headers", {}).get("Content-Type") or "text/html"):
+            continue
+        with open(os.path.join(directory, name[: -len(".json")] + ".body"), "rb") as f:
+            bodies.append(f.read())
+    return bodies
+
+
+class FixtureSite:
+    """The content served by the fixture server."""
+
+    def __init__(self, articles, base_url, recorded=None):
+        self.articles = articles
+        self.base_url = base_url.rstrip("/")
+        self.recorded = recorded or []
+
+    def url(self, n):
+        return f"{self.base_url}/article/{n}.html"
+
+    def feed(self):
+        date = formatdate(usegmt=True)
+        items = "".join(
+            f"<item><title>{escape(article_title(n))}</title>"
+            f"<link>{self.url(n)}</link><pubDate>{date}</pubDate></item>"
+            for n in range(self.articles)
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f"<title>Fixture</title>{items}</channel></rss>"
+        ).encode("utf-8")
+
+    def listing(self):
+        links = "".join(
+            f'<li><a class="{TECHCRUNCH_CLASS}" href="{self.url(n)}">'
+            f"{escape(article_title(n))}</a></li>"
+            for n in range(self.articles)
+        )
+        return f"<html><body><ul>{links}</ul></body></html>".encode("utf-8")
+
+    def article(self, n):
+        if self.recorded:
+            return self.recorded[n % len(self.recorded)]
+        return article_html(n).encode("utf-8")
+
+
+def make_handler(site, latency):
+    cache = {}
+    cache_lock = threading.Lock()
+
+    def cached(key, build):
+        with cache_lock:
+            if key not in cache:
+                cache[key] = build()
+            return cache[key]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            path = self.path.split("?", 1)[0]
+            body, content_type = None, "text/html; charset=utf-8"
+            if path == "/feed.xml":
+                body = cached("feed", site.feed)
+                content_type = "application/rss+xml"
+            elif path in ("/", "/list.html"):
+                body = cached("listing", site.listing)
+            elif path.startswith("/article/") and path.endswith(".html"):
+                try:
+                    n = int(path[len("/article/") : -len(".html")])
+                except ValueError:
+                    n = -1
+                if 0 <= n < site.articles:
+                    body = site.article(n)
+            elif path.startswith("/images/") and path.endswith(".png"):
+                try:
+                    n = int(path[len("/images/") : -len(".png")])
+                except ValueError:
+                    n = -1
+                if 0 <= n < site.articles:
+                    # A few distinct images are enough; building one takes a while
+                    variant = n % IMAGE_VARIANTS
+                    body = cached(("image", variant), lambda: image_png(variant))
+                    content_type = "image/png"
+
+            if body is None:
+                self.send_error(404)
+                return
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Many worker processes connect at once; the default backlog of 5 would
+    # drop connections
+    request_queue_size = 256
+
+
+class FixtureServer:
+    """Run the fixture site on a background thread.
+
+    Use as a context manager; ``base_url`` is set once it is listening.
+    """
+
+    def __init__(self, articles, latency=0.0, port=0, recorded=None):
+        self.articles = articles
+        self.latency = latency
+        self.port = port
+        self.recorded = load_recorded(recorded) if recorded else None
+        self.httpd = None
+        self.base_url = None
+        self.site = None
+
+    def __enter__(self):
+        self.httpd = _Server(("127.0.0.1", self.port), None)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.site = FixtureSite(self.articles, self.base_url, self.recorded)
+        self.httpd.RequestHandlerClass = make_handler(self.site, self.latency)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def source_config(self, name="fixture"):
+        """A config.SOURCES entry pointing the pipeline at this server."""
+        return {
+            "name": name,
+            "listing_url": f"{self.base_url}/list.html",
+            "feed_url": f"{self.base_url}/feed.xml",
+            "domains": ["127.0.0.1"],
+            "link_selector": f"a.{TECHCRUNCH_CLASS}",
+            "paragraph_selector": f"p.{TECHCRUNCH_CLASS_PARAGRAPH}",
+            "category_selector": f"a.{TECHCRUNCH_CLASS_CATEGORY}",
+            "image_selector": f"img.{TECHCRUNCH_CLASS_IMAGE}",
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--articles", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--recorded", help="page cache directory of real pages to serve")
+    args = parser.parse_args()
+
+    with FixtureServer(args.articles, args.latency, args.port, args.recorded) as server:
+        print(f"Serving {args.articles} articles at {server.base_url} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
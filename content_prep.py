@@ -0,0 +1,224 @@
+"""Prepare scraped article text for the summarisation prompt.
+
+prepare_content() cleans the text, drops boilerplate and repeated
+paragraphs, and, when what is left is over the token budget, keeps the most
+informative paragraphs (in their original order) until the budget is full.
+
+Paragraphs are scored extractively:
+- how many of the article's frequent content words they use (centrality);
+- how many of the title's words they share;
+- how many numbers and names they contain (facts).
+Leading paragraphs get a bonus, since news articles front-load the story.
+
+Tokens are counted with tiktoken when it is installed and its encoding is
+available locally; otherwise with the same ~4 characters per token estimate
+as ai_analyzer.
+"""
+
+import html
+import math
+import re
+from collections import Counter, namedtuple
+
+from config import CONTENT_TOKEN_BUDGET, CONTENT_TOKENIZER
+from dedupe import jaccard
+import metrics
+
+PreparedContent = namedtuple(
+    "PreparedContent", "text tokens original_tokens paragraphs_kept paragraphs_total"
+)
+
+# Whole paragraphs that are navigation, promotion or credits. Every
+# alternative must match the entire paragraph, so sentences that merely
+# start with or mention these words ("Comments from regulators...", "Users
+# who sign up for the beta...") are kept.
+_BOILERPLATE = re.compile(
+    r"(advertisement|sponsored( content)?"
+    r"|(read (more|next)|see also|related( articles| stories| reading| coverage)?)(:.*)?"
+    r"|(image|photo(graph)?) credits?:.*|credits?:.*|photo:.*"
+    r"|(\d+ )?comments?( \(\d+\))?|leave a comment|share (this|this article|on \w+)"
+    r"|follow us( on \w+)?|click here( to \w+)?( .*newsletter.*)?"
+    r"|(sign up|subscribe)( now| today| here)?"
+    r"|(get|join|sign up for|subscribe to) (our|the|a free|free|daily|weekly)\b.*newsletter.*"
+    r"|(©|\(c\)|copyright)\s.{0,60}|all rights reserved"
+    r"|we use cookies.*|cookie (policy|settings))[.!]?",
+    re.IGNORECASE,
+)
+_BOILERPLATE_MAX_WORDS = 20
+
+_INVISIBLE = re.compile("[\u200b\u200c\u200d\u2060\ufeff]")
+_SPACES = re.compile(r"[ \t\r\f\v\u00a0]+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'“‘(\[]?[A-Z0-9])")
+_WORD = re.compile(r"\w+")
+_FACT = re.compile(r"\b\d[\d,.]*%?|\b[A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*")
+
+# Text with no paragraph breaks (stored before they were kept) is split
+# into groups of this many sentences
+_SENTENCES_PER_PARAGRAPH = 3
+_NEAR_DUPLICATE_JACCARD = 0.8
+_LEAD_BONUS = (1.5, 1.2)
+
+STOPWORDS = frozenset(
+    """
+    a about after all also an and any are as at be been before being but by can
+    could did do does for from had has have he her his how i if in into is it its
+    just more most new not of on one or other our out over said says she so some
+    than that the their them then there these they this those to up was we were
+    what when where which while who will with would you your
+    """.split()
+)
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding(CONTENT_TOKENIZER)
+        except Exception:
+            # Not installed, or the encoding file cannot be downloaded
+            _encoding = None
+    return _encoding
+
+
+def count_tokens(text):
+    """Count model tokens in ``text`` (estimated when tiktoken is unavailable)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def clean_text(text):
+    """Unescape entities, drop invisible characters and normalise whitespace.
+
+    Paragraph breaks (blank lines) are kept; other line breaks become spaces.
+    """
+    text = _INVISIBLE.sub("", html.unescape(text or ""))
+    paragraphs = (
+        _SPACES.sub(" ", p.replace("\n", " ")).strip() for p in _PARAGRAPH_BREAK.split(text)
+    )
+    return "\n\n".join(p for p in paragraphs if p)
+
+
+def split_paragraphs(text):
+    """Split cleaned text into paragraphs, or sentence groups if it has none."""
+    paragraphs = [p for p in text.split("\n\n") if p]
+    if len(paragraphs) > 1:
+        return paragraphs
+    sentences = _SENTENCE_END.split(text.strip())
+    return [
+        " ".join(sentences[i : i + _SENTENCES_PER_PARAGRAPH])
+        for i in range(0, len(sentences), _SENTENCES_PER_PARAGRAPH)
+        if sentences[i]
+    ]
+
+
+def is_boilerplate(paragraph):
+    """Return True for short standalone promotional, navigation or credit lines."""
+    words = paragraph.split()
+    return len(words) <= _BOILERPLATE_MAX_WORDS and bool(_BOILERPLATE.fullmatch(paragraph))
+
+
+def _content_words(text):
+    return [w for w in _WORD.findall(text.lower()) if len(w) > 2 and w not in STOPWORDS]
+
+
+def dedupe_paragraphs(paragraphs, threshold=_NEAR_DUPLICATE_JACCARD):
+    """Drop paragraphs whose words repeat an earlier paragraph's.
+
+    Catches pull quotes, repeated captions and text duplicated by the page
+    layout. The first occurrence is kept.
+    """
+    kept = []
+    kept_words = []
+    for paragraph in paragraphs:
+        words = set(_content_words(paragraph)) or {paragraph.lower()}
+        if any(jaccard(words, other) >= threshold for other in kept_words):
+            continue
+        kept.append(paragraph)
+        kept_words.append(words)
+    return kept
+
+
+def score_paragraphs(paragraphs, title=None):
+    """Score each paragraph's informativeness (higher is better)."""
+    words_by_paragraph = [_content_words(p) for p in paragraphs]
+    frequency = Counter(w for words in words_by_paragraph for w in set(words))
+    title_words = set(_content_words(title or ""))
+
+    scores = []
+    for index, (paragraph, words) in enumerate(zip(paragraphs, words_by_paragraph)):
+        unique = set(words)
+        if not unique:
+            scores.append(0.0)
+            continue
+        # Words shared with other paragraphs mark the article's main topic
+        centrality = sum(math.log1p(frequency[w] - 1) for w in unique) / math.sqrt(len(unique))
+        overlap = len(unique & title_words) / (len(title_words) or 1)
+        facts = len(_FACT.findall(paragraph)) / math.sqrt(len(words))
+        score = centrality + 2.0 * overlap + 2.0 * facts
+        if index < len(_LEAD_BONUS):
+            score *= _LEAD_BONUS[index]
+        scores.append(score)
+    return scores
+
+
+def _truncate(paragraph, max_tokens):
+    """Keep whole leading sentences of ``paragraph`` within ``max_tokens``."""
+    kept = []
+    for sentence in _SENTENCE_END.split(paragraph):
+        if count_tokens(" ".join(kept + [sentence])) > max_tokens:
+            break
+        kept.append(sentence)
+    # A single over-long sentence is cut at the estimated character limit
+    return " ".join(kept) if kept else paragraph[: max_tokens * 4]
+
+
+@metrics.timed("prepare")
+def prepare_content(text, title=None, max_tokens=CONTENT_TOKEN_BUDGET):
+    """Clean ``text`` and fit it to ``max_tokens`` by extractive selection.
+
+    Args:
+        text: Scraped article body (paragraphs separated by blank lines)
+        title: Optional headline, used to favour on-topic paragraphs
+        max_tokens: Token budget for the returned text (None: no limit)
+
+    Returns:
+        PreparedContent with the text to send, its token count, the token
+        count of the raw input and how many paragraphs were kept
+    """
+    original_tokens = count_tokens(text)
+    paragraphs = [p for p in split_paragraphs(clean_text(text)) if not is_boilerplate(p)]
+    paragraphs = dedupe_paragraphs(paragraphs)
+    total = len(paragraphs)
+
+    prepared = "\n\n".join(paragraphs)
+    tokens = count_tokens(prepared)
+    if max_tokens is None or tokens <= max_tokens:
+        return PreparedContent(prepared, tokens, original_tokens, total, total)
+
+    # Greedily take the best paragraphs that still fit (one token per break)
+    costs = [count_tokens(p) + 1 for p in paragraphs]
+    scores = score_paragraphs(paragraphs, title)
+    chosen = []
+    used = 0
+    for index in sorted(range(total), key=lambda i: -scores[i]):
+        if used + costs[index] <= max_tokens:
+            chosen.append(index)
+            used += costs[index]
+
+    if chosen:
+        prepared = "\n\n".join(paragraphs[i] for i in sorted(chosen))
+    else:
+        # Even the best paragraph is over budget: keep its leading sentences
+        prepared = _truncate(paragraphs[max(range(total), key=lambda i: scores[i])], max_tokens)
+    return PreparedContent(prepared, count_tokens(prepared), original_tokens, len(chosen) or 1, total)
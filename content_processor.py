@@ -1,52 +1,243 @@
 """High-level content processing and workflow orchestration."""
 
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config import (
+    SUMMARY_WORKERS,
+    SUMMARY_WRITE_BATCH,
+    CONTENT_MIN_TOKENS,
+    DEDUPE_ENABLED,
+    CONTENT_DUPLICATE_DISTANCE,
+)
 from database import (
     retrieve_relevant_articles,
-    update_article_summary,
-    update_article_content,
+    get_article_content,
+    write_summary_batch,
+    find_duplicate_content,
 )
-from scraper import fetch_article_content
+from dedupe import BandIndex, hamming, simhash, simhash_bands
+from content_prep import prepare_content
+from scraper import fetch_article_page
+import metrics
 from ai_analyzer import summarise_content
 
 
-def process_relevant_articles(threshold=5.0):
+class _ContentClaims:
+    """Decides, once per story, which article in a run gets summarised.
+
+    A body is a duplicate if it is close to an already published article or
+    to one summarised earlier in this run. The check and the claim happen
+    under one lock so two copies processed concurrently cannot both win: the
+    later copy waits until the claimant settles. If the claimant's summary
+    failed its claim is released and the waiting copy checks again, so
+    copies are never marked as duplicates of an unpublished article.
+    """
+
+    def __init__(self, max_distance=CONTENT_DUPLICATE_DISTANCE):
+        self.max_distance = max_distance
+        self._index = BandIndex()
+        self._lock = threading.Lock()
+        # Claims not settled yet: article_id -> (bands, Event)
+        self._pending = {}
+
+    def claim(self, article_id, content):
+        """Return the id of the article this body duplicates, or None.
+
+        None means the caller now holds the claim for the story and must
+        call settle() once its summary has succeeded or failed.
+        """
+        fingerprint = simhash(content)
+        bands = simhash_bands(fingerprint)
+        while True:
+            with self._lock:
+                original = find_duplicate_content(article_id, fingerprint, self.max_distance)
+                if original is None:
+                    for other_id, other in self._index.candidates(bands).items():
+                        if hamming(fingerprint, other) <= self.max_distance:
+                            original = other_id
+                            break
+                if original is None:
+                    self._index.add(article_id, bands, fingerprint)
+                    self._pending[article_id] = (bands, threading.Event())
+                    return None
+                pending = self._pending.get(original)
+            if pending is None:
+                return original
+            pending[1].wait()
+
+    def settle(self, article_id, published):
+        """Finish a claim; an unpublished article no longer claims its story."""
+        with self._lock:
+            bands, settled = self._pending.pop(article_id)
+            if not published:
+                self._index.remove(article_id, bands)
+        settled.set()
+
+
+@metrics.timed("summarise_article")
+def _summarise_article(article, client=None, claims=None):
+    """Fetch (if needed) and summarise one article.
+
+    Runs on a worker thread; it only reads from the database. The body is
+    cleaned and trimmed to CONTENT_TOKEN_BUDGET (see content_prep.py) before
+    it goes into the prompt; if less than CONTENT_MIN_TOKENS is left (a
+    paywall stub or a failed extraction) the model is not called.
+
+    Returns:
+        (article_id, fetched_content, summary, duplicate_of, token_counts,
+        message) tuple; fetched_content is only set when the content had to
+        be downloaded, duplicate_of when the body near-duplicates another
+        article and token_counts, a (content_tokens, input_tokens) pair, when
+        the model was called.
+    """
+    article_id, title, url, _, source = article
+
+    # Skip if URL is missing or invalid-looking
+    if not url or not isinstance(url, str) or not url.startswith("http"):
+        return article_id, None, None, None, None, "⚠️  Skipping - missing or invalid URL"
+
+    # Use stored content if present (loaded lazily), otherwise fetch and persist
+    existing_content = get_article_content(article_id)
+    content = existing_content or fetch_article_page(url, source)["content"]
+    fetched_content = content if content and not existing_content else None
+
+    if not content:
+        metrics.record("summarise_article", errors=1)
+        return article_id, None, None, None, None, "⚠️  Could not fetch content"
+
+    # The same story syndicated under another URL is not summarised twice
+    if claims is not None:
+        original = claims.claim(article_id, content)
+        if original is not None:
+            message = f"⏭  Near-duplicate of article {original}"
+            return article_id, None, None, original, None, message
+
+    # Generate summary from the cleaned, budgeted text
+    summary = None
+    try:
+        prepared = prepare_content(content, title=title)
+        metrics.record("prepare", tokens=prepared.tokens)
+        token_counts = (prepared.original_tokens, prepared.tokens)
+        if prepared.tokens >= CONTENT_MIN_TOKENS:
+            summary = summarise_content(prepared.text, client=client)
+    finally:
+        if claims is not None:
+            claims.settle(article_id, bool(summary))
+
+    if prepared.tokens < CONTENT_MIN_TOKENS:
+        metrics.record("summarise_article", errors=1)
+        message = f"⚠️  Skipping - only {prepared.tokens} tokens of text after cleaning"
+        return article_id, fetched_content, None, None, token_counts, message
+
+    if not summary:
+        metrics.record("summarise_article", errors=1)
+        message = "⚠️  Could not generate summary"
+        return article_id, fetched_content, None, None, token_counts, message
+
+    message = f"✓ Summary saved: {summary[:80]}..."
+    return article_id, fetched_content, summary, None, token_counts, message
+
+
+def summarise_and_save(article, client=None):
+    """Summarise one article and write the result straight away.
+
+    Used by queue workers, which handle one article per job. Near-duplicates
+    are only detected against articles already published.
+
+    Args:
+        article: (id, title, url, relevance_score, source) tuple
+        client: Optional OpenAI-compatible client (defaults to config.get_client())
+
+    Returns:
+        (done, message) tuple; done is False when the article could not be
+        fetched or summarised and is worth retrying
+    """
+    claims = _ContentClaims() if DEDUPE_ENABLED else None
+    article_id, fetched_content, summary, duplicate_of, token_counts, message = (
+        _summarise_article(article, client, claims)
+    )
+    write_summary_batch(
+        [(article_id, fetched_content)] if fetched_content else [],
+        [(article_id, summary)] if summary else [],
+        [(article_id, duplicate_of)] if duplicate_of is not None else [],
+        [(article_id, *token_counts)] if token_counts else [],
+    )
+    return bool(summary) or duplicate_of is not None, message
+
+
+def process_relevant_articles(
+    threshold=5.0, client=None, workers=SUMMARY_WORKERS, batch_size=SUMMARY_WRITE_BATCH
+):
     """Fetch content, summarize, and save summaries for relevant articles.
 
+    Articles are summarised on a bounded worker pool; model calls are rate
+    limited and retried with backoff in ai_analyzer. Results are written back
+    to the database in batches.
+
     Args:
         threshold: Minimum relevance score to process articles
+        client: Optional OpenAI-compatible client (defaults to config.get_client())
+        workers: Maximum number of articles summarised concurrently
+        batch_size: Number of summaries written per transaction
+
+    Returns:
+        List of ids of the articles summarised (published) in this call
     """
     relevant_articles = retrieve_relevant_articles(threshold)
 
     if not relevant_articles:
         print("No relevant articles without summaries found")
-        return
+        return []
 
     print(f"Processing {len(relevant_articles)} relevant articles...")
 
-    for title, url, relevance, existing_content in relevant_articles:
-        print(f"\nProcessing: {title[:50]}... (Relevance: {relevance})")
-
-        # Skip if URL is missing or invalid-looking
-        if not url or not isinstance(url, str) or not url.startswith("http"):
-            print("  ⚠️  Skipping - missing or invalid URL")
-            continue
-
-        # Use existing content if present, otherwise fetch and persist
-        content = existing_content if existing_content else fetch_article_content(url)
+    pending_summaries = []
+    pending_contents = []
+    pending_duplicates = []
+    pending_tokens = []
+    published = []
+    claims = _ContentClaims() if DEDUPE_ENABLED else None
+    # Copies of a story summarised in this run are written in the same batch
+    # as its summary or later, never before: original id -> (id, original)
+    run_ids = {article[0] for article in relevant_articles}
+    held_duplicates = {}
 
-        if content and not existing_content:
-            update_article_content(title, content)
+    def flush():
+        write_summary_batch(pending_contents, pending_summaries, pending_duplicates, pending_tokens)
+        pending_contents.clear()
+        pending_summaries.clear()
+        pending_duplicates.clear()
+        pending_tokens.clear()
 
-        if not content:
-            print("  ⚠️  Could not fetch content")
-            continue
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(_summarise_article, article, client, claims): article
+            for article in relevant_articles
+        }
+        for future in as_completed(futures):
+            _, title, _, relevance, _ = futures[future]
+            article_id, fetched_content, summary, duplicate_of, token_counts, message = (
+                future.result()
+            )
+            print(f"\nProcessing: {title[:50]}... (Relevance: {relevance})")
+            print(f"  {message}")
 
-        # Generate summary
-        summary = summarise_content(content)
+            if fetched_content:
+                pending_contents.append((article_id, fetched_content))
+            if summary:
+                pending_summaries.append((article_id, summary))
+                published.append(article_id)
+                pending_duplicates.extend(held_duplicates.pop(article_id, ()))
+            if duplicate_of is not None:
+                if duplicate_of in run_ids and duplicate_of not in published:
+                    held_duplicates.setdefault(duplicate_of, []).append((article_id, duplicate_of))
+                else:
+                    pending_duplicates.append((article_id, duplicate_of))
+            if token_counts:
+                pending_tokens.append((article_id, *token_counts))
+            if len(pending_summaries) >= batch_size:
+                flush()
 
-        if summary:
-            # Save summary to database
-            update_article_summary(title, summary)
-            print(f"  ✓ Summary saved: {summary[:80]}...")
-        else:
-            print("  ⚠️  Could not generate summary")
+    flush()
+    return published
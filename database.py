@@ -1,15 +1,158 @@
 """Database operations for storing and retrieving articles."""
 
+import json
+import os
+import queue
 import sqlite3
-from config import DB_NEWS
+import threading
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 
+import metrics
+from text_utils import first_sentence
+from dedupe import (
+    BandIndex,
+    hamming,
+    jaccard,
+    minhash_bands,
+    simhash,
+    simhash_bands,
+    title_numbers,
+    title_shingles,
+)
+from config import (
+    DB_NEWS,
+    DB_POOL_SIZE,
+    DB_BUSY_TIMEOUT_MS,
+    DB_CACHE_SIZE_KB,
+    DB_MMAP_SIZE,
+    DEFAULT_RELEVANCE_THRESHOLD,
+    CONTENT_COMPRESSION_LEVEL,
+    TITLE_DUPLICATE_JACCARD,
+    TITLE_DUPLICATE_WINDOW_HOURS,
+    CONTENT_DUPLICATE_DISTANCE,
+    EXPORT_BATCH_SIZE,
+)
 
-def create_database():
-    """Create the database and articles table if it doesn't exist."""
-    with sqlite3.connect(DB_NEWS) as conn:
-        cur = conn.cursor()
 
-        table_creation_query = """
+class ConnectionPool:
+    """Thread-safe pool of SQLite connections to one database file.
+
+    Every connection is opened in WAL mode with tuned pragmas, so readers
+    (the web server) never block on a writer (the pipeline) and vice versa.
+    Connections are handed to one thread at a time.
+    """
+
+    def __init__(self, db_path, size=DB_POOL_SIZE):
+        self.db_path = db_path
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}")
+        conn.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+        # Needed by the version 8 and 9 migrations and by bulk exports
+        conn.create_function("decompress_text", 1, _sql_decompress_text, deterministic=True)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; any open transaction is rolled back on return."""
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open()
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close all idle connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=None):
+    """Return the connection pool for ``db_path`` (defaults to DB_NEWS)."""
+    db_path = db_path or DB_NEWS
+    with _pools_lock:
+        if db_path not in _pools:
+            _pools[db_path] = ConnectionPool(db_path)
+        return _pools[db_path]
+
+
+def _forget_pools():
+    # A forked worker process must open its own connections, not reuse the
+    # parent's (see worker.py)
+    global _pools_lock
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_pools)
+
+
+@contextmanager
+def get_connection():
+    """Borrow a pooled connection for reads."""
+    with get_pool().connection() as conn:
+        yield conn
+
+
+@contextmanager
+def transaction():
+    """Borrow a pooled connection and run one write transaction on it.
+
+    Commits on success and rolls back if the block raises.
+    """
+    with get_pool().connection() as conn:
+        with conn:
+            yield conn
+
+
+@contextmanager
+def dedicated_connection():
+    """Open a connection outside the pool, closed when the block exits.
+
+    Used for long streaming reads (a bulk export can take minutes; holding
+    one of the pool's connections that long would starve the web server's
+    requests) and for migrations, which change its transaction handling.
+    """
+    conn = get_pool()._open()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def _migrate_baseline(cur):
+    """Version 1: the articles table as it existed before versioned migrations."""
+    cur.execute(
+        """
         CREATE TABLE IF NOT EXISTS articles (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         source TEXT,
@@ -21,121 +164,1191 @@ def create_database():
         content TEXT,
         image_url TEXT,
         image_alt TEXT,
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        fetched_at TEXT
         )"""
+    )
 
-        cur.execute(table_creation_query)
+    # Databases created before migrations existed may lack later columns
+    for column in ("image_url", "image_alt", "fetched_at"):
+        _add_column(cur, "articles", column, "TEXT")
 
-        # Ensure new columns exist if table was previously created without them
-        cur.execute("PRAGMA table_info(articles)")
-        existing_columns = {row[1] for row in cur.fetchall()}
-        if "image_alt" not in existing_columns:
-            cur.execute("ALTER TABLE articles ADD COLUMN image_alt TEXT")
-        if "image_url" not in existing_columns:
-            cur.execute("ALTER TABLE articles ADD COLUMN image_url TEXT")
-        conn.commit()
 
+def _add_column(cur, table, column, definition):
+    """ALTER TABLE ... ADD COLUMN, unless the column already exists.
 
-def save_to_db(parsed_response, articles_data):
-    """Save analyzed articles to the database.
+    Keeps migrations safe to re-run on a database where an earlier attempt
+    added some columns (before migrations ran in a single transaction).
+    """
+    cur.execute(f"PRAGMA table_info({table})")
+    if column not in {row[1] for row in cur.fetchall()}:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _migrate_work_queue_index(cur):
+    """Version 2: partial index over articles still waiting for a summary."""
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_articles_pending_summary
+        ON articles(relevance_score)
+        WHERE summary IS NULL
+        """
+    )
+
+
+def _migrate_feed_order_index(cur):
+    """Version 3: index matching the feed's (created_at, id) keyset order."""
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_articles_created_at
+        ON articles(created_at DESC, id DESC, relevance_score)
+        """
+    )
+
+
+def _migrate_data_version(cur):
+    """Version 4: meta table holding the data-version counter readers watch."""
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+        )"""
+    )
+    cur.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0)")
+
+
+def _migrate_feed_table(cur):
+    """Version 5: read-optimised feed projection of published articles."""
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS feed (
+        article_id INTEGER PRIMARY KEY,
+        title TEXT,
+        url TEXT,
+        summary TEXT,
+        first_sentence TEXT,
+        created_at TEXT,
+        category TEXT,
+        image_url TEXT,
+        image_alt TEXT,
+        relevance_score REAL
+        )"""
+    )
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_feed_created_at
+        ON feed(created_at DESC, article_id DESC, relevance_score)
+        """
+    )
+    cur.execute("SELECT id FROM articles WHERE summary IS NOT NULL")
+    refresh_feed(cur, [row[0] for row in cur.fetchall()])
+
+
+def _migrate_content_table(cur):
+    """Version 6: move article bodies out of articles into compressed blobs.
+
+    Returns True if any bodies were moved, leaving free pages that only a
+    VACUUM gives back.
+    """
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS article_content (
+        article_id INTEGER PRIMARY KEY,
+        content BLOB NOT NULL,
+        raw_size INTEGER NOT NULL
+        )"""
+    )
+    cur.execute(
+        "SELECT id, content FROM articles WHERE content IS NOT NULL AND content <> ''"
+    )
+    moved = [
+        (article_id, compress_text(content), len(content.encode("utf-8")))
+        for article_id, content in cur.fetchall()
+    ]
+    cur.executemany(
+        "INSERT OR REPLACE INTO article_content (article_id, content, raw_size) VALUES (?, ?, ?)",
+        moved,
+    )
+    cur.execute("UPDATE articles SET content = NULL WHERE content IS NOT NULL")
+    return bool(moved)
+
+
+def _migrate_published_at(cur):
+    """Version 7: publish time reported by a source's feed."""
+    _add_column(cur, "articles", "published_at", "TEXT")
+
+
+def _migrate_near_duplicates(cur):
+    """Version 8: LSH band index for near-duplicate titles and bodies.
+
+    Duplicates keep their row (so their URL is not re-scraped) but point at
+    the original through duplicate_of and leave the summary work queue.
+    """
+    _add_column(cur, "articles", "duplicate_of", "INTEGER")
+    _add_column(cur, "articles", "content_simhash", "INTEGER")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS fingerprint_bands (
+        kind TEXT NOT NULL,
+        band INTEGER NOT NULL,
+        value INTEGER NOT NULL,
+        article_id INTEGER NOT NULL,
+        PRIMARY KEY (kind, band, value, article_id)
+        ) WITHOUT ROWID"""
+    )
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_fingerprint_bands_article
+        ON fingerprint_bands(article_id)
+        """
+    )
+    cur.execute("DROP INDEX IF EXISTS idx_articles_pending_summary")
+    cur.execute(
+        """
+        CREATE INDEX idx_articles_pending_summary
+        ON articles(relevance_score)
+        WHERE summary IS NULL AND duplicate_of IS NULL
+        """
+    )
+    cur.execute("SELECT id, title FROM articles")
+    index_titles(cur, cur.fetchall())
+    cur.execute(
+        """
+        SELECT c.article_id, c.content FROM article_content c
+        JOIN articles a ON a.id = c.article_id
+        WHERE a.summary IS NOT NULL
+        """
+    )
+    index_contents(cur, [(i, decompress_text(blob)) for i, blob in cur.fetchall()])
+
+
+def _create_search_sync(cur, body_table, body):
+    """Create the articles_search view and the triggers feeding articles_fts.
 
     Args:
-        parsed_response: Dictionary containing 'articles' key with list of article data
-        articles_data: Dictionary mapping titles to their url and source
+        cur: Cursor inside the migration's transaction
+        body_table: Table holding article bodies, keyed by article_id
+        body: SQL expression template for a body, '{}' standing for the
+            table alias (e.g. 'decompress_text({}.content)')
     """
-    from scraper import (
-        fetch_article_category,
-        fetch_article_content,
-        fetch_article_image,
+    cur.execute(
+        f"""
+        CREATE VIEW IF NOT EXISTS articles_search AS
+        SELECT a.id AS id, a.title AS title, a.summary AS summary,
+               a.category AS category, {body.format("c")} AS content
+        FROM articles AS a
+        LEFT JOIN {body_table} AS c ON c.article_id = a.id
+        WHERE a.summary IS NOT NULL AND a.duplicate_of IS NULL
+        """
     )
+    # 'delete' must be given exactly the values that were indexed
+    indexed_old = f"""
+        INSERT INTO articles_fts (articles_fts, rowid, title, summary, category, content)
+        SELECT 'delete', old.id, old.title, old.summary, old.category,
+               (SELECT {body.format("b")} FROM {body_table} AS b WHERE b.article_id = old.id)
+        WHERE old.summary IS NOT NULL AND old.duplicate_of IS NULL;
+    """
+    index_article = """
+        INSERT INTO articles_fts (rowid, title, summary, category, content)
+        SELECT id, title, summary, category, content FROM articles_search WHERE id = {id};
+    """
+    unindex_article = """
+        INSERT INTO articles_fts (articles_fts, rowid, title, summary, category, content)
+        SELECT 'delete', a.id, a.title, a.summary, a.category, {content}
+        FROM articles AS a
+        WHERE a.id = {id} AND a.summary IS NOT NULL AND a.duplicate_of IS NULL;
+    """
+    # One execute() per trigger: executescript() would commit the migration's
+    # transaction first
+    triggers = [
+        f"""
+        CREATE TRIGGER articles_fts_insert AFTER INSERT ON articles
+        WHEN new.summary IS NOT NULL AND new.duplicate_of IS NULL
+        BEGIN
+        {index_article.format(id="new.id")}
+        END
+        """,
+        f"""
+        CREATE TRIGGER articles_fts_delete AFTER DELETE ON articles
+        BEGIN
+        {indexed_old}
+        END
+        """,
+        f"""
+        CREATE TRIGGER articles_fts_update
+        AFTER UPDATE OF title, summary, category, duplicate_of ON articles
+        WHEN old.title IS NOT new.title
+          OR old.summary IS NOT new.summary
+          OR old.category IS NOT new.category
+          OR old.duplicate_of IS NOT new.duplicate_of
+        BEGIN
+        {indexed_old}
+        {index_article.format(id="new.id")}
+        END
+        """,
+        f"""
+        CREATE TRIGGER {body_table}_fts_insert AFTER INSERT ON {body_table}
+        BEGIN
+        {unindex_article.format(id="new.article_id", content="NULL")}
+        {index_article.format(id="new.article_id")}
+        END
+        """,
+        f"""
+        CREATE TRIGGER {body_table}_fts_update AFTER UPDATE OF content ON {body_table}
+        BEGIN
+        {unindex_article.format(id="old.article_id", content=body.format("old"))}
+        {index_article.format(id="new.article_id")}
+        END
+        """,
+        f"""
+        CREATE TRIGGER {body_table}_fts_delete AFTER DELETE ON {body_table}
+        BEGIN
+        {unindex_article.format(id="old.article_id", content=body.format("old"))}
+        {index_article.format(id="old.article_id")}
+        END
+        """,
+    ]
+    for trigger in triggers:
+        cur.execute(trigger)
 
-    analysis_list = parsed_response.get("articles")
 
-    if not analysis_list:
-        print("No articles to save")
+def _migrate_search_index(cur):
+    """Version 9: FTS5 index over published articles.
+
+    articles_fts is an external-content table reading from the
+    articles_search view, so text is not stored twice; bodies were
+    decompressed on the fly by the decompress_text() SQL function that every
+    pooled connection registers (version 14 replaces this). Triggers keep
+    the index in sync with writes to articles and article_content. Only
+    published, non-duplicate articles are indexed.
+    """
+    cur.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+        title, summary, category, content,
+        content='articles_search',
+        content_rowid='id',
+        tokenize='porter unicode61'
+        )"""
+    )
+    _create_search_sync(cur, "article_content", "decompress_text({}.content)")
+    cur.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+
+
+def _migrate_pipeline_runs(cur):
+    """Version 10: one row of headline metrics per pipeline run."""
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pipeline_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        started_at TEXT NOT NULL,
+        wall_seconds REAL NOT NULL,
+        http_requests INTEGER NOT NULL,
+        http_bytes INTEGER NOT NULL,
+        llm_calls INTEGER NOT NULL,
+        llm_tokens INTEGER NOT NULL,
+        errors INTEGER NOT NULL,
+        report TEXT NOT NULL
+        )"""
+    )
+
+
+def _migrate_jobs(cur):
+    """Version 11: the persistent job queue used by worker.py and scheduler.py.
+
+    Times are Unix timestamps. ``available_at`` is when a queued job may
+    next be claimed, or when a running job's lease expires; one index over
+    it serves both cases. At most one queued or running job exists per key.
+    """
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        key TEXT,
+        payload TEXT NOT NULL,
+        priority INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL,
+        available_at REAL NOT NULL,
+        worker TEXT,
+        last_error TEXT,
+        created_at REAL NOT NULL,
+        finished_at REAL
+        )"""
+    )
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_jobs_claim
+        ON jobs(priority DESC, available_at)
+        WHERE status IN ('queued', 'running')
+        """
+    )
+    cur.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_key
+        ON jobs(key)
+        WHERE status IN ('queued', 'running')
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key_created ON jobs(key, created_at)")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs(finished_at) "
+        "WHERE finished_at IS NOT NULL"
+    )
+
+
+def _migrate_token_counts(cur):
+    """Version 12: model input size per summarised article.
+
+    content_tokens is the stored body's size and input_tokens what was sent
+    after content_prep trimmed it.
+    """
+    _add_column(cur, "articles", "content_tokens", "INTEGER")
+    _add_column(cur, "articles", "input_tokens", "INTEGER")
+
+
+def _migrate_updated_at(cur):
+    """Version 13: when each article row last changed, for incremental export.
+
+    Set on insert, on re-scrape and when a summary or duplicate mark is
+    written; existing rows start at their last fetch (or creation) time.
+    """
+    _add_column(cur, "articles", "updated_at", "TEXT")
+    cur.execute("UPDATE articles SET updated_at = COALESCE(fetched_at, created_at)")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_articles_updated_at ON articles(updated_at, id)"
+    )
+
+
+def _migrate_search_text(cur):
+    """Version 14: plain-text bodies for the search index.
+
+    The version 9 view and triggers decompressed bodies with
+    decompress_text(), which only pooled connections register, so updating
+    or deleting articles from any other SQLite client failed. Published
+    bodies are now copied as plain text into article_search_text (see
+    index_search_text) and the index reads them from there.
+    """
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS article_search_text (
+        article_id INTEGER PRIMARY KEY,
+        content TEXT NOT NULL
+        )"""
+    )
+    for trigger in (
+        "articles_fts_insert",
+        "articles_fts_delete",
+        "articles_fts_update",
+        "article_content_fts_insert",
+        "article_content_fts_update",
+        "article_content_fts_delete",
+    ):
+        cur.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cur.execute("DROP VIEW IF EXISTS articles_search")
+    cur.execute("SELECT id FROM articles WHERE summary IS NOT NULL")
+    index_search_text(cur, [row[0] for row in cur.fetchall()])
+    _create_search_sync(cur, "article_search_text", "{}.content")
+    cur.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+
+
+# Ordered (version, migration) pairs. Append new migrations; never edit or
+# reorder applied ones. PRAGMA user_version records the last applied version.
+MIGRATIONS = [
+    (1, _migrate_baseline),
+    (2, _migrate_work_queue_index),
+    (3, _migrate_feed_order_index),
+    (4, _migrate_data_version),
+    (5, _migrate_feed_table),
+    (6, _migrate_content_table),
+    (7, _migrate_published_at),
+    (8, _migrate_near_duplicates),
+    (9, _migrate_search_index),
+    (10, _migrate_pipeline_runs),
+    (11, _migrate_jobs),
+    (12, _migrate_token_counts),
+    (13, _migrate_updated_at),
+    (14, _migrate_search_text),
+]
+
+def bump_data_version(conn):
+    """Increment the data version inside the caller's write transaction.
+
+    Readers (the web server's response cache) compare this counter to decide
+    whether cached responses are still current.
+    """
+    conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_version'")
+
+
+def compress_text(text):
+    """Compress article text for storage in article_content."""
+    return zlib.compress(text.encode("utf-8"), CONTENT_COMPRESSION_LEVEL)
+
+
+def decompress_text(blob):
+    """Inverse of compress_text."""
+    return zlib.decompress(blob).decode("utf-8")
+
+
+def _sql_decompress_text(blob):
+    return decompress_text(blob) if blob is not None else None
+
+
+def _content_rows(contents):
+    return [
+        (article_id, compress_text(content), len(content.encode("utf-8")))
+        for article_id, content in contents
+        if content
+    ]
+
+
+def refresh_feed(conn, article_ids):
+    """Re-materialise feed rows for the given articles.
+
+    Only published articles (those with a summary) appear in the feed; the
+    first sentence is computed here once instead of on every request.
+
+    Args:
+        conn: Connection or cursor inside the caller's write transaction
+        article_ids: Iterable of article primary keys
+    """
+    ids = json.dumps(list(article_ids))
+    rows = conn.execute(
+        """
+        SELECT id, title, url, summary, created_at, category, image_url,
+               image_alt, relevance_score
+        FROM articles
+        WHERE id IN (SELECT value FROM json_each(?))
+          AND summary IS NOT NULL
+        """,
+        (ids,),
+    ).fetchall()
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO feed (article_id, title, url, summary, first_sentence,
+            created_at, category, image_url, image_alt, relevance_score)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [row[:4] + (first_sentence(row[3]),) + row[4:] for row in rows],
+    )
+
+
+def _replace_bands(conn, kind, bands_by_id):
+    conn.executemany(
+        "DELETE FROM fingerprint_bands WHERE article_id = ? AND kind = ?",
+        [(article_id, kind) for article_id in bands_by_id],
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO fingerprint_bands (kind, band, value, article_id) VALUES (?, ?, ?, ?)",
+        [
+            (kind, band, value, article_id)
+            for article_id, bands in bands_by_id.items()
+            for band, value in enumerate(bands)
+        ],
+    )
+
+
+def index_titles(conn, rows):
+    """(Re)index the MinHash bands of article titles.
+
+    Args:
+        conn: Connection or cursor inside the caller's write transaction
+        rows: Iterable of (article_id, title) pairs
+    """
+    _replace_bands(
+        conn,
+        "title",
+        {article_id: minhash_bands(title_shingles(title)) for article_id, title in rows},
+    )
+
+
+def index_search_text(conn, article_ids):
+    """Copy the bodies of published articles into article_search_text.
+
+    The full-text index reads bodies from this plain-text table, so its
+    triggers need no decompress_text() and work from any SQLite client.
+
+    Args:
+        conn: Connection or cursor inside the caller's write transaction
+        article_ids: Iterable of article ids; unpublished ones are skipped
+
+    Returns:
+        List of (article_id, content) pairs that were copied
+    """
+    stored = conn.execute(
+        """
+        SELECT c.article_id, c.content FROM article_content AS c
+        JOIN articles AS a ON a.id = c.article_id
+        WHERE c.article_id IN (SELECT value FROM json_each(?))
+          AND a.summary IS NOT NULL
+        """,
+        (json.dumps(list(article_ids)),),
+    ).fetchall()
+    rows = [(article_id, decompress_text(blob)) for article_id, blob in stored]
+    # Unchanged bodies are left alone so the index triggers do not fire
+    conn.executemany(
+        """
+        INSERT INTO article_search_text (article_id, content) VALUES (?, ?)
+        ON CONFLICT(article_id) DO UPDATE SET content=excluded.content
+        WHERE content IS NOT excluded.content
+        """,
+        rows,
+    )
+    return rows
+
+
+def index_contents(conn, rows):
+    """(Re)index the SimHash of article bodies.
+
+    Args:
+        conn: Connection or cursor inside the caller's write transaction
+        rows: Iterable of (article_id, content) pairs
+    """
+    fingerprints = {article_id: simhash(content) for article_id, content in rows if content}
+    conn.executemany(
+        "UPDATE articles SET content_simhash = ? WHERE id = ?",
+        [(fp, article_id) for article_id, fp in fingerprints.items()],
+    )
+    _replace_bands(
+        conn,
+        "content",
+        {article_id: simhash_bands(fp) for article_id, fp in fingerprints.items()},
+    )
+
+
+def _band_candidates(conn, kind, bands, columns):
+    """Stored, non-duplicate articles sharing at least one band value."""
+    return conn.execute(
+        f"""
+        SELECT DISTINCT a.id, {columns}
+        FROM json_each(?) AS j
+        JOIN fingerprint_bands AS f
+          ON f.kind = ? AND f.band = j.key AND f.value = j.value
+        JOIN articles AS a ON a.id = f.article_id
+        WHERE a.duplicate_of IS NULL
+        """,
+        (json.dumps(bands), kind),
+    ).fetchall()
+
+
+@metrics.timed("dedupe")
+def find_duplicate_titles(
+    titles_by_key, threshold=TITLE_DUPLICATE_JACCARD, window_hours=TITLE_DUPLICATE_WINDOW_HOURS
+):
+    """Find headlines that near-duplicate a recent stored headline or an
+    earlier one in the same batch.
+
+    Candidates come from the MinHash band index and are confirmed with the
+    exact trigram Jaccard similarity, so cost grows with the number of
+    candidates rather than the archive size. A similar headline is only a
+    duplicate if it was stored within ``window_hours`` and mentions the same
+    numbers: "Linux 6.12 released" is a new story, not a copy of "Linux
+    6.11 released" from two months ago.
+
+    Args:
+        titles_by_key: Dictionary mapping caller keys (e.g. URLs) to titles,
+            in priority order
+        threshold: Minimum Jaccard similarity for a duplicate
+        window_hours: Stored headlines older than this are never matched
+
+    Returns:
+        Dictionary mapping each duplicate key to the stored article id or the
+        earlier batch key it duplicates
+    """
+    duplicates = {}
+    batch = BandIndex()
+    # created_at is stored as CURRENT_TIMESTAMP text, which sorts like a date
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=window_hours)).strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+    with get_connection() as conn:
+        for key, title in titles_by_key.items():
+            shingles = title_shingles(title)
+            numbers = title_numbers(title)
+            bands = minhash_bands(shingles)
+            if not bands:
+                continue
+            best, best_score = None, threshold
+            for article_id, stored_title, created_at in _band_candidates(
+                conn, "title", bands, "a.title, a.created_at"
+            ):
+                if (created_at or "") < cutoff or title_numbers(stored_title) != numbers:
+                    continue
+                score = jaccard(shingles, title_shingles(stored_title))
+                if score >= best_score:
+                    best, best_score = article_id, score
+            for other, (other_shingles, other_numbers) in batch.candidates(bands).items():
+                if other_numbers != numbers:
+                    continue
+                score = jaccard(shingles, other_shingles)
+                if score >= best_score:
+                    best, best_score = other, score
+            if best is None:
+                batch.add(key, bands, (shingles, numbers))
+            else:
+                duplicates[key] = best
+    return duplicates
+
+
+@metrics.timed("dedupe")
+def find_duplicate_content(article_id, fingerprint, max_distance=CONTENT_DUPLICATE_DISTANCE):
+    """Find a published article whose body SimHash is within ``max_distance``.
+
+    Returns:
+        The id of the closest match other than ``article_id``, or None
+    """
+    with get_connection() as conn:
+        candidates = _band_candidates(
+            conn, "content", simhash_bands(fingerprint), "a.content_simhash"
+        )
+    best, best_distance = None, max_distance + 1
+    for candidate_id, stored in candidates:
+        if candidate_id == article_id or stored is None:
+            continue
+        distance = hamming(fingerprint, stored)
+        if distance < best_distance:
+            best, best_distance = candidate_id, distance
+    return best
+
+
+def get_data_version():
+    """Return the current data version counter (0 before migration 4)."""
+    with get_connection() as conn:
+        try:
+            row = conn.execute(
+                "SELECT value FROM meta WHERE key = 'data_version'"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return 0
+    return row[0] if row else 0
+
+
+def create_database():
+    """Create the database and bring its schema up to the latest version.
+
+    Each migration and its user_version bump commit together or not at all.
+    They run on a dedicated autocommit connection with explicit BEGIN and
+    COMMIT, because under the sqlite3 module's default transaction handling
+    DDL statements are committed as they run and a failed migration could
+    not be rolled back.
+
+    A migration returns True when it freed much of the file (moving
+    existing bodies into article_content); the database is then VACUUMed
+    once all migrations have committed. VACUUM cannot run inside a
+    transaction and rewrites the whole file, so it may take a while on a
+    large archive. A new, empty database is never VACUUMed.
+    """
+    with get_connection() as conn:
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+    if current >= MIGRATIONS[-1][0]:
         return
 
-    with sqlite3.connect(DB_NEWS) as conn:
-        cur = conn.cursor()
+    with dedicated_connection() as conn:
+        conn.isolation_level = None
+        vacuum = False
+        for version, migrate in MIGRATIONS:
+            # IMMEDIATE takes the write lock before the version is re-read,
+            # so two processes starting together apply each migration once
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("PRAGMA user_version").fetchone()[0] < version:
+                    vacuum = migrate(conn.cursor()) or vacuum
+                    conn.execute(f"PRAGMA user_version = {version}")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+        if vacuum:
+            print("Compacting database after migration...")
+            conn.execute("VACUUM")
+
+
+@metrics.timed("save")
+def save_to_db(scored_articles, fetch_pages=True, pages=None):
+    """Save analyzed articles to the database.
+
+    Args:
+        scored_articles: List of dictionaries with 'title', 'url', 'source'
+            and 'relevance' keys, plus optional 'category', 'published_at',
+            'image_url' and 'image_alt' already known from a feed
+        fetch_pages: Download article pages for missing category/image (and
+            the body of relevant articles); False saves only what is given
+        pages: Optional {url: fetch_article_page() result} for pages the
+            caller already downloaded
+
+    Returns:
+        List of the saved articles' ids
+    """
+    from scraper import fetch_article_pages
+
+    if not scored_articles:
+        print("No articles to save")
+        return []
+
+    # Download article pages concurrently before touching the database. When
+    # a feed already supplied category and image the page is skipped here;
+    # its body is fetched later only if the article gets summarised.
+    pages = dict(pages or {})
+    to_fetch = [
+        item
+        for item in scored_articles
+        if fetch_pages
+        and item.get("url") not in pages
+        and not (item.get("category") and item.get("image_url"))
+    ]
+    pages.update(
+        fetch_article_pages(
+            (item.get("url") for item in to_fetch),
+            sources={item.get("url"): item.get("source") for item in to_fetch},
+        )
+    )
+    empty_page = {"category": None, "content": "", "image_url": None, "image_alt": None}
 
-        for item in analysis_list:
-            title = item.get("title")
-            relevance = item.get("relevance")
-            article_info = articles_data.get(title, {})
-            source = article_info.get("source")
-            url = article_info.get("url")
-            category = fetch_article_category(url)
-            content = fetch_article_content(url) if url else None
-            image_url, image_alt = fetch_article_image(url) if url else (None, None)
-
-            cur.execute(
-                """
-                INSERT INTO articles (title, relevance_score, source, url, category, content, image_url, image_alt)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(url) DO UPDATE SET
-                    title=excluded.title,
-                    relevance_score=excluded.relevance_score,
-                    source=excluded.source,
-                    category=COALESCE(excluded.category, articles.category),
-                    content=COALESCE(excluded.content, articles.content),
-                    image_url=COALESCE(excluded.image_url, articles.image_url),
-                    image_alt=COALESCE(excluded.image_alt, articles.image_alt)
-                """,
-                (
-                    title,
-                    relevance,
-                    source,
-                    url,
-                    category,
-                    content,
-                    image_url,
-                    image_alt,
-                ),
+    rows = []
+    content_rows = []
+    for item in scored_articles:
+        url = item.get("url")
+        page = pages.get(url, empty_page)
+        rows.append(
+            (
+                item.get("title"),
+                item.get("relevance"),
+                item.get("source"),
+                url,
+                item.get("category") or page["category"],
+                item.get("image_url") or page["image_url"],
+                item.get("image_alt") or page["image_alt"],
+                item.get("published_at"),
+            )
+        )
+        # Only articles that will be summarised need their body stored
+        relevance = item.get("relevance")
+        if page["content"] and relevance is not None and relevance >= DEFAULT_RELEVANCE_THRESHOLD:
+            content = page["content"]
+            content_rows.append(
+                (compress_text(content), len(content.encode("utf-8")), url)
             )
 
-        conn.commit()
+    with transaction() as conn:
+        conn.executemany(
+            """
+            INSERT INTO articles (title, relevance_score, source, url, category, image_url, image_alt, published_at, fetched_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            ON CONFLICT(url) DO UPDATE SET
+                fetched_at=excluded.fetched_at,
+                updated_at=excluded.updated_at,
+                published_at=COALESCE(excluded.published_at, articles.published_at),
+                title=excluded.title,
+                relevance_score=excluded.relevance_score,
+                source=excluded.source,
+                category=COALESCE(excluded.category, articles.category),
+                image_url=COALESCE(excluded.image_url, articles.image_url),
+                image_alt=COALESCE(excluded.image_alt, articles.image_alt)
+            """,
+            rows,
+        )
+        conn.executemany(
+            """
+            INSERT INTO article_content (article_id, content, raw_size)
+            SELECT id, ?, ? FROM articles WHERE url = ?
+            ON CONFLICT(article_id) DO UPDATE SET
+                content=excluded.content,
+                raw_size=excluded.raw_size
+            """,
+            content_rows,
+        )
+        saved = conn.execute(
+            "SELECT id, title, summary IS NOT NULL, url FROM articles "
+            "WHERE url IN (SELECT value FROM json_each(?))",
+            (json.dumps([row[3] for row in rows]),),
+        ).fetchall()
+        index_titles(conn, [(article_id, title) for article_id, title, _, _ in saved])
+        # Refreshed metadata and bodies of already-published articles must
+        # reach the feed and the search index
+        refresh_feed(conn, [article_id for article_id, _, published, _ in saved if published])
+        content_urls = {url for _, _, url in content_rows}
+        index_search_text(
+            conn,
+            [
+                article_id
+                for article_id, _, published, url in saved
+                if published and url in content_urls
+            ],
+        )
+        bump_data_version(conn)
+    return [article_id for article_id, _, _, _ in saved]
 
 
-def retrieve_relevant_articles(threshold=5.0):
-    """Retrieve articles with relevance score above a threshold and valid URLs."""
-    with sqlite3.connect(DB_NEWS) as conn:
+@metrics.timed("save")
+def save_title_duplicates(articles):
+    """Store headlines that near-duplicate another article, pointing at it.
+
+    The rows keep their URL known (so it is not scraped and checked again)
+    and take their original's relevance, but are never scored or
+    summarised. A headline whose original is not stored (e.g. it could not
+    be scored) is left for a later run.
+
+    Args:
+        articles: Article dictionaries as for save_to_db, without
+            'relevance' and with 'duplicate_of' set to a find_duplicate_titles()
+            result: a stored article id or the URL of another headline
+
+    Returns:
+        Number of duplicate headlines saved
+    """
+    if not articles:
+        return 0
+    originals = [article["duplicate_of"] for article in articles]
+    with transaction() as conn:
+        found = conn.execute(
+            """
+            SELECT id, url, COALESCE(duplicate_of, id), relevance_score FROM articles
+            WHERE id IN (SELECT value FROM json_each(?))
+               OR url IN (SELECT value FROM json_each(?))
+            """,
+            (
+                json.dumps([o for o in originals if not isinstance(o, str)]),
+                json.dumps([o for o in originals if isinstance(o, str)]),
+            ),
+        ).fetchall()
+        # An original may itself be a duplicate; point at the story's first copy
+        resolved = {}
+        for article_id, url, original_id, relevance in found:
+            resolved[article_id] = resolved[url] = (original_id, relevance)
+
+        rows = [
+            (
+                article.get("title"),
+                resolved[article["duplicate_of"]][1],
+                article.get("source"),
+                article.get("url"),
+                article.get("category"),
+                article.get("image_url"),
+                article.get("image_alt"),
+                article.get("published_at"),
+                resolved[article["duplicate_of"]][0],
+            )
+            for article in articles
+            if article["duplicate_of"] in resolved
+        ]
+        conn.executemany(
+            """
+            INSERT INTO articles (title, relevance_score, source, url, category, image_url, image_alt, published_at, duplicate_of, fetched_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            ON CONFLICT(url) DO NOTHING
+            """,
+            rows,
+        )
+    return len(rows)
+
+
+@metrics.timed("db_read")
+def fetch_known_urls(urls, ttl_hours=None):
+    """Look up which of a batch of URLs are already stored, in one query.
+
+    Args:
+        urls: Iterable of article URLs
+        ttl_hours: Rows fetched longer ago than this are reported as stale;
+            None means stored rows never go stale
+
+    Returns:
+        Dictionary mapping each stored URL to a dictionary with its
+        'relevance' score and a 'fresh' flag
+    """
+    urls = list(urls)
+    if not urls:
+        return {}
+    max_age = f"-{ttl_hours} hours" if ttl_hours is not None else None
+    with get_connection() as conn:
         cur = conn.cursor()
         cur.execute(
             """
-            SELECT title, url, relevance_score, content
+            SELECT url, relevance_score,
+                   ? IS NULL OR COALESCE(fetched_at, created_at) >= datetime('now', ?)
+            FROM articles
+            WHERE url IN (SELECT value FROM json_each(?))
+            """,
+            (max_age, max_age, json.dumps(urls)),
+        )
+        return {
+            url: {"relevance": relevance, "fresh": bool(fresh)}
+            for url, relevance, fresh in cur.fetchall()
+        }
+
+
+@metrics.timed("db_read")
+def retrieve_relevant_articles(threshold=5.0, urls=None):
+    """Retrieve articles with relevance score above a threshold and valid URLs.
+
+    Args:
+        threshold: Minimum relevance score
+        urls: Optional iterable of URLs to restrict the lookup to
+
+    Returns:
+        List of (id, title, url, relevance_score, source) tuples; use
+        get_article_content() to load a body when it is needed
+    """
+    url_filter = json.dumps(list(urls)) if urls is not None else None
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT id, title, url, relevance_score, source
             FROM articles
             WHERE relevance_score >= ?
               AND summary IS NULL
+              AND duplicate_of IS NULL
               AND url IS NOT NULL
               AND TRIM(url) <> ''
+              AND (? IS NULL OR url IN (SELECT value FROM json_each(?)))
             """,
-            (threshold,),
+            (threshold, url_filter, url_filter),
         )
         results = cur.fetchall()
         return results
 
 
-def update_article_summary(title, summary):
+@metrics.timed("db_read")
+def retrieve_feed_images(article_ids=None):
+    """List the image URLs of published articles.
+
+    Args:
+        article_ids: Optional iterable of article ids to restrict the lookup to
+
+    Returns:
+        List of (article_id, image_url) tuples
+    """
+    id_filter = json.dumps(list(article_ids)) if article_ids is not None else None
+    with get_connection() as conn:
+        return conn.execute(
+            """
+            SELECT article_id, image_url
+            FROM feed
+            WHERE image_url IS NOT NULL
+              AND (? IS NULL OR article_id IN (SELECT value FROM json_each(?)))
+            """,
+            (id_filter, id_filter),
+        ).fetchall()
+
+
+def get_article_content(article_id):
+    """Load and decompress the stored body of one article.
+
+    Returns:
+        The article text, or None if no content is stored
+    """
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT content FROM article_content WHERE article_id = ?", (article_id,)
+        ).fetchone()
+    return decompress_text(row[0]) if row else None
+
+
+def update_article_summary(article_id, summary):
     """Update the summary field for an article in the database.
 
     Args:
-        title: Article title to update
+        article_id: Primary key of the article to update
         summary: Generated summary text
     """
-    with sqlite3.connect(DB_NEWS) as conn:
-        cur = conn.cursor()
-        cur.execute("UPDATE articles SET summary = ? WHERE title = ?", (summary, title))
-        conn.commit()
+    write_summary_batch([], [(article_id, summary)])
 
 
-def update_article_content(title, content):
+def update_article_content(article_id, content):
     """Update the content field for an article in the database.
 
     Args:
-        title: Article title to update
+        article_id: Primary key of the article to update
         content: Article content text
     """
-    with sqlite3.connect(DB_NEWS) as conn:
-        cur = conn.cursor()
-        cur.execute("UPDATE articles SET content = ? WHERE title = ?", (content, title))
-        conn.commit()
+    write_summary_batch([(article_id, content)], [])
+
+
+@metrics.timed("db_write")
+def write_summary_batch(contents, summaries, duplicates=(), token_counts=()):
+    """Write a batch of fetched contents and summaries in one transaction.
+
+    Bodies of newly published articles are added to the near-duplicate
+    index so later copies of the same story are caught before summarising.
+
+    Args:
+        contents: Iterable of (article_id, content) pairs
+        summaries: Iterable of (article_id, summary) pairs
+        duplicates: Iterable of (article_id, original_id) pairs for articles
+            whose body near-duplicates an already summarised one
+        token_counts: Iterable of (article_id, content_tokens, input_tokens)
+            for articles sent to the model
+    """
+    content_rows = _content_rows(contents)
+    summary_rows = [(summary, article_id) for article_id, summary in summaries]
+    duplicate_rows = [(original_id, article_id) for article_id, original_id in duplicates]
+    token_rows = [
+        (content_tokens, input_tokens, article_id)
+        for article_id, content_tokens, input_tokens in token_counts
+    ]
+    if not content_rows and not summary_rows and not duplicate_rows and not token_rows:
+        return
+    with transaction() as conn:
+        # An upsert, not INSERT OR REPLACE: REPLACE's implicit delete would
+        # bypass the search index triggers
+        conn.executemany(
+            """
+            INSERT INTO article_content (article_id, content, raw_size) VALUES (?, ?, ?)
+            ON CONFLICT(article_id) DO UPDATE SET
+                content=excluded.content,
+                raw_size=excluded.raw_size
+            """,
+            content_rows,
+        )
+        conn.executemany(
+            "UPDATE articles SET summary = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            summary_rows,
+        )
+        conn.executemany(
+            "UPDATE articles SET duplicate_of = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            duplicate_rows,
+        )
+        conn.executemany(
+            "UPDATE articles SET content_tokens = ?, input_tokens = ? WHERE id = ?", token_rows
+        )
+        published = [article_id for _, article_id in summary_rows]
+        stored = index_search_text(
+            conn, published + [article_id for article_id, _, _ in content_rows]
+        )
+        published_ids = set(published)
+        index_contents(
+            conn, [(article_id, text) for article_id, text in stored if article_id in published_ids]
+        )
+        refresh_feed(conn, published)
+        bump_data_version(conn)
+
+
+EXPORT_COLUMNS = (
+    "id",
+    "url",
+    "title",
+    "source",
+    "category",
+    "relevance_score",
+    "summary",
+    "published_at",
+    "created_at",
+    "updated_at",
+    "image_url",
+    "image_alt",
+    "duplicate_of",
+    "content_tokens",
+    "input_tokens",
+)
+
+
+def export_articles(
+    since_id=None,
+    since=None,
+    date_from=None,
+    date_to=None,
+    sources=None,
+    categories=None,
+    min_relevance=None,
+    published_only=True,
+    include_content=False,
+    limit=None,
+    batch_size=EXPORT_BATCH_SIZE,
+):
+    """Stream articles for bulk export in batches, with flat memory use.
+
+    One query runs on a dedicated connection and rows are pulled with
+    fetchmany, so the whole export reads from one consistent snapshot
+    without loading it. Rows come in id order or, with ``since``, in
+    (updated_at, id) order, both served by an index.
+
+    Args:
+        since_id: Only articles with a larger id (new since an earlier export)
+        since: Only articles changed at or after this 'YYYY-MM-DD HH:MM:SS'
+            UTC time (new, re-scraped or newly summarised); inclusive, so
+            rows from that second can repeat
+        date_from: Only articles first stored at or after this time
+        date_to: Only articles first stored before this time
+        sources: Optional iterable of source names
+        categories: Optional iterable of categories
+        min_relevance: Minimum relevance score
+        published_only: Only summarised articles that are not duplicates
+        include_content: Append the decompressed body to each row
+        limit: Maximum number of rows
+        batch_size: Rows fetched per round trip
+
+    Yields:
+        Lists of row tuples in EXPORT_COLUMNS order (plus the body)
+    """
+    columns = ", ".join(f"a.{column}" for column in EXPORT_COLUMNS)
+    query = f"SELECT {columns}"
+    if include_content:
+        query += ", decompress_text(c.content) FROM articles AS a"
+        query += " LEFT JOIN article_content AS c ON c.article_id = a.id"
+    else:
+        query += " FROM articles AS a"
+
+    clauses = []
+    params = []
+    for clause, value in (
+        ("a.id > ?", since_id),
+        ("a.updated_at >= ?", since),
+        ("a.created_at >= ?", date_from),
+        ("a.created_at < ?", date_to),
+        ("a.relevance_score >= ?", min_relevance),
+    ):
+        if value is not None:
+            clauses.append(clause)
+            params.append(value)
+    for column, values in (("source", sources), ("category", categories)):
+        if values is not None:
+            clauses.append(f"a.{column} IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(values)))
+    if published_only:
+        clauses.append("a.summary IS NOT NULL AND a.duplicate_of IS NULL")
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY a.updated_at, a.id" if since is not None else " ORDER BY a.id"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    with dedicated_connection() as conn:
+        cur = conn.execute(query, params)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+
+
+def save_pipeline_run(report):
+    """Store a metrics.RunMetrics report in pipeline_runs.
+
+    Returns:
+        The new row's id
+    """
+    totals = report["totals"]
+    with transaction() as conn:
+        cur = conn.execute(
+            """
+            INSERT INTO pipeline_runs (started_at, wall_seconds, http_requests,
+                http_bytes, llm_calls, llm_tokens, errors, report)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                report["started_at"],
+                report["wall_seconds"],
+                totals["http_requests"],
+                totals["http_bytes"],
+                totals["llm_calls"],
+                totals["llm_tokens"],
+                totals["errors"],
+                json.dumps(report, sort_keys=True),
+            ),
+        )
+        return cur.lastrowid
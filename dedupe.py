@@ -0,0 +1,189 @@
+"""Canonical URLs and near-duplicate fingerprints for headlines and bodies.
+
+Headlines are short, so they use MinHash over character 3-grams with
+banded LSH; article bodies use a 64-bit SimHash split into bands. In both
+cases a document is only compared in full against the few stored
+documents that share at least one band value, so lookups stay cheap as the
+archive grows. The band tables themselves live in SQLite (see database.py).
+"""
+
+import hashlib
+import random
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from config import (
+    MINHASH_PERMUTATIONS,
+    MINHASH_BANDS,
+    SIMHASH_BANDS,
+)
+
+# Query parameters that only identify a campaign or referrer
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "mc_cid",
+    "mc_eid",
+    "guccounter",
+    "guce_referrer",
+    "guce_referrer_sig",
+    "_hsenc",
+    "_hsmi",
+    "cmpid",
+    "ocid",
+    "sr_share",
+    "ref",
+    "ref_src",
+    "tpcc",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_WORD = re.compile(r"\w+")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+_MERSENNE_PRIME = (1 << 61) - 1
+
+# Fixed seed: signatures must be reproducible across runs and processes
+_rng = random.Random(1729)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(MINHASH_PERMUTATIONS)
+]
+
+
+def canonical_url(url):
+    """Normalise a URL so the same article always maps to the same string.
+
+    Lower-cases the scheme and host, drops default ports, fragments and
+    tracking parameters, and sorts the remaining query parameters.
+    """
+    if not url:
+        return url
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+        and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def to_signed(value):
+    """Map an unsigned 64-bit value onto SQLite's signed INTEGER range."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def title_shingles(title):
+    """Character 3-grams of a headline with case and punctuation removed."""
+    text = " ".join(_WORD.findall((title or "").lower()))
+    if len(text) < 3:
+        return {text} if text else set()
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def title_numbers(title):
+    """Numbers in a headline, e.g. {"18.2"} for "iOS 18.2 is out".
+
+    Headlines about consecutive releases differ only in their numbers, so
+    two headlines with different numbers are never duplicates.
+    """
+    return frozenset(_NUMBER.findall(title or ""))
+
+
+def jaccard(a, b):
+    """Jaccard similarity of two sets (0.0 when both are empty)."""
+    if not a and not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def minhash_bands(shingles):
+    """MinHash a shingle set and hash each band of the signature.
+
+    Returns:
+        List of MINHASH_BANDS signed integers, one per band; empty for an
+        empty set
+    """
+    if not shingles:
+        return []
+    hashes = [_hash64(s) for s in shingles]
+    signature = [
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS
+    ]
+    rows = len(signature) // MINHASH_BANDS
+    return [
+        to_signed(_hash64(f"{band}:" + ",".join(map(str, signature[band * rows : (band + 1) * rows]))))
+        for band in range(MINHASH_BANDS)
+    ]
+
+
+def simhash(text):
+    """64-bit SimHash of a text's word bigrams (signed, for SQLite)."""
+    words = _WORD.findall((text or "").lower())
+    features = [f"{a} {b}" for a, b in zip(words, words[1:])] or words
+    # A bit is set when most feature hashes have it set. Writing the hashes
+    # as 64-character bit strings lets zip() count each bit column in C.
+    rows = [format(_hash64(feature), "064b") for feature in features]
+    half = len(rows) / 2
+    value = 0
+    for position, column in enumerate(zip(*rows)):
+        if column.count("1") > half:
+            value |= 1 << (63 - position)
+    return to_signed(value)
+
+
+def simhash_bands(fingerprint):
+    """Split a SimHash into SIMHASH_BANDS equal bit ranges.
+
+    Two fingerprints within SIMHASH_BANDS - 1 bits of each other are
+    guaranteed to agree on at least one band.
+    """
+    value = fingerprint & ((1 << 64) - 1)
+    width = 64 // SIMHASH_BANDS
+    mask = (1 << width) - 1
+    return [value >> (band * width) & mask for band in range(SIMHASH_BANDS)]
+
+
+def hamming(a, b):
+    """Number of differing bits between two 64-bit fingerprints."""
+    return bin((a ^ b) & ((1 << 64) - 1)).count("1")
+
+
+class BandIndex:
+    """In-memory band index for documents not yet written to the database.
+
+    Used to catch duplicates within a single run (e.g. the same story in two
+    feeds) before either copy has been stored.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+
+    def add(self, key, bands, payload):
+        for band, value in enumerate(bands):
+            self._buckets.setdefault((band, value), []).append((key, payload))
+
+    def remove(self, key, bands):
+        """Drop an entry added with the same bands."""
+        for band, value in enumerate(bands):
+            bucket = self._buckets.get((band, value), [])
+            bucket[:] = [entry for entry in bucket if entry[0] != key]
+
+    def candidates(self, bands):
+        """Return {key: payload} for entries sharing at least one band."""
+        found = {}
+        for band, value in enumerate(bands):
+            for key, payload in self._buckets.get((band, value), ()):
+                found[key] = payload
+        return found
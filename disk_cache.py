@@ -0,0 +1,99 @@
+"""Size-capped directory of cache files with least-recently-used eviction."""
+
+import os
+import threading
+
+
+class LRUDirectory:
+    """Files in one directory, evicted least recently used first.
+
+    Each entry is a ``<key><suffix>`` file, optionally with companion files
+    (``<key><companion>``, e.g. metadata) that are written and evicted with
+    it. File modification times track recency; only the main file counts
+    towards the size cap.
+    """
+
+    def __init__(self, directory, max_bytes, suffix, companions=(), evict_every=20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.companions = tuple(companions)
+        # Eviction lists the whole directory, so it runs every few writes
+        self.evict_every = evict_every
+        self._lock = threading.Lock()
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key, suffix=None):
+        return os.path.join(self.directory, key + (suffix or self.suffix))
+
+    def read(self, key, suffix=None):
+        """Return the bytes of one file of an entry, or None if missing."""
+        try:
+            with open(self.path(key, suffix), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def touch(self, key):
+        """Mark an entry as recently used."""
+        for suffix in (self.suffix,) + self.companions:
+            try:
+                os.utime(self.path(key, suffix))
+            except OSError:
+                pass
+
+    def write(self, key, files):
+        """Write an entry's files, each atomically.
+
+        Args:
+            key: Entry name
+            files: {suffix: bytes}; the main file should come last, so an
+                entry is only visible once its companions exist
+        """
+        for suffix, data in files.items():
+            path = self.path(key, suffix)
+            # Readers never see a partially written file
+            temporary = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+            with open(temporary, "wb") as f:
+                f.write(data)
+            os.replace(temporary, path)
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.evict_every == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until under the size cap.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.directory):
+                if not name.endswith(self.suffix):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name[: -len(self.suffix)]))
+                total += stat.st_size
+
+            removed = 0
+            for _, size, key in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                for suffix in (self.suffix,) + self.companions:
+                    try:
+                        os.remove(self.path(key, suffix))
+                    except OSError:
+                        pass
+                total -= size
+                removed += 1
+            return removed
@@ -0,0 +1,217 @@
+"""Bulk export of the article archive as NDJSON or CSV.
+
+Usage:
+    python export.py [--format ndjson|csv] [--output FILE] [--since-id N]
+        [--since TIME] [--from TIME] [--until TIME] [--source NAME ...]
+        [--category NAME ...] [--min-relevance 5] [--all] [--content]
+        [--limit N]
+
+Rows stream from database.export_articles() and are written batch by batch
+as they are read, so memory use stays flat however large the archive is.
+server.py offers the same export, with the same filters, at /api/export.
+
+For incremental pulls, keep the largest ``id`` seen and pass it as
+--since-id next time (new articles only), or keep the largest
+``updated_at`` and pass it as --since (also picks up articles summarised or
+re-scraped in the meantime). Both are printed at the end of an export.
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime, timezone
+
+from database import EXPORT_COLUMNS, export_articles
+
+# Format name -> MIME type
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def parse_timestamp(value):
+    """Normalise an ISO 8601 date or time to the database's UTC format.
+
+    Accepts e.g. '2026-01-31', '2026-01-31T08:00', '2026-01-31 08:00:00'
+    or '2026-01-31T08:00:00+02:00'; times without an offset are UTC.
+
+    Returns:
+        'YYYY-MM-DD HH:MM:SS' string
+
+    Raises:
+        ValueError if the value is not a date or time
+    """
+    moment = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def build_filters(
+    since_id=None,
+    since=None,
+    date_from=None,
+    date_to=None,
+    sources=None,
+    categories=None,
+    min_relevance=None,
+    include_all=False,
+    include_content=False,
+    limit=None,
+):
+    """Validate export filters given as strings (CLI or query parameters).
+
+    Returns:
+        Keyword arguments for database.export_articles()
+
+    Raises:
+        ValueError with a message naming the invalid filter
+    """
+
+    def convert(name, value, parse):
+        if value in (None, ""):
+            return None
+        try:
+            return parse(value)
+        except ValueError:
+            raise ValueError(f"invalid {name}: {value!r}") from None
+
+    limit = convert("limit", limit, int)
+    if limit is not None and limit < 0:
+        raise ValueError(f"invalid limit: {limit!r}")
+    return {
+        "since_id": convert("since_id", since_id, int),
+        "since": convert("since", since, parse_timestamp),
+        "date_from": convert("from", date_from, parse_timestamp),
+        "date_to": convert("until", date_to, parse_timestamp),
+        "sources": list(sources) if sources else None,
+        "categories": list(categories) if categories else None,
+        "min_relevance": convert("min_relevance", min_relevance, float),
+        "published_only": not include_all,
+        "include_content": include_content,
+        "limit": limit,
+    }
+
+
+def column_names(include_content=False):
+    """Field names of exported rows, in order."""
+    return EXPORT_COLUMNS + ("content",) if include_content else EXPORT_COLUMNS
+
+
+def format_chunks(batches, fmt="ndjson", include_content=False):
+    """Render batches of export rows as text, one chunk per batch.
+
+    Args:
+        batches: Iterable of row lists, as yielded by export_articles()
+        fmt: "ndjson" (one JSON object per line) or "csv" (with a header row)
+        include_content: Rows end with the article body
+
+    Yields:
+        str chunks
+    """
+    names = column_names(include_content)
+    if fmt == "ndjson":
+        for rows in batches:
+            yield "".join(
+                json.dumps(dict(zip(names, row)), ensure_ascii=False, separators=(",", ":"))
+                + "\n"
+                for row in rows
+            )
+    elif fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        for rows in batches:
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        # Header only, for an empty export
+        if buffer.tell():
+            yield buffer.getvalue()
+    else:
+        raise ValueError(f"unknown export format {fmt!r}")
+
+
+def export(output, fmt="ndjson", **filters):
+    """Write an export to a text file object.
+
+    Args:
+        output: Writable text file (open CSV files with newline="")
+        fmt: "ndjson" or "csv"
+        **filters: Keyword arguments for database.export_articles()
+
+    Returns:
+        (rows, last_id, last_updated_at) for the next incremental export;
+        the last two are None when nothing was exported
+    """
+    progress = {"rows": 0, "last_id": None, "last_updated_at": None}
+    updated_at = EXPORT_COLUMNS.index("updated_at")
+
+    def tracked(batches):
+        for rows in batches:
+            progress["rows"] += len(rows)
+            for row in rows:
+                if progress["last_id"] is None or row[0] > progress["last_id"]:
+                    progress["last_id"] = row[0]
+                if row[updated_at] and (
+                    progress["last_updated_at"] is None
+                    or row[updated_at] > progress["last_updated_at"]
+                ):
+                    progress["last_updated_at"] = row[updated_at]
+            yield rows
+
+    batches = tracked(export_articles(**filters))
+    for chunk in format_chunks(batches, fmt, filters.get("include_content", False)):
+        output.write(chunk)
+    return progress["rows"], progress["last_id"], progress["last_updated_at"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson")
+    parser.add_argument("--output", "-o", help="file to write (default: stdout)")
+    parser.add_argument("--since-id", help="only articles with a larger id")
+    parser.add_argument("--since", help="only articles changed at or after this UTC time")
+    parser.add_argument("--from", dest="date_from", help="only articles stored at or after this time")
+    parser.add_argument("--until", dest="date_to", help="only articles stored before this time")
+    parser.add_argument("--source", action="append", help="source name (repeatable)")
+    parser.add_argument("--category", action="append", help="category (repeatable)")
+    parser.add_argument("--min-relevance", help="minimum relevance score")
+    parser.add_argument(
+        "--all", action="store_true", help="include unsummarised and duplicate articles"
+    )
+    parser.add_argument("--content", action="store_true", help="include article bodies")
+    parser.add_argument("--limit", help="maximum number of articles")
+    args = parser.parse_args()
+
+    try:
+        filters = build_filters(
+            since_id=args.since_id,
+            since=args.since,
+            date_from=args.date_from,
+            date_to=args.date_to,
+            sources=args.source,
+            categories=args.category,
+            min_relevance=args.min_relevance,
+            include_all=args.all,
+            include_content=args.content,
+            limit=args.limit,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as output:
+            rows, last_id, last_updated_at = export(output, args.format, **filters)
+    else:
+        rows, last_id, last_updated_at = export(sys.stdout, args.format, **filters)
+    # Progress goes to stderr so stdout can be piped
+    print(
+        f"Exported {rows} articles (last id: {last_id}, last updated_at: {last_updated_at})",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Streaming RSS/Atom/news-sitemap parsing for headline ingestion."""
+
+import io
+import xml.etree.ElementTree as ET
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+# Elements that hold one headline in each supported format
+_ENTRY_TAGS = {"item", "entry", "url"}
+
+
+def _local(tag):
+    """Strip the '{namespace}' prefix from an element tag."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _child(elem, *path):
+    """Follow a path of local tag names below ``elem``; return the element or None."""
+    for name in path:
+        if elem is None:
+            return None
+        elem = next((c for c in elem if _local(c.tag) == name), None)
+    return elem
+
+
+def _text(elem, *path):
+    found = _child(elem, *path)
+    if found is None or found.text is None:
+        return None
+    return found.text.strip() or None
+
+
+def _normalise_date(value):
+    """Convert RFC 822 or ISO 8601 timestamps to 'YYYY-MM-DD HH:MM:SS' UTC."""
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _media_image(elem):
+    """Return (url, alt) from media:content/media:thumbnail/enclosure children."""
+    for child in elem:
+        name = _local(child.tag)
+        url = child.get("url")
+        if not url:
+            continue
+        if name == "thumbnail" or (
+            name in ("content", "enclosure")
+            and (child.get("medium") == "image" or (child.get("type") or "").startswith("image/"))
+        ):
+            alt = _text(child, "description") or _text(child, "title")
+            return url, alt
+    return None, None
+
+
+def _rss_item(elem):
+    image_url, image_alt = _media_image(elem)
+    return {
+        "title": _text(elem, "title"),
+        "url": _text(elem, "link"),
+        "category": _text(elem, "category"),
+        "published_at": _normalise_date(_text(elem, "pubDate")),
+        "image_url": image_url,
+        "image_alt": image_alt,
+    }
+
+
+def _atom_entry(elem):
+    url = None
+    category = None
+    for child in elem:
+        name = _local(child.tag)
+        if name == "link" and child.get("rel", "alternate") == "alternate" and url is None:
+            url = child.get("href")
+        elif name == "category" and category is None:
+            category = child.get("label") or child.get("term")
+    image_url, image_alt = _media_image(elem)
+    return {
+        "title": _text(elem, "title"),
+        "url": url,
+        "category": category,
+        "published_at": _normalise_date(_text(elem, "published") or _text(elem, "updated")),
+        "image_url": image_url,
+        "image_alt": image_alt,
+    }
+
+
+def _sitemap_url(elem):
+    return {
+        "title": _text(elem, "news", "title"),
+        "url": _text(elem, "loc"),
+        "category": None,
+        "published_at": _normalise_date(_text(elem, "news", "publication_date")),
+        "image_url": _text(elem, "image", "loc"),
+        "image_alt": _text(elem, "image", "caption") or _text(elem, "image", "title"),
+    }
+
+
+_ENTRY_PARSERS = {"item": _rss_item, "entry": _atom_entry, "url": _sitemap_url}
+
+
+def parse_feed(data):
+    """Stream headline entries out of an RSS, Atom or news sitemap document.
+
+    Entries are parsed as their closing tag arrives and then discarded, so
+    memory use does not grow with the size of the feed.
+
+    Args:
+        data: Raw XML bytes
+
+    Returns:
+        List of dictionaries with 'title', 'url', 'category',
+        'published_at', 'image_url' and 'image_alt' keys (missing values are
+        None). Entries without a title or URL are skipped.
+    """
+    entries = []
+    for _, elem in ET.iterparse(io.BytesIO(data), events=("end",)):
+        name = _local(elem.tag)
+        if name not in _ENTRY_TAGS:
+            continue
+        # <url> only denotes an entry in sitemaps, where it has a <loc> child
+        if name == "url" and _child(elem, "loc") is None:
+            continue
+        entry = _ENTRY_PARSERS[name](elem)
+        elem.clear()
+        if entry["title"] and entry["url"]:
+            entries.append(entry)
+    return entries
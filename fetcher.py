@@ -0,0 +1,354 @@
+"""Concurrent HTTP fetch layer with per-host pooling and politeness limits."""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    REQUEST_HEADERS,
+    REQUEST_TIMEOUT,
+    FETCH_WORKERS,
+    MAX_CONNECTIONS_PER_HOST,
+    REQUESTS_PER_SECOND_PER_HOST,
+    FETCH_MAX_RETRIES,
+    FETCH_BACKOFF_BASE,
+    FETCH_BACKOFF_MAX,
+    PAGE_CACHE_ENABLED,
+    REPLAY_MODE,
+)
+from ratelimit import TokenBucket
+import metrics
+from page_cache import PageCache, validator_headers, to_response
+from sources import all_sources
+
+
+_STREAM_CHUNK = 16 * 1024
+# Worth another attempt: rate limited, or a temporary server-side failure
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _retry_after(response):
+    """Seconds to wait from a Retry-After header, or None to use backoff.
+
+    Only the delta-seconds form is honoured, and only up to FETCH_BACKOFF_MAX.
+    """
+    try:
+        delay = float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+    return delay if 0 <= delay <= FETCH_BACKOFF_MAX else None
+
+
+def _read_until(response, marker):
+    """Read a streamed body up to and including ``marker``, then stop.
+
+    The truncated body becomes the response content; the rest of the page is
+    never downloaded.
+
+    Returns:
+        True if the marker was found (the body may be incomplete)
+    """
+    body = bytearray()
+    end = -1
+    for chunk in response.iter_content(_STREAM_CHUNK):
+        search_from = max(0, len(body) - len(marker))
+        body.extend(chunk)
+        end = body.find(marker, search_from)
+        if end != -1:
+            del body[end + len(marker) :]
+            break
+    response._content = bytes(body)
+    response._content_consumed = True
+    response.close()
+    return end != -1
+
+
+class ResponseTooLarge(requests.RequestException):
+    """A response body was larger than the caller's ``max_bytes``."""
+
+
+def _read_limited(response, max_bytes):
+    """Read a streamed body, giving up as soon as it is over ``max_bytes``.
+
+    A larger Content-Length is rejected before anything is read.
+
+    Raises:
+        ResponseTooLarge; the rest of the body is never downloaded
+    """
+    declared = response.headers.get("Content-Length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        response.close()
+        raise ResponseTooLarge(
+            f"{response.url}: Content-Length {declared} is over {max_bytes} bytes",
+            response=response,
+        )
+    body = bytearray()
+    for chunk in response.iter_content(_STREAM_CHUNK):
+        body.extend(chunk)
+        if len(body) > max_bytes:
+            response.close()
+            raise ResponseTooLarge(
+                f"{response.url}: body is over {max_bytes} bytes", response=response
+            )
+    response._content = bytes(body)
+    response._content_consumed = True
+    response.close()
+
+
+class Fetcher:
+    """Shared HTTP client that fetches pages concurrently.
+
+    A single ``requests.Session`` keeps keep-alive connections pooled per
+    host. Each host gets its own semaphore (concurrency cap) and token bucket
+    (request rate), so many hosts can be fetched in parallel while each one
+    is treated politely.
+
+    With a page cache, requests are revalidated with If-None-Match /
+    If-Modified-Since and 304 responses are served from disk. In replay mode
+    every request is served from the cache and the network is never used.
+    """
+
+    def __init__(
+        self,
+        workers=FETCH_WORKERS,
+        max_per_host=MAX_CONNECTIONS_PER_HOST,
+        rate_per_host=REQUESTS_PER_SECOND_PER_HOST,
+        cache=None,
+        replay=REPLAY_MODE,
+        retries=FETCH_MAX_RETRIES,
+        backoff=FETCH_BACKOFF_BASE,
+    ):
+        self.workers = workers
+        self.max_per_host = max_per_host
+        self.rate_per_host = rate_per_host
+        self.cache = cache
+        self.replay = replay
+        self.retries = retries
+        self.backoff = backoff
+
+        self._session = None
+        self._session_lock = threading.Lock()
+
+        self._hosts_lock = threading.Lock()
+        self._semaphores = {}
+        self._buckets = {}
+        self._overrides = {}
+
+    @property
+    def session(self):
+        """The pooled ``requests.Session``, created on first use."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    session.headers.update(REQUEST_HEADERS)
+                    self._mount_adapter(session)
+                    self._session = session
+        return self._session
+
+    def _pool_size(self):
+        """Largest per-host connection cap, default or configured."""
+        with self._hosts_lock:
+            caps = [cap for cap, _ in self._overrides.values() if cap is not None]
+        return max([self.max_per_host] + caps)
+
+    def _mount_adapter(self, session):
+        # Every host's pool must hold as many connections as that host may
+        # use at once, or connections over the size are discarded after use
+        adapter = HTTPAdapter(
+            pool_connections=max(self.workers, 10), pool_maxsize=self._pool_size()
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+    def configure_host(self, domain, max_connections=None, rate=None):
+        """Override the concurrency cap and/or rate for a domain and its subdomains.
+
+        Must be called before the first request to an affected host. The
+        session's connection pools grow to the largest cap configured.
+        """
+        with self._hosts_lock:
+            self._overrides[domain] = (max_connections, rate)
+        with self._session_lock:
+            session = self._session
+            if session is not None and max_connections is not None:
+                adapter = session.get_adapter("https://")
+                if adapter._pool_maxsize < max_connections:
+                    self._mount_adapter(session)
+
+    def _limits_for(self, url):
+        host = urlparse(url).hostname or ""
+        max_connections, rate = self.max_per_host, self.rate_per_host
+        for domain, (domain_max, domain_rate) in self._overrides.items():
+            if host == domain or host.endswith("." + domain):
+                if domain_max is not None:
+                    max_connections = domain_max
+                if domain_rate is not None:
+                    rate = domain_rate
+        return max_connections, rate
+
+    def _host_limits(self, url):
+        host = urlparse(url).netloc
+        with self._hosts_lock:
+            if host not in self._semaphores:
+                max_connections, rate = self._limits_for(url)
+                self._semaphores[host] = threading.BoundedSemaphore(max_connections)
+                self._buckets[host] = TokenBucket(rate)
+            return self._semaphores[host], self._buckets[host]
+
+    def get(self, url, stop_at=None, use_cache=True, max_bytes=None, **kwargs):
+        """GET a URL, respecting the per-host concurrency cap and rate.
+
+        Connection errors, timeouts, 429 and 5xx responses are retried up to
+        ``retries`` times with exponential backoff (or after the server's
+        Retry-After, if shorter than FETCH_BACKOFF_MAX).
+
+        Args:
+            url: URL to fetch
+            stop_at: Optional marker string; the body is streamed and reading
+                stops right after the first occurrence of the marker. Bodies
+                cut short are cached as partial and only served from the
+                cache to requests with the same marker
+            use_cache: Set False to bypass the page cache (e.g. for images,
+                which are kept elsewhere)
+            max_bytes: Optional size limit; the body is streamed and the
+                download abandoned once it (or its Content-Length) is larger
+            **kwargs: Extra arguments for requests.Session.get
+
+        Returns:
+            requests.Response with a successful status
+
+        Raises:
+            requests.RequestException on network or HTTP errors;
+            ResponseTooLarge (not retried) when ``max_bytes`` is exceeded
+        """
+        cache = self.cache if use_cache else None
+        entry = cache.load(url, stop_at) if cache else None
+        if self.replay:
+            if entry is None:
+                raise requests.ConnectionError(f"{url} is not in the page cache (replay mode)")
+            return to_response(entry)
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers.update(validator_headers(entry))
+        kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+
+        for attempt in range(self.retries + 1):
+            try:
+                response, truncated = self._send(url, headers, stop_at, max_bytes, kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                delay = None
+            else:
+                if response.status_code not in _RETRY_STATUSES or attempt == self.retries:
+                    break
+                delay = _retry_after(response)
+                response.close()
+            metrics.count("http_retries")
+            if delay is None:
+                delay = min(FETCH_BACKOFF_MAX, self.backoff * 2**attempt)
+                delay *= random.uniform(0.5, 1.0)
+            time.sleep(delay)
+
+        if response.status_code == 304 and entry is not None:
+            return to_response(entry)
+
+        response.raise_for_status()
+        if cache:
+            cache.store(url, response, stop_at=stop_at if truncated else None)
+        return response
+
+    def _send(self, url, headers, stop_at, max_bytes, kwargs):
+        """One request under the host's limits; returns (response, truncated)."""
+        semaphore, bucket = self._host_limits(url)
+        truncated = False
+        queued = time.perf_counter()
+        with semaphore:
+            bucket.acquire()
+            started = time.perf_counter()
+            # Time spent queued behind the per-host cap and rate limit
+            metrics.record("http_wait", seconds=started - queued, calls=1)
+            try:
+                response = self.session.get(
+                    url, headers=headers, stream=bool(stop_at or max_bytes), **kwargs
+                )
+                if stop_at and response.status_code == 200:
+                    truncated = _read_until(response, stop_at.encode("utf-8"))
+                elif max_bytes and response.status_code == 200:
+                    _read_limited(response, max_bytes)
+            except requests.RequestException:
+                elapsed = time.perf_counter() - started
+                metrics.record("http", seconds=elapsed, calls=1, errors=1)
+                metrics.record_host(url, elapsed, error=True)
+                raise
+            elapsed = time.perf_counter() - started
+
+        size = len(response.content)
+        failed = response.status_code >= 400
+        metrics.record("http", seconds=elapsed, calls=1, errors=int(failed), nbytes=size)
+        metrics.record_host(
+            url, elapsed, size, error=failed, not_modified=response.status_code == 304
+        )
+        return response, truncated
+
+    def map(self, func, items):
+        """Apply ``func`` to every item on the worker pool, preserving order."""
+        items = list(items)
+        if len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(items))) as pool:
+            return list(pool.map(func, items))
+
+    def close(self):
+        """Close pooled connections."""
+        if self._session is not None:
+            self._session.close()
+
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+
+def get_fetcher():
+    """Return the process-wide Fetcher, creating it on first use."""
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = Fetcher(
+                cache=PageCache() if PAGE_CACHE_ENABLED or REPLAY_MODE else None
+            )
+            for source in all_sources():
+                if source.rate_limit is None and source.max_connections is None:
+                    continue
+                for host in source.hosts():
+                    _default_fetcher.configure_host(
+                        host, source.max_connections, source.rate_limit
+                    )
+        return _default_fetcher
+
+
+def _forget_session():
+    # A forked worker process must not share the parent's pooled sockets;
+    # the child opens its own connections on first use (see worker.py)
+    global _default_lock
+    _default_lock = threading.Lock()
+    if _default_fetcher is not None:
+        _default_fetcher._session = None
+        _default_fetcher._session_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_session)
+
+
+def set_fetcher(fetcher):
+    """Replace the process-wide Fetcher (e.g. to point at a local stand-in)."""
+    global _default_fetcher
+    with _default_lock:
+        _default_fetcher = fetcher
@@ -0,0 +1,316 @@
+"""Local thumbnails of article images, served by server.py at /img/<id>.
+
+The pipeline downloads the images of articles saved or published in a run,
+resizes them to the card size (IMAGE_THUMBNAIL_SIZE, cropped to fill like
+the CSS ``object-fit: cover``) and stores them as WebP or JPEG in
+IMAGE_CACHE_DIR, a size-capped LRU directory like the page cache. Pages then
+load small local files instead of full-size hero images from the source
+sites' CDNs. Older images, and ones evicted since, are fetched in the
+background the first time /img/<id> misses them (see request_thumbnail).
+
+Entries are keyed by the image URL and the thumbnail settings, so a new
+image or new settings get a new entry (and a new ``?v=`` in the /img URL,
+which lets browsers cache responses indefinitely). Images that cannot be
+used (4xx responses, undecodable or oversized files) are remembered with an
+empty marker file and not fetched again for IMAGE_FAILURE_RETRY_HOURS.
+
+Resizing needs Pillow; without it the original file is cached unchanged.
+Pillow and the HTTP client are imported on first use, so the web server can
+import this module without loading either.
+"""
+
+import hashlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    IMAGE_CACHE_DIR,
+    IMAGE_CACHE_MAX_BYTES,
+    IMAGE_THUMBNAIL_SIZE,
+    IMAGE_FORMAT,
+    IMAGE_QUALITY,
+    IMAGE_MAX_DOWNLOAD_BYTES,
+    IMAGE_FAILURE_RETRY_HOURS,
+    IMAGE_BACKGROUND_WORKERS,
+)
+from disk_cache import LRUDirectory
+import metrics
+
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def sniff_mimetype(data):
+    """Return the MIME type of JPEG, PNG, GIF or WebP bytes, else None."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mimetype in _SIGNATURES:
+        if data.startswith(signature):
+            return mimetype
+    return None
+
+
+def cache_key(url):
+    """Name of the cache entry for an image URL under the current settings."""
+    raw = f"{url}\n{IMAGE_THUMBNAIL_SIZE}\n{IMAGE_FORMAT}\n{IMAGE_QUALITY}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def image_version(url):
+    """Short token that changes whenever the thumbnail for ``url`` would."""
+    return cache_key(url)[:12]
+
+
+class ImageCache:
+    """Size-capped LRU directory of thumbnails keyed by image URL.
+
+    Each entry is a ``<key>.img`` file; ``<key>.failed`` marks an image that
+    could not be used, until it is ``retry_hours`` old.
+    """
+
+    def __init__(
+        self,
+        directory=IMAGE_CACHE_DIR,
+        max_bytes=IMAGE_CACHE_MAX_BYTES,
+        retry_hours=IMAGE_FAILURE_RETRY_HOURS,
+    ):
+        self.files = LRUDirectory(directory, max_bytes, ".img")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.retry_seconds = retry_hours * 3600
+
+    def load(self, url):
+        """Return the cached thumbnail bytes for ``url``, or None."""
+        key = cache_key(url)
+        data = self.files.read(key)
+        if not data:
+            return None
+        self.files.touch(key)
+        return data
+
+    def store(self, url, data):
+        """Store thumbnail bytes for ``url``."""
+        self.files.write(cache_key(url), {".img": data})
+
+    def mark_failed(self, url):
+        """Remember that the image at ``url`` cannot be used."""
+        open(self.files.path(cache_key(url), ".failed"), "wb").close()
+
+    def is_failed(self, url):
+        """Whether ``url`` failed recently; an expired marker is removed."""
+        path = self.files.path(cache_key(url), ".failed")
+        try:
+            if time.time() - os.stat(path).st_mtime < self.retry_seconds:
+                return True
+            os.remove(path)
+        except OSError:
+            pass
+        return False
+
+    def expire_failures(self):
+        """Delete failure markers older than the retry interval.
+
+        Returns:
+            Number of markers removed
+        """
+        cutoff = time.time() - self.retry_seconds
+        removed = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".failed"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def evict(self):
+        """Delete least recently used thumbnails until under the size cap.
+
+        Returns:
+            Number of entries removed
+        """
+        return self.files.evict()
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_image_cache():
+    """Return the process-wide ImageCache, creating it on first use."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ImageCache()
+        return _default_cache
+
+
+def make_thumbnail(data, size=IMAGE_THUMBNAIL_SIZE, image_format=IMAGE_FORMAT, quality=IMAGE_QUALITY):
+    """Resize and re-encode image bytes for a card.
+
+    The image is scaled to cover ``size`` and centre-cropped. If Pillow is
+    not installed, or the thumbnail would be larger than the original, the
+    original bytes are returned.
+
+    Returns:
+        Thumbnail bytes, or None if ``data`` is not a usable image
+    """
+    if sniff_mimetype(data) is None:
+        return None
+    try:
+        from PIL import Image, ImageOps, features
+    except ImportError:
+        return data
+
+    if image_format == "WEBP" and not features.check("webp"):
+        image_format = "JPEG"
+    width, height = size
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # JPEGs are decoded straight at a reduced scale
+            image.draft("RGB", size)
+            ImageOps.exif_transpose(image, in_place=True)
+            mode = "RGBA" if image_format == "WEBP" and image.has_transparency_data else "RGB"
+            if image.mode != mode:
+                image = image.convert(mode)
+            # Crop to the card's aspect ratio and resize in one pass; the
+            # reducing gap box-shrinks first, which is about twice as fast
+            scale = max(width / image.width, height / image.height)
+            crop_width, crop_height = width / scale, height / scale
+            left = (image.width - crop_width) / 2
+            top = (image.height - crop_height) / 2
+            thumbnail = image.resize(
+                size,
+                Image.LANCZOS,
+                box=(left, top, left + crop_width, top + crop_height),
+                reducing_gap=1.0,
+            )
+            output = io.BytesIO()
+            thumbnail.save(output, image_format, quality=quality, optimize=True)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    resized = output.getvalue()
+    return resized if len(resized) < len(data) else data
+
+
+@metrics.timed("image")
+def cache_image(url, cache=None):
+    """Download one image and store its thumbnail, unless cached or failed.
+
+    Returns:
+        True if a thumbnail is now cached, False if the image is unusable
+
+    Raises:
+        requests.RequestException on network errors and 5xx responses,
+        which are worth retrying
+    """
+    import requests
+
+    from fetcher import ResponseTooLarge, get_fetcher
+
+    cache = cache or get_image_cache()
+    if cache.load(url) is not None:
+        return True
+    if cache.is_failed(url):
+        return False
+    try:
+        # Images stay out of the page cache; the thumbnail is what is kept.
+        # Oversized files are abandoned without downloading the rest.
+        response = get_fetcher().get(
+            url, use_cache=False, max_bytes=IMAGE_MAX_DOWNLOAD_BYTES
+        )
+    except ResponseTooLarge:
+        metrics.record("image", errors=1)
+        cache.mark_failed(url)
+        return False
+    except requests.HTTPError as e:
+        if e.response is None or e.response.status_code >= 500:
+            raise
+        cache.mark_failed(url)
+        return False
+
+    thumbnail = make_thumbnail(response.content)
+    if thumbnail is None:
+        metrics.record("image", errors=1)
+        cache.mark_failed(url)
+        return False
+    metrics.record("image", nbytes=len(thumbnail))
+    cache.store(url, thumbnail)
+    return True
+
+
+def cache_article_images(images, cache=None):
+    """Cache thumbnails for (article_id, image_url) pairs.
+
+    Downloads run on the shared fetcher's worker pool; images already cached
+    or recently failed are skipped, other failures are logged. Expired
+    failure markers are cleared first.
+
+    Returns:
+        Number of images with a cached thumbnail
+    """
+    cache = cache or get_image_cache()
+    cache.expire_failures()
+    urls = sorted({url for _, url in images if url})
+    if not urls:
+        return 0
+
+    from fetcher import get_fetcher
+
+    return sum(get_fetcher().map(lambda url: _try_cache_image(url, cache), urls))
+
+
+def _try_cache_image(url, cache):
+    try:
+        return cache_image(url, cache)
+    except Exception as e:
+        print(f"⚠️  Could not cache image {url}: {e}")
+        return False
+
+
+_background = None
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def request_thumbnail(url, cache=None):
+    """Cache the thumbnail of ``url`` on a background thread.
+
+    Does nothing if the image failed recently or a download is already
+    under way, so repeated requests for a missing image cost one fetch.
+
+    Returns:
+        The Future of the download, or None if none was started
+    """
+    global _background
+    cache = cache or get_image_cache()
+    if cache.is_failed(url):
+        return None
+    with _pending_lock:
+        if url in _pending:
+            return None
+        _pending.add(url)
+        if _background is None:
+            _background = ThreadPoolExecutor(
+                max_workers=IMAGE_BACKGROUND_WORKERS, thread_name_prefix="thumbnail"
+            )
+
+    def run():
+        try:
+            return _try_cache_image(url, cache)
+        finally:
+            with _pending_lock:
+                _pending.discard(url)
+
+    return _background.submit(run)
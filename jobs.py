@@ -0,0 +1,222 @@
+"""Persistent job queue stored in the jobs table of the news database.
+
+Each pipeline stage (scrape a source, score a batch of headlines, fetch an
+article page, summarise an article) is one job. Workers claim jobs with a
+lease: a job whose worker dies is handed out again once the lease expires.
+Failed jobs are retried with exponential backoff until JOB_MAX_ATTEMPTS,
+then kept with status 'failed' and their last error.
+
+Jobs may carry a key; while a job with that key is queued or running,
+enqueueing another one with the same key does nothing. This keeps the
+scheduler and retries from piling up duplicate work.
+"""
+
+import json
+import time
+from collections import namedtuple
+
+from config import (
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BASE,
+    JOB_RETRY_MAX,
+    JOB_RETENTION_DAYS,
+    JOB_PRIORITIES,
+)
+from database import get_connection, transaction
+
+Job = namedtuple("Job", "id kind payload attempts max_attempts")
+
+
+def enqueue(kind, payload, key=None, priority=None, delay=0.0, max_attempts=JOB_MAX_ATTEMPTS):
+    """Add one job to the queue.
+
+    Args:
+        kind: Job kind (a key of worker.HANDLERS)
+        payload: JSON-serialisable job arguments
+        key: Optional deduplication key
+        priority: Higher runs first (defaults to JOB_PRIORITIES[kind])
+        delay: Seconds before the job may run
+        max_attempts: Attempts before the job is marked failed
+
+    Returns:
+        The new job's id, or None if an active job with ``key`` exists
+    """
+    return enqueue_many(kind, [(payload, key, priority)], delay, max_attempts)[0]
+
+
+def enqueue_many(kind, items, delay=0.0, max_attempts=JOB_MAX_ATTEMPTS):
+    """Add several jobs of one kind in a single transaction.
+
+    Args:
+        kind: Job kind
+        items: Iterable of (payload, key, priority) tuples; priority may be
+            None for the kind's default
+        delay: Seconds before the jobs may run
+        max_attempts: Attempts before a job is marked failed
+
+    Returns:
+        List of new job ids, None where an active job with the key exists
+    """
+    now = time.time()
+    default_priority = JOB_PRIORITIES.get(kind, 0)
+    ids = []
+    with transaction() as conn:
+        for payload, key, priority in items:
+            cur = conn.execute(
+                """
+                INSERT OR IGNORE INTO jobs (kind, key, payload, priority, max_attempts,
+                    available_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    kind,
+                    key,
+                    json.dumps(payload),
+                    default_priority if priority is None else priority,
+                    max_attempts,
+                    now + delay,
+                    now,
+                ),
+            )
+            ids.append(cur.lastrowid if cur.rowcount else None)
+    return ids
+
+
+def claim(worker, kinds=None, lease_seconds=JOB_LEASE_SECONDS):
+    """Lease the highest-priority runnable job to ``worker``.
+
+    A job is runnable when it is queued and due, or running with an expired
+    lease. Jobs whose lease expired on their final attempt are marked failed
+    instead of being handed out again.
+
+    Args:
+        worker: Identifier of the claiming worker
+        kinds: Optional iterable of job kinds this worker handles
+        lease_seconds: How long the worker may take before the job is
+            handed out again
+
+    Returns:
+        A Job, or None if nothing is runnable
+    """
+    now = time.time()
+    kinds_filter = json.dumps(list(kinds)) if kinds is not None else None
+    with transaction() as conn:
+        conn.execute(
+            """
+            UPDATE jobs SET status = 'failed', finished_at = ?,
+                last_error = 'lease expired on the final attempt'
+            WHERE status = 'running' AND available_at <= ? AND attempts >= max_attempts
+            """,
+            (now, now),
+        )
+        row = conn.execute(
+            """
+            UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                available_at = ?, worker = ?
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE status IN ('queued', 'running')
+                  AND available_at <= ?
+                  AND (? IS NULL OR kind IN (SELECT value FROM json_each(?)))
+                ORDER BY priority DESC, available_at
+                LIMIT 1
+            )
+            RETURNING id, kind, payload, attempts, max_attempts
+            """,
+            (now + lease_seconds, worker, now, kinds_filter, kinds_filter),
+        ).fetchone()
+    if row is None:
+        return None
+    job_id, kind, payload, attempts, max_attempts = row
+    return Job(job_id, kind, json.loads(payload), attempts, max_attempts)
+
+
+def complete(job, worker):
+    """Mark a claimed job done.
+
+    Returns:
+        False if the worker no longer held the job's lease
+    """
+    with transaction() as conn:
+        cur = conn.execute(
+            """
+            UPDATE jobs SET status = 'done', finished_at = ?, last_error = NULL
+            WHERE id = ? AND status = 'running' AND worker = ?
+            """,
+            (time.time(), job.id, worker),
+        )
+        return cur.rowcount == 1
+
+
+def fail(job, worker, error):
+    """Record a failed attempt; retry with backoff or give up.
+
+    Returns:
+        True if the job will be retried
+    """
+    now = time.time()
+    retry = job.attempts < job.max_attempts
+    delay = min(JOB_RETRY_MAX, JOB_RETRY_BASE * 2 ** (job.attempts - 1))
+    with transaction() as conn:
+        conn.execute(
+            """
+            UPDATE jobs SET status = ?, available_at = ?, last_error = ?, finished_at = ?
+            WHERE id = ? AND status = 'running' AND worker = ?
+            """,
+            (
+                "queued" if retry else "failed",
+                now + delay,
+                str(error)[:2000],
+                None if retry else now,
+                job.id,
+                worker,
+            ),
+        )
+    return retry
+
+
+def outstanding():
+    """Return how many jobs are running or queued and already due."""
+    with get_connection() as conn:
+        row = conn.execute(
+            """
+            SELECT COUNT(*) FROM jobs
+            WHERE status = 'running' OR (status = 'queued' AND available_at <= ?)
+            """,
+            (time.time(),),
+        ).fetchone()
+    return row[0]
+
+
+def last_enqueued(key):
+    """Return when the most recent job with ``key`` was created, or None."""
+    with get_connection() as conn:
+        row = conn.execute("SELECT MAX(created_at) FROM jobs WHERE key = ?", (key,)).fetchone()
+    return row[0]
+
+
+def purge(older_than_days=JOB_RETENTION_DAYS):
+    """Delete done and failed jobs that finished more than the given days ago.
+
+    Returns:
+        Number of jobs deleted
+    """
+    cutoff = time.time() - older_than_days * 86400
+    with transaction() as conn:
+        cur = conn.execute(
+            "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)
+        )
+        return cur.rowcount
+
+
+def stats():
+    """Return {kind: {status: count}} for every job in the queue."""
+    with get_connection() as conn:
+        rows = conn.execute(
+            "SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status"
+        ).fetchall()
+    counts = {}
+    for kind, status, count in rows:
+        counts.setdefault(kind, {})[status] = count
+    return counts
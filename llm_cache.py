@@ -0,0 +1,163 @@
+"""Persistent SQLite cache for model responses keyed by a content hash."""
+
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_DB,
+    LLM_CACHE_MAX_BYTES,
+    LLM_CACHE_MAX_AGE_DAYS,
+)
+from database import get_pool
+
+# Eviction sums sizes over the whole table, so run it every this many stores
+_EVICT_EVERY = 50
+
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+_stats_lock = threading.Lock()
+_initialised = set()
+
+
+def _bump(key, amount=1):
+    with _stats_lock:
+        _stats[key] += amount
+
+
+@contextmanager
+def _transaction(db_path=None):
+    """Borrow a pooled connection to the cache and run one transaction on it.
+
+    The cache shares database.py's WAL connection pools, so repeated lookups
+    reuse connections instead of opening one per call.
+    """
+    db_path = db_path or LLM_CACHE_DB
+    with get_pool(db_path).connection() as conn:
+        if db_path not in _initialised:
+            with conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                    )"""
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)"
+                )
+            _initialised.add(db_path)
+        with conn:
+            yield conn
+
+
+def make_key(model, prompt_version, text):
+    """Build the cache key for a model call.
+
+    Args:
+        model: Model name
+        prompt_version: Identifier of the prompt template, bumped when it changes
+        text: The variable input appended to the prompt
+
+    Returns:
+        Hex SHA-256 digest of the three parts
+    """
+    digest = hashlib.sha256()
+    for part in (model, prompt_version, text):
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def get(key, db_path=None):
+    """Return the cached response for ``key`` or None on a miss."""
+    if not LLM_CACHE_ENABLED:
+        return None
+    min_created = time.time() - LLM_CACHE_MAX_AGE_DAYS * 86400
+    with _transaction(db_path) as conn:
+        row = conn.execute(
+            "SELECT response FROM llm_cache WHERE key = ? AND created_at >= ?",
+            (key, min_created),
+        ).fetchone()
+        if row is None:
+            _bump("misses")
+            return None
+        conn.execute(
+            "UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key)
+        )
+    _bump("hits")
+    return row[0]
+
+
+def put(key, response, db_path=None):
+    """Store a response under ``key``; empty responses are not cached."""
+    if not LLM_CACHE_ENABLED or not response:
+        return
+    now = time.time()
+    with _transaction(db_path) as conn:
+        conn.execute(
+            """
+            INSERT INTO llm_cache (key, response, size, created_at, last_used)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                response=excluded.response,
+                size=excluded.size,
+                created_at=excluded.created_at,
+                last_used=excluded.last_used
+            """,
+            (key, response, len(response.encode("utf-8")), now, now),
+        )
+    _bump("writes")
+    if _stats["writes"] % _EVICT_EVERY == 0:
+        evict(db_path)
+
+
+def evict(db_path=None, max_bytes=LLM_CACHE_MAX_BYTES, max_age_days=LLM_CACHE_MAX_AGE_DAYS):
+    """Drop expired entries, then least recently used ones above the size cap.
+
+    Returns:
+        Number of entries removed
+    """
+    removed = 0
+    with _transaction(db_path) as conn:
+        cur = conn.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?",
+            (time.time() - max_age_days * 86400,),
+        )
+        removed += cur.rowcount
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total > max_bytes:
+            excess = total - max_bytes
+            victims = []
+            for key, size in conn.execute(
+                "SELECT key, size FROM llm_cache ORDER BY last_used"
+            ):
+                victims.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            conn.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+            removed += len(victims)
+    _bump("evictions", removed)
+    return removed
+
+
+def cache_stats():
+    """Return a copy of the hit/miss/write/eviction counters and hit rate."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def reset_cache_stats():
+    """Reset the per-run counters."""
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
@@ -1,41 +1,156 @@
 """Main orchestration script for the tech news scraper."""
 
-from config import news_dict, DEFAULT_RELEVANCE_THRESHOLD
-from database import create_database, save_to_db
-from scraper import scrape_articles
-from ai_analyzer import analyse_with_ai
-from content_processor import process_relevant_articles
+from config import (
+    DEFAULT_RELEVANCE_THRESHOLD,
+    INCREMENTAL_MODE,
+    URL_REFRESH_TTL_HOURS,
+    DEDUPE_ENABLED,
+    IMAGE_CACHE_ENABLED,
+    REPLAY_MODE,
+)
+from database import (
+    create_database,
+    save_to_db,
+    save_title_duplicates,
+    fetch_known_urls,
+    find_duplicate_titles,
+    retrieve_feed_images,
+)
+from llm_cache import cache_stats, reset_cache_stats, evict
+import metrics
+
+# scraper, ai_analyzer and content_processor pull in requests, bs4 and openai,
+# so they are imported inside the functions below: importing this module (or
+# starting the web server from it) stays cheap until a run actually begins.
 
 
 def main():
-    """Main function to orchestrate the news scraping and analysis workflow."""
+    """Main function to orchestrate the news scraping and analysis workflow.
+
+    Every run writes a metrics report (see metrics.py); set
+    TECH_NEWS_PROFILE=cprofile or pyinstrument to profile it as well.
+    """
+    from scraper import reset_fetch_stats
+
     create_database()
-    articles_data = scrape_articles(news_dict)
+    reset_fetch_stats()
+    reset_cache_stats()
+    metrics.reset()
+    with metrics.profiled():
+        _run_pipeline()
+    _report_metrics()
+    print("\n✓ Workflow complete!")
+
+
+def _run_pipeline():
+    from scraper import scrape_articles
+    from ai_analyzer import score_titles
+    from content_processor import process_relevant_articles
+
+    with metrics.stage("scrape"):
+        articles_data = scrape_articles()
+    metrics.count("headlines_scraped", len(articles_data))
 
     if not articles_data:
         print("No articles were scraped")
         return
 
-    # Mix articles from different sources evenly
-    tc_articles = [
-        (t, d) for t, d in articles_data.items() if d["source"] == "tech-crunch"
-    ]
-    wired_articles = [
-        (t, d) for t, d in articles_data.items() if d["source"] == "wired"
-    ]
+    # One bulk lookup decides which URLs need any work at all. In incremental
+    # mode, URLs stored within the TTL are skipped before fetching or scoring.
+    titles_by_url = {info["url"]: title for title, info in articles_data.items()}
+    known = fetch_known_urls(titles_by_url, ttl_hours=URL_REFRESH_TTL_HOURS)
+    if INCREMENTAL_MODE:
+        skipped = [url for url, row in known.items() if row["fresh"]]
+        for url in skipped:
+            del titles_by_url[url]
+        print(f"Skipping {len(skipped)} already-known URLs")
 
-    # Take 5 from each source
-    mixed_titles = []
-    mixed_titles.extend([t for t, d in tc_articles[:5]])
-    mixed_titles.extend([t for t, d in wired_articles[:5]])
+    # Score headlines that have no stored score yet; only new ones cost tokens
+    new_titles = {
+        url: title
+        for url, title in titles_by_url.items()
+        if url not in known or known[url]["relevance"] is None
+    }
 
-    parsed_response = analyse_with_ai(mixed_titles)
-    save_to_db(parsed_response, articles_data)
+    # Near-duplicate headlines (syndicated or lightly reworded copies of a
+    # recent stored or earlier story) are not scored; they are stored
+    # pointing at their original once it has been saved
+    duplicate_articles = []
+    if DEDUPE_ENABLED:
+        duplicates = find_duplicate_titles(
+            {url: title for url, title in new_titles.items() if url not in known}
+        )
+        for url, original in duplicates.items():
+            title = titles_by_url.pop(url)
+            del new_titles[url]
+            duplicate_articles.append(
+                {**articles_data[title], "title": title, "duplicate_of": original}
+            )
+        metrics.count("duplicate_headlines", len(duplicates))
+        print(f"Skipping {len(duplicates)} near-duplicate headlines")
+    print(
+        f"Scoring {len(new_titles)} new headlines "
+        f"({len(titles_by_url) - len(new_titles)} stale URLs to refresh)"
+    )
+    with metrics.stage("score"):
+        scores = score_titles(new_titles)
+    for url, row in known.items():
+        if row["relevance"] is not None:
+            scores.setdefault(url, row["relevance"])
+
+    scored_articles = [
+        {**articles_data[title], "title": title, "relevance": scores[url]}
+        for url, title in titles_by_url.items()
+        if url in scores
+    ]
+    saved = save_to_db(scored_articles)
+    save_title_duplicates(duplicate_articles)
 
     # Process relevant articles: fetch content, generate summaries, save to DB
-    process_relevant_articles(threshold=DEFAULT_RELEVANCE_THRESHOLD)
+    with metrics.stage("process"):
+        published = process_relevant_articles(threshold=DEFAULT_RELEVANCE_THRESHOLD)
 
-    print("\n✓ Workflow complete!")
+    # Thumbnails for /img/<id> of the articles this run touched; older ones
+    # are filled in by /img itself. Replay runs have no network to use.
+    if IMAGE_CACHE_ENABLED and not REPLAY_MODE:
+        from images import cache_article_images
+
+        images = retrieve_feed_images(set(saved) | set(published))
+        with metrics.stage("images"):
+            cached = cache_article_images(images)
+        print(f"Image thumbnails: {cached} of {len(images)} cached")
+
+
+def _report_metrics():
+    from scraper import fetch_stats
+
+    print(
+        f"\nArticle pages: {fetch_stats['fetches']} fetches, "
+        f"{fetch_stats['parses']} parses"
+    )
+    evict()
+    stats = cache_stats()
+    print(
+        f"LLM cache: {stats['hits']} hits, {stats['misses']} misses "
+        f"({stats['hit_rate']:.0%} hit rate), {stats['evictions']} evicted"
+    )
+    metrics.count("llm_cache_hits", stats["hits"])
+    metrics.count("llm_cache_misses", stats["misses"])
+
+    report = metrics.write_report()
+    print(f"\nRun {report['run_id']} took {report['wall_seconds']:.1f}s:")
+    for name, stage in sorted(report["stages"].items(), key=lambda item: -item[1]["seconds"]):
+        print(
+            f"  {name:<18} {stage['seconds']:>8.2f}s {stage['calls']:>6} calls "
+            f"{stage['errors']:>4} errors"
+        )
+    totals = report["totals"]
+    print(
+        f"  HTTP: {totals['http_requests']} requests, {totals['http_bytes'] / 1e6:.1f} MB; "
+        f"LLM: {totals['llm_calls']} calls, {totals['llm_tokens']} tokens"
+    )
+    if report.get("report_path"):
+        print(f"  Report: {report['report_path']}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,217 @@
+"""Per-run pipeline metrics: stage timings, counters and an optional profiler.
+
+Instrumented code reports into the process-wide RunMetrics object through
+the module functions (stage(), timed(), record(), record_host()). main()
+resets it at the start of a run and writes the report at the end, as JSON
+and as a row in the pipeline_runs table.
+
+Stages may nest (e.g. "http" inside "save") and may run on several threads
+at once, so stage seconds are cumulative busy time, not wall time; the
+report's "wall_seconds" is the run's elapsed time.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from config import METRICS_DIR, PROFILER
+
+
+def _stage_counters():
+    return {"calls": 0, "errors": 0, "seconds": 0.0, "bytes": 0, "tokens": 0}
+
+
+def _host_counters():
+    return {"requests": 0, "errors": 0, "seconds": 0.0, "bytes": 0, "not_modified": 0}
+
+
+class RunMetrics:
+    """Thread-safe counters for one pipeline run."""
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stages = defaultdict(_stage_counters)
+        self.hosts = defaultdict(_host_counters)
+        self.counts = defaultdict(int)
+
+    def add(self, stage, seconds=0.0, calls=0, errors=0, nbytes=0, tokens=0):
+        with self._lock:
+            counters = self.stages[stage]
+            counters["seconds"] += seconds
+            counters["calls"] += calls
+            counters["errors"] += errors
+            counters["bytes"] += nbytes
+            counters["tokens"] += tokens
+
+    def add_host(self, host, seconds=0.0, nbytes=0, error=False, not_modified=False):
+        with self._lock:
+            counters = self.hosts[host]
+            counters["requests"] += 1
+            counters["seconds"] += seconds
+            counters["bytes"] += nbytes
+            counters["errors"] += int(error)
+            counters["not_modified"] += int(not_modified)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counts[name] += amount
+
+    def report(self):
+        """Return the run's metrics as a JSON-serialisable dictionary."""
+        with self._lock:
+            stages = {name: dict(c, seconds=round(c["seconds"], 4)) for name, c in self.stages.items()}
+            hosts = {name: dict(c, seconds=round(c["seconds"], 4)) for name, c in self.hosts.items()}
+            counts = dict(self.counts)
+        return {
+            "started_at": self.started_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "wall_seconds": round(time.perf_counter() - self._started, 4),
+            "stages": stages,
+            "hosts": hosts,
+            "counts": counts,
+            "totals": {
+                "http_requests": sum(h["requests"] for h in hosts.values()),
+                "http_bytes": sum(h["bytes"] for h in hosts.values()),
+                "llm_calls": stages.get("llm", {}).get("calls", 0),
+                "llm_tokens": stages.get("llm", {}).get("tokens", 0),
+                "errors": sum(s["errors"] for s in stages.values()),
+            },
+        }
+
+
+_current = RunMetrics()
+
+
+def current():
+    """Return the RunMetrics of the run in progress."""
+    return _current
+
+
+def reset():
+    """Start a fresh set of metrics for a new run."""
+    global _current
+    _current = RunMetrics()
+    return _current
+
+
+@contextmanager
+def stage(name):
+    """Time a block as one call of ``name``; an exception counts as an error."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        _current.add(name, seconds=time.perf_counter() - started, calls=1, errors=1)
+        raise
+    _current.add(name, seconds=time.perf_counter() - started, calls=1)
+
+
+def timed(name):
+    """Decorator form of stage()."""
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def record(name, **counters):
+    """Add nbytes/tokens/errors (or extra calls/seconds) to a stage."""
+    _current.add(name, **counters)
+
+
+def record_host(url, seconds, nbytes=0, error=False, not_modified=False):
+    """Record one HTTP request against the URL's host."""
+    _current.add_host(
+        urlparse(url).hostname or "", seconds, nbytes, error=error, not_modified=not_modified
+    )
+
+
+def count(name, amount=1):
+    """Bump a free-form run counter (e.g. articles scraped)."""
+    _current.count(name, amount)
+
+
+def write_report(directory=METRICS_DIR):
+    """Write the current report as JSON and store it in pipeline_runs.
+
+    Returns:
+        The report dictionary
+    """
+    from database import save_pipeline_run
+
+    report = _current.report()
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        stamp = _current.started_at.strftime("%Y%m%dT%H%M%SZ")
+        path = os.path.join(directory, f"run-{stamp}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        report["report_path"] = path
+    report["run_id"] = save_pipeline_run(report)
+    return report
+
+
+@contextmanager
+def profiled(mode=PROFILER, directory=METRICS_DIR):
+    """Optionally profile a block with cProfile or pyinstrument.
+
+    Args:
+        mode: "cprofile", "pyinstrument" or empty for no profiling
+        directory: Where the .prof / .html output is written
+    """
+    mode = (mode or "").lower()
+    if not mode:
+        yield
+        return
+
+    stamp = _current.started_at.strftime("%Y%m%dT%H%M%SZ")
+    os.makedirs(directory or ".", exist_ok=True)
+
+    if mode == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("pyinstrument is not installed; falling back to cProfile")
+            mode = "cprofile"
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                path = os.path.join(directory or ".", f"run-{stamp}.html")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+                print(f"Profile written to {path}")
+            return
+
+    if mode != "cprofile":
+        print(f"Unknown profiler {mode!r}; running without profiling")
+        yield
+        return
+
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        path = os.path.join(directory or ".", f"run-{stamp}.prof")
+        profiler.dump_stats(path)
+        print(f"Profile written to {path} (view with: python -m pstats {path})")
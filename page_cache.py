@@ -0,0 +1,107 @@
+"""On-disk cache of raw HTTP responses with conditional-request validators."""
+
+import hashlib
+import json
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from config import PAGE_CACHE_DIR, PAGE_CACHE_MAX_BYTES
+from disk_cache import LRUDirectory
+
+
+class PageCache:
+    """Size-capped LRU cache of response bodies keyed by URL.
+
+    Each entry is a ``<hash>.body`` file with the raw bytes and a
+    ``<hash>.json`` file with the URL, encoding and the ETag/Last-Modified
+    validators.
+    """
+
+    def __init__(self, directory=PAGE_CACHE_DIR, max_bytes=PAGE_CACHE_MAX_BYTES):
+        self.files = LRUDirectory(directory, max_bytes, ".body", companions=(".json",))
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def load(self, url, stop_at=None):
+        """Return the cached entry for ``url`` as a dict, or None.
+
+        The entry has 'url', 'encoding', 'headers' and 'body' keys, plus
+        'stop_at' if the body was cut short at that marker. Such a partial
+        entry is only returned to callers reading up to the same marker.
+        """
+        key = self._key(url)
+        meta = self.files.read(key, ".json")
+        body = self.files.read(key)
+        if meta is None or body is None:
+            return None
+        try:
+            entry = json.loads(meta)
+        except ValueError:
+            return None
+        if entry.get("stop_at") not in (None, stop_at):
+            return None
+        entry["body"] = body
+        self.files.touch(key)
+        return entry
+
+    def touch(self, url):
+        """Mark an entry as recently used."""
+        self.files.touch(self._key(url))
+
+    def store(self, url, response, stop_at=None):
+        """Store a successful response body and its validators.
+
+        Args:
+            url: Requested URL
+            response: requests.Response with a 200 status
+            stop_at: Marker the body was cut short at, if it was
+        """
+        headers = {
+            key: response.headers[key]
+            for key in ("ETag", "Last-Modified", "Content-Type")
+            if key in response.headers
+        }
+        meta = {"url": url, "encoding": response.encoding, "headers": headers}
+        if stop_at:
+            meta["stop_at"] = stop_at
+        self.files.write(
+            self._key(url),
+            {".json": json.dumps(meta).encode("utf-8"), ".body": response.content},
+        )
+
+    def evict(self):
+        """Delete least recently used entries until under the size cap.
+
+        Returns:
+            Number of entries removed
+        """
+        return self.files.evict()
+
+
+def validator_headers(entry):
+    """Return conditional request headers for a cached entry."""
+    if not entry:
+        return {}
+    headers = {}
+    cached = entry.get("headers", {})
+    if cached.get("ETag"):
+        headers["If-None-Match"] = cached["ETag"]
+    if cached.get("Last-Modified"):
+        headers["If-Modified-Since"] = cached["Last-Modified"]
+    return headers
+
+
+def to_response(entry):
+    """Build a requests.Response from a cached entry."""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = entry["url"]
+    response.headers = CaseInsensitiveDict(entry.get("headers", {}))
+    response.encoding = entry.get("encoding")
+    response._content = entry["body"]
+    return response
@@ -0,0 +1,46 @@
+"""Thread-safe token bucket used to pace outgoing requests."""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Token bucket rate limiter.
+
+    Tokens refill continuously at ``rate`` per second up to ``capacity``.
+    ``acquire`` blocks until a token is available, so callers on many threads
+    are spread out to the configured rate.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """Create a bucket.
+
+        Args:
+            rate: Tokens added per second; 0 or None disables limiting
+            capacity: Maximum burst size (defaults to max(1, rate))
+        """
+        self.rate = rate or 0
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        """Block until ``tokens`` tokens are available and consume them."""
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,55 @@
+"""In-process LRU cache of rendered web responses keyed by data version."""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Bounded LRU mapping of request keys to rendered response bodies.
+
+    Each entry remembers the data version it was rendered at; a lookup with a
+    newer version is a miss, so a pipeline commit invalidates everything
+    without the cache having to be told which entries changed.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0, "evictions": 0}
+
+    def get(self, key, version):
+        """Return (body, mimetype, etag) for ``key`` at ``version``, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1:]
+
+    def put(self, key, version, body, mimetype):
+        """Store a rendered body and return its strong ETag."""
+        etag = hashlib.sha1(body).hexdigest()
+        with self._lock:
+            self._entries[key] = (version, body, mimetype, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return etag
+
+    def record_not_modified(self):
+        with self._lock:
+            self.stats["not_modified"] += 1
+
+    def snapshot(self):
+        """Return counters, entry count and hit rate."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
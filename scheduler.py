@@ -0,0 +1,74 @@
+"""Scheduler daemon: queues a scrape of each source on its own interval.
+
+Usage:
+    python scheduler.py [--tick 30] [--once]
+
+Every tick, each source whose last scrape_source job was queued at least
+``poll_interval`` seconds ago (SOURCE_POLL_INTERVAL unless the source sets
+its own) gets a new one; worker.py does the rest. The schedule is read back
+from the jobs table, so restarting the scheduler, or running two, does not
+scrape a source early. Old finished jobs are purged once an hour.
+
+--once queues whatever is due and exits, for use from cron.
+"""
+
+import argparse
+import threading
+import time
+
+from database import create_database
+from sources import all_sources
+import jobs
+
+PURGE_EVERY_SECONDS = 3600
+
+
+def schedule_due(now=None):
+    """Queue a scrape_source job for every source that is due.
+
+    Returns:
+        Names of the sources queued
+    """
+    now = time.time() if now is None else now
+    queued = []
+    for source in all_sources():
+        key = f"scrape:{source.name}"
+        last = jobs.last_enqueued(key)
+        if last is not None and now - last < source.poll_interval:
+            continue
+        if jobs.enqueue("scrape_source", {"source": source.name}, key=key) is not None:
+            queued.append(source.name)
+    return queued
+
+
+def run(tick=30.0, once=False, stop=None):
+    """Schedule scrapes every ``tick`` seconds until ``stop`` is set."""
+    create_database()
+    stop = stop or threading.Event()
+    last_purge = 0.0
+    while True:
+        queued = schedule_due()
+        if queued:
+            print(f"Queued scrapes: {', '.join(queued)}")
+        if time.time() - last_purge >= PURGE_EVERY_SECONDS:
+            purged = jobs.purge()
+            if purged:
+                print(f"Purged {purged} finished jobs")
+            last_purge = time.time()
+        if once or stop.wait(tick):
+            return
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tick", type=float, default=30.0, help="seconds between checks")
+    parser.add_argument("--once", action="store_true", help="queue due scrapes and exit")
+    args = parser.parse_args()
+    try:
+        run(args.tick, args.once)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
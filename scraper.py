@@ -1,183 +1,353 @@
 """Web scraping functionality for fetching articles from news sites."""
 
-from urllib.parse import urlparse, urljoin
+import re
+import threading
+import xml.etree.ElementTree as ET
+from collections import Counter
+from urllib.parse import urljoin
 import requests
-from bs4 import BeautifulSoup
-from config import (
-    REQUEST_HEADERS,
-    REQUEST_TIMEOUT,
-    TECHCRUNCH_CLASS,
-    TECHCRUNCH_CLASS_PARAGRAPH,
-    TECHCRUNCH_CLASS_CATEGORY,
-    TECHCRUNCH_CLASS_IMAGE,
-    WIRED_CLASS,
-    WIRED_PARAGRAPH_CLASS,
-    WIRED_CATEGORY_CLASS,
-    WIRED_IMAGE,
-)
+from bs4 import BeautifulSoup, SoupStrainer
+from fetcher import get_fetcher
+from config import SELECTIVE_PARSING, INGEST_MODE
+from sources import all_sources, get_source, source_for_url
+from feeds import parse_feed
+from dedupe import canonical_url
+import metrics
+
+
+def _scrape_listing(source):
+    """Fetch one front page and return (title, info) pairs for its headlines."""
+    try:
+        response = get_fetcher().get(source.listing_url)
+    except requests.RequestException as e:
+        print(f"Error scraping {source.name}: {e}")
+        return []
+
+    with metrics.stage("parse"):
+        soup = BeautifulSoup(response.text, "html.parser")
+        elements = source.link_selector.select(soup)
+
+    # Store each article with its source
+    found = []
+    for article in elements:
+        title = article.get_text(strip=True)
+        href = article.get("href")
+
+        # Skip bad entries
+        if not title or not href:
+            continue
+
+        if isinstance(href, (list, tuple)):
+            if not href:
+                continue
+            href = href[0]
+
+        href = canonical_url(source.normalise_url(str(href)))
+
+        found.append((title, {"url": href, "source": source.name}))
+
+    return found
+
+
+def _scrape_feed(source):
+    """Read headlines from a source's feed; fall back to its front page.
+
+    Feed entries may already carry category, publish time and image, which
+    are passed along so the article page does not have to be fetched for them.
+    """
+    try:
+        response = get_fetcher().get(source.feed_url)
+        with metrics.stage("parse"):
+            entries = parse_feed(response.content)
+    except (requests.RequestException, ET.ParseError) as e:
+        print(f"Error reading feed for {source.name}: {e}")
+        entries = []
+
+    if not entries:
+        return _scrape_listing(source)
+
+    found = []
+    for entry in entries:
+        info = {"url": canonical_url(source.normalise_url(entry["url"])), "source": source.name}
+        for key in ("category", "published_at", "image_url", "image_alt"):
+            if entry[key]:
+                info[key] = entry[key]
+        found.append((entry["title"], info))
+    return found
+
 
+def _scrape_source(source, mode):
+    if mode == "feed" and source.feed_url:
+        return _scrape_feed(source)
+    return _scrape_listing(source)
 
-def scrape_articles(news_dict):
+
+def scrape_articles(sources=None, mode=INGEST_MODE):
     """Scrape article titles and URLs from news websites.
 
+    Sources are fetched concurrently through the shared fetcher.
+
     Args:
-        news_dict: Dictionary mapping website names to URLs
+        sources: Iterable of Source objects (defaults to every registered
+            source)
+        mode: "feed" to read RSS/Atom/sitemaps where a source has one,
+            "html" to scrape front pages
 
     Returns:
-        Dictionary mapping article titles to their URLs
+        Dictionary mapping article titles to their url and source, plus any
+        of 'category', 'published_at', 'image_url' and 'image_alt' supplied
+        by a feed
     """
+    sources = list(sources) if sources is not None else all_sources()
+    listings = get_fetcher().map(lambda s: _scrape_source(s, mode), sources)
+
     articles_data = {}
-    for website, url in news_dict.items():
-        try:
-            response = requests.get(
-                url, headers=REQUEST_HEADERS, timeout=REQUEST_TIMEOUT
-            )
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            if website == "tech-crunch":
-                elements = soup.find_all("a", class_=TECHCRUNCH_CLASS)
-            elif website == "wired":
-                elements = soup.find_all("a", class_=WIRED_CLASS)
-            else:
-                print(f"Unknown website: {website}")
-                continue
+    for found in listings:
+        for title, info in found:
+            articles_data[title] = info
 
-            # Store each article with its source
-            for article in elements:
-                title = article.get_text(strip=True)
-                href = article.get("href")
+    return articles_data
 
-                # Skip bad entries
-                if not title or not href:
-                    continue
 
-                if isinstance(href, (list, tuple)):
-                    if not href:
-                        continue
-                    href = href[0]
+# Per-run counters so we can confirm each article page is downloaded and
+# parsed exactly once.
+fetch_stats = Counter()
+_fetch_stats_lock = threading.Lock()
 
-                href = str(href)
 
-                if website == "wired":
-                    href = urljoin("https://www.wired.com", href)
+def reset_fetch_stats():
+    """Reset the per-run fetch/parse counters."""
+    with _fetch_stats_lock:
+        fetch_stats.clear()
 
-                articles_data[title] = {"url": href, "source": website}
 
-        except requests.RequestException as e:
-            print(f"Error scraping {website}: {e}")
+def _count(key):
+    with _fetch_stats_lock:
+        fetch_stats[key] += 1
 
-    return articles_data
 
+# Every site-specific target on an article page is an <a>, <p> or <img>;
+# parsing only those (and their children) skips scripts, styles and layout.
+_ARTICLE_STRAINER = SoupStrainer(["a", "p", "img"])
 
-def fetch_article_content(url):
-    """Fetch the full content of an article from its URL."""
-    try:
-        response = requests.get(url, headers=REQUEST_HEADERS, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
 
-        domain = urlparse(url).netloc
+def _select_one(selector, soup):
+    return selector.select_one(soup) if selector is not None else None
 
-        if "techcrunch.com" in domain:
-            paragraphs = soup.find_all("p", class_=TECHCRUNCH_CLASS_PARAGRAPH)
-        elif "wired.com" in domain:
-            paragraphs = soup.find_all("p", class_=WIRED_PARAGRAPH_CLASS)
-        else:
-            paragraphs = []
 
-        # Fallback if nothing found
-        if not paragraphs:
-            paragraphs = soup.select("article p") or soup.find_all("p")
+# Containers whose paragraphs are page furniture, not article text; only
+# used by the generic fallback, a source's own selector is trusted as is
+_BOILERPLATE_TAGS = {"nav", "header", "footer", "aside", "form", "figcaption"}
+_BOILERPLATE_ATTRS = re.compile(
+    r"comment|related|newsletter|promo|share|social|subscribe|sidebar|footer|advert|caption",
+    re.IGNORECASE,
+)
 
-        content = " ".join(p.get_text(strip=True) for p in paragraphs)
-        return content
 
-    except requests.RequestException as e:
-        print(f"Error fetching article content from {url}: {e}")
-        return ""
+def _in_boilerplate(element):
+    for parent in element.parents:
+        if parent.name in _BOILERPLATE_TAGS:
+            return True
+        attrs = " ".join(parent.get("class") or []) + " " + str(parent.get("id") or "")
+        if _BOILERPLATE_ATTRS.search(attrs):
+            return True
+    return False
 
 
-def fetch_article_category(url):
-    """Fetch the category of an article from its URL."""
-    try:
-        response = requests.get(url, headers=REQUEST_HEADERS, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
+def _extract_content(soup, source):
+    """Extract the article body text from a parsed article page.
 
-        domain = urlparse(url).netloc
-        category_el = None
+    Paragraphs are separated by blank lines so content_prep can tell them
+    apart.
+    """
+    paragraphs = []
+    if source is not None and source.paragraph_selector is not None:
+        paragraphs = source.paragraph_selector.select(soup)
 
-        if "techcrunch.com" in domain:
-            # original behaviour
-            category_el = soup.find("a", class_=TECHCRUNCH_CLASS_CATEGORY)
-        elif "wired.com" in domain:
-            # <a class="... rubric__link ..."><span class="rubric__name">Security</span></a>
-            category_el = soup.find("a", class_=WIRED_CATEGORY_CLASS)
+    # Fallback if nothing found: article paragraphs, minus comments, related
+    # stories, newsletter boxes and the like
+    if not paragraphs:
+        candidates = soup.select("article p") or soup.find_all("p")
+        paragraphs = [p for p in candidates if not _in_boilerplate(p)] or candidates
 
-        if category_el is None:
-            # generic fallback (other sites / future)
-            category_el = soup.select_one(
-                "a[rel='category tag'], a[href*='/category/'], a[href*='/tag/']"
-            )
+    texts = (p.get_text(" ", strip=True) for p in paragraphs)
+    return "\n\n".join(text for text in texts if text)
 
-        if category_el:
-            return category_el.get_text(strip=True)
 
-        return None
+def _extract_category(soup, source):
+    """Extract the category name from a parsed article page."""
+    category_el = None
+    if source is not None:
+        category_el = _select_one(source.category_selector, soup)
 
-    except requests.RequestException as e:
-        print(f"Error fetching article category from {url}: {e}")
-        return None
+    if category_el is None:
+        # generic fallback (other sites / future)
+        category_el = soup.select_one(
+            "a[rel='category tag'], a[href*='/category/'], a[href*='/tag/']"
+        )
 
+    if category_el:
+        return category_el.get_text(strip=True)
+
+    return None
 
-def fetch_article_image(url):
-    """Fetch the featured image URL and alt text from an article URL.
+
+def _extract_image(soup, source, url):
+    """Extract the featured image URL and alt text from a parsed article page.
 
     Returns:
         (image_url, image_alt) tuple; values may be None.
     """
-    try:
-        response = requests.get(url, headers=REQUEST_HEADERS, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
+    image = None
+    if source is not None:
+        image = _select_one(source.image_selector, soup)
+
+    # Fallback: first image in <article>
+    if image is None:
+        image = soup.select_one("article img")
+
+    if image:
+        # src might be a special BS4 type or even a list
+        raw_src = image.get("src") or image.get("data-src") or ""
+        alt = image.get("alt")
+
+        # If it's a list/tuple, take the first value
+        if isinstance(raw_src, (list, tuple)):
+            if not raw_src:
+                return None, alt
+            raw_src = raw_src[0]
 
-        domain = urlparse(url).netloc
-        image = None
+        # Force it to a plain string so Pylance is happy
+        src = str(raw_src)
 
-        if "techcrunch.com" in domain:
-            image = soup.find("img", class_=TECHCRUNCH_CLASS_IMAGE)
-        elif "wired.com" in domain:
-            image = soup.find("img", class_=WIRED_IMAGE)
+        # Normalise relative / protocol-relative URLs
+        if src.startswith("//"):
+            src = "https:" + src
+        elif src.startswith("/"):
+            src = urljoin(url, src)
 
-        # Fallback: first image in <article>
-        if image is None:
-            image = soup.select_one("article img")
+        return src, alt
 
-        if image:
-            # src might be a special BS4 type or even a list
-            raw_src = image.get("src") or image.get("data-src") or ""
-            alt = image.get("alt")
+    return None, None
 
-            # If it's a list/tuple, take the first value
-            if isinstance(raw_src, (list, tuple)):
-                if not raw_src:
-                    return None, alt
-                raw_src = raw_src[0]
 
-            # Force it to a plain string so Pylance is happy
-            src = str(raw_src)
+def _resolve_source(url, source=None):
+    """Accept a Source, a source name or None (look up by URL)."""
+    if isinstance(source, str):
+        source = get_source(source)
+    return source or source_for_url(url)
 
-            # Normalise relative / protocol-relative URLs
-            if src.startswith("//"):
-                src = "https:" + src
-            elif src.startswith("/"):
-                src = urljoin(url, src)
 
-            return src, alt
+@metrics.timed("parse")
+def extract_article_page(html, url, selective=SELECTIVE_PARSING, source=None):
+    """Extract category, content and image from an article page's HTML.
 
-        return None, None
+    In selective mode the page is first parsed keeping only <a>, <p> and
+    <img> elements. If the source's own paragraph and image selectors both
+    match, that reduced tree gives the same result as a full parse. Otherwise
+    the fallbacks need the surrounding <article>, so the page is parsed again
+    in full.
+
+    Args:
+        html: Page markup
+        url: Page URL (used to resolve relative image URLs)
+        selective: Try the reduced parse first
+        source: Source or source name; looked up from the URL when omitted
+
+    Returns:
+        Dictionary with 'category', 'content', 'image_url' and 'image_alt'
+    """
+    source = _resolve_source(url, source)
+    soup = None
+
+    if (
+        selective
+        and source is not None
+        and source.paragraph_selector is not None
+        and source.image_selector is not None
+    ):
+        _count("parses")
+        reduced = BeautifulSoup(html, "html.parser", parse_only=_ARTICLE_STRAINER)
+        if source.paragraph_selector.select_one(
+            reduced
+        ) and source.image_selector.select_one(reduced):
+            soup = reduced
+
+    if soup is None:
+        _count("parses")
+        soup = BeautifulSoup(html, "html.parser")
+
+    image_url, image_alt = _extract_image(soup, source, url)
+    return {
+        "category": _extract_category(soup, source),
+        "content": _extract_content(soup, source),
+        "image_url": image_url,
+        "image_alt": image_alt,
+    }
+
+
+def fetch_article_page(url, source=None):
+    """Download and parse an article page once and extract everything we store.
 
+    Args:
+        url: Article URL
+        source: Optional Source or source name; looked up from the URL when
+            omitted
+
+    Returns:
+        Dictionary with 'category', 'content', 'image_url' and 'image_alt'
+        keys; values are None (or "" for content) when unavailable.
+    """
+    page = {"category": None, "content": "", "image_url": None, "image_alt": None}
+    if not url:
+        return page
+
+    source = _resolve_source(url, source)
+    stop_marker = source.stop_marker if source is not None else None
+
+    try:
+        _count("fetches")
+        response = get_fetcher().get(url, stop_at=stop_marker)
     except requests.RequestException as e:
-        print(f"Error fetching article image from {url}: {e}")
-        return None, None
+        print(f"Error fetching article page {url}: {e}")
+        return page
+
+    return extract_article_page(response.text, url, source=source)
+
+
+def fetch_article_pages(urls, sources=None):
+    """Fetch and extract several article pages concurrently.
+
+    Args:
+        urls: Iterable of article URLs (duplicates are fetched once)
+        sources: Optional dictionary mapping URLs to source names
+
+    Returns:
+        Dictionary mapping each URL to its fetch_article_page() result
+    """
+    sources = sources or {}
+    unique_urls = list(dict.fromkeys(u for u in urls if u))
+    pages = get_fetcher().map(
+        lambda url: fetch_article_page(url, sources.get(url)), unique_urls
+    )
+    return dict(zip(unique_urls, pages))
+
+
+def fetch_article_content(url):
+    """Fetch the full content of an article from its URL."""
+    return fetch_article_page(url)["content"]
+
+
+def fetch_article_category(url):
+    """Fetch the category of an article from its URL."""
+    return fetch_article_page(url)["category"]
+
+
+def fetch_article_image(url):
+    """Fetch the featured image URL and alt text from an article URL.
+
+    Returns:
+        (image_url, image_alt) tuple; values may be None.
+    """
+    page = fetch_article_page(url)
+    return page["image_url"], page["image_alt"]
@@ -1,33 +1,135 @@
-from flask import Flask, jsonify, render_template, request
-import sqlite3
-from config import DB_NEWS, DEFAULT_RELEVANCE_THRESHOLD
+from flask import Flask, Response, abort, jsonify, make_response, redirect, render_template, request
+from config import (
+    DEFAULT_RELEVANCE_THRESHOLD,
+    RESPONSE_CACHE_SIZE,
+    DATA_VERSION_CHECK_SECONDS,
+    SEARCH_MAX_LIMIT,
+    IMAGE_CACHE_ENABLED,
+    IMAGE_MAX_AGE,
+)
+from database import export_articles, get_connection, get_data_version
+from export import FORMATS, build_filters, format_chunks
+from images import get_image_cache, image_version, request_thumbnail, sniff_mimetype
+from response_cache import ResponseCache
+from text_utils import first_sentence  # noqa: F401 (re-exported)
+import base64
+import functools
+import hashlib
+import html
+import json
 import re
+import sqlite3
+import threading
+import time
 
 
 app = Flask(__name__)
 
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+
+# The data version is re-read at most once per DATA_VERSION_CHECK_SECONDS so
+# a burst of cached requests does not touch SQLite at all.
+_version_state = {"value": None, "checked_at": 0.0}
+_version_lock = threading.Lock()
+
+
+def current_data_version():
+    with _version_lock:
+        now = time.monotonic()
+        if (
+            _version_state["value"] is None
+            or now - _version_state["checked_at"] >= DATA_VERSION_CHECK_SECONDS
+        ):
+            _version_state["value"] = get_data_version()
+            _version_state["checked_at"] = now
+        return _version_state["value"]
+
+
+def cached_view(view):
+    """Serve a view from the response cache with strong ETags.
+
+    Responses are keyed by path and query parameters and reused until the
+    pipeline bumps the data version. Requests whose If-None-Match matches
+    get a 304 without a body.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        version = current_data_version()
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        cached = response_cache.get(key, version)
+        if cached is None:
+            fresh = make_response(view(*args, **kwargs))
+            if fresh.status_code != 200:
+                return fresh
+            body = fresh.get_data()
+            etag = response_cache.put(key, version, body, fresh.mimetype)
+        else:
+            body, _, etag = cached
+            fresh = None
+
+        if request.if_none_match.contains(etag):
+            response_cache.record_not_modified()
+            response = Response(status=304)
+        else:
+            response = fresh or Response(body, mimetype=cached[1])
+        response.set_etag(etag)
+        return response
 
-def first_sentence(summary):
-    text = (summary or "").strip()
-    if not text:
-        return ""
-    return re.split(r"(?<=[.!?])\s+", text, maxsplit=1)[0]
+    return wrapper
 
 
-def fetch_articles_from_db(min_relevance=5.0, limit=None, offset=0):
+def encode_cursor(created_at, article_id):
+    """Build an opaque pagination cursor from a row's sort key."""
+    raw = json.dumps([created_at, article_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return the (created_at, id) sort key in a cursor, or None if invalid."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, article_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(created_at, str) or not isinstance(article_id, int):
+        return None
+    return created_at, article_id
+
+
+def fetch_articles_from_db(min_relevance=5.0, limit=None, offset=0, after=None):
+    """Fetch rows from the precomputed feed table, newest first.
+
+    Args:
+        min_relevance: Minimum relevance score
+        limit: Maximum number of rows (None for all)
+        offset: Rows to skip (legacy offset pagination)
+        after: Optional (created_at, id) key; only rows after it are returned
+
+    Returns:
+        List of row tuples starting with id, in feed order
+    """
+    # created_at is stored as 'YYYY-MM-DD HH:MM:SS', which sorts correctly as
+    # text, so ordering on the bare column lets idx_feed_created_at serve it
     query = (
-        "SELECT title, url, summary, created_at, category, image_url, image_alt "
-        "FROM articles "
+        "SELECT article_id, title, url, summary, created_at, category, image_url, "
+        "image_alt, first_sentence "
+        "FROM feed "
         "WHERE relevance_score >= ? "
-        "ORDER BY datetime(created_at) DESC"
     )
     params = [min_relevance]
 
+    if after is not None:
+        query += "AND (created_at, article_id) < (?, ?) "
+        params.extend(after)
+
+    query += "ORDER BY created_at DESC, article_id DESC"
+
     if limit is not None:
         query += " LIMIT ? OFFSET ?"
         params.extend([limit, offset])
 
-    with sqlite3.connect(DB_NEWS) as conn:
+    with get_connection() as conn:
         cur = conn.cursor()
         cur.execute(query, params)
         articles = cur.fetchall()
@@ -35,21 +137,138 @@ def fetch_articles_from_db(min_relevance=5.0, limit=None, offset=0):
 
 
 def serialize_article(row):
-    title, url, summary, created_at, category, image_url, image_alt = row
+    (
+        article_id,
+        title,
+        url,
+        summary,
+        created_at,
+        category,
+        image_url,
+        image_alt,
+        short_summary,
+    ) = row
     return {
+        "id": article_id,
         "title": title,
         "url": url,
         "summary": summary,
-        "first_sentence": first_sentence(summary),
+        "first_sentence": short_summary,
         "created_at": created_at,
         "category": category,
         "image_url": image_url,
+        "image_src": image_src(article_id, image_url),
         "image_alt": image_alt,
     }
 
 
+def image_src(article_id, image_url):
+    """Local URL of an article's image (see /img/<id>), or None."""
+    if not image_url:
+        return None
+    return f"/img/{article_id}?v={image_version(image_url)}"
+
+
+# Highlight markers are private-use characters so that the matched text can be
+# HTML-escaped before they are turned into <mark> tags
+_MARK_OPEN = "\ue000"
+_MARK_CLOSE = "\ue001"
+_SEARCH_TERM = re.compile(r"\w+")
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query matching every word.
+
+    Each word is quoted, so FTS5 operators and punctuation in user input are
+    treated as plain text. A trailing '*' keeps prefix matching on the last
+    word.
+
+    Returns:
+        The MATCH expression, or None if the text contains no words
+    """
+    terms = _SEARCH_TERM.findall(text or "")
+    if not terms:
+        return None
+    query = " ".join(f'"{term}"' for term in terms)
+    if text.rstrip().endswith("*"):
+        query += " *"
+    return query
+
+
+def _render_highlight(text):
+    if text is None:
+        return None
+    return (
+        html.escape(text)
+        .replace(_MARK_OPEN, "<mark>")
+        .replace(_MARK_CLOSE, "</mark>")
+    )
+
+
+def search_articles(match, min_relevance=5.0, limit=10, offset=0):
+    """Rank published articles against an FTS5 query.
+
+    Title matches weigh most, then summary, category and body (bm25 column
+    weights). Matches are ranked first and highlights are only built for the
+    returned page, since snippet() has to read and re-tokenize each body.
+
+    Args:
+        match: FTS5 MATCH expression (see build_match_query)
+        min_relevance: Minimum relevance score
+        limit: Maximum number of rows
+        offset: Rows to skip
+
+    Returns:
+        List of feed row tuples (as fetch_articles_from_db) followed by the
+        highlighted title, a highlighted body snippet and the bm25 score
+    """
+    with get_connection() as conn:
+        ranked = conn.execute(
+            """
+            SELECT articles_fts.rowid, bm25(articles_fts, 10.0, 4.0, 2.0, 1.0) AS score
+            FROM articles_fts
+            JOIN feed AS f ON f.article_id = articles_fts.rowid
+            WHERE articles_fts MATCH ? AND f.relevance_score >= ?
+            ORDER BY score, articles_fts.rowid DESC
+            LIMIT ? OFFSET ?
+            """,
+            (match, min_relevance, limit, offset),
+        ).fetchall()
+        if not ranked:
+            return []
+        scores = dict(ranked)
+        rows = conn.execute(
+            f"""
+            SELECT f.article_id, f.title, f.url, f.summary, f.created_at, f.category,
+                   f.image_url, f.image_alt, f.first_sentence,
+                   highlight(articles_fts, 0, '{_MARK_OPEN}', '{_MARK_CLOSE}'),
+                   snippet(articles_fts, -1, '{_MARK_OPEN}', '{_MARK_CLOSE}', '…', 24)
+            FROM articles_fts
+            JOIN feed AS f ON f.article_id = articles_fts.rowid
+            WHERE articles_fts MATCH ?
+              AND articles_fts.rowid IN (SELECT value FROM json_each(?))
+            """,
+            (match, json.dumps(list(scores))),
+        ).fetchall()
+    by_id = {row[0]: row for row in rows}
+    return [
+        by_id[article_id] + (score,)
+        for article_id, score in ranked
+        if article_id in by_id
+    ]
+
+
+def next_cursor_for(rows):
+    """Return the cursor continuing after the last of ``rows``."""
+    if not rows:
+        return None
+    last = rows[-1]
+    return encode_cursor(last[4], last[0])
+
+
 # Serve index.html using Jinja and pass articles
 @app.route("/")
+@cached_view
 def index():
     initial_limit = 5
     articles = fetch_articles_from_db(limit=initial_limit)
@@ -58,10 +277,12 @@ def index():
         "index.html",
         articles=articles_list,
         initial_limit=initial_limit,
+        next_cursor=next_cursor_for(articles) or "",
     )
 
 
 @app.route("/api/articles")
+@cached_view
 def api_articles():
     try:
         limit = int(request.args.get("limit", 5))
@@ -80,21 +301,157 @@ def api_articles():
     except ValueError:
         min_relevance = DEFAULT_RELEVANCE_THRESHOLD
 
+    # A cursor takes precedence over offset; offset paging is kept for
+    # existing clients but costs O(offset) per page
+    after = None
+    cursor = request.args.get("cursor")
+    if cursor:
+        after = decode_cursor(cursor)
+        if after is None:
+            return jsonify({"error": "invalid cursor"}), 400
+        offset = 0
+
     # Fetch one extra record to know if there are more
     rows = fetch_articles_from_db(
-        min_relevance=min_relevance, limit=limit + 1, offset=offset
+        min_relevance=min_relevance, limit=limit + 1, offset=offset, after=after
     )
     has_more = len(rows) > limit
-    articles = [serialize_article(row) for row in rows[:limit]]
+    rows = rows[:limit]
+    articles = [serialize_article(row) for row in rows]
 
     return jsonify(
         {
             "articles": articles,
             "has_more": has_more,
             "next_offset": offset + len(articles),
+            "next_cursor": next_cursor_for(rows) if has_more else None,
+        }
+    )
+
+
+@app.route("/api/search")
+@cached_view
+def api_search():
+    match = build_match_query(request.args.get("q", ""))
+    if match is None:
+        return jsonify({"error": "missing query"}), 400
+
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), SEARCH_MAX_LIMIT)
+    except ValueError:
+        limit = 10
+
+    try:
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except ValueError:
+        offset = 0
+
+    try:
+        min_relevance = float(
+            request.args.get("min_relevance", DEFAULT_RELEVANCE_THRESHOLD)
+        )
+    except ValueError:
+        min_relevance = DEFAULT_RELEVANCE_THRESHOLD
+
+    try:
+        rows = search_articles(
+            match, min_relevance=min_relevance, limit=limit + 1, offset=offset
+        )
+    except sqlite3.OperationalError as e:
+        # e.g. a database that predates the search index
+        return jsonify({"error": f"search unavailable: {e}"}), 503
+
+    has_more = len(rows) > limit
+    results = []
+    for row in rows[:limit]:
+        article = serialize_article(row[:9])
+        article["title_highlighted"] = _render_highlight(row[9])
+        article["snippet"] = _render_highlight(row[10])
+        article["score"] = -row[11]
+        results.append(article)
+
+    return jsonify(
+        {
+            "results": results,
+            "has_more": has_more,
+            "next_offset": offset + len(results),
         }
     )
 
 
+@app.route("/img/<int:article_id>")
+def article_image(article_id):
+    """Serve an article's thumbnail from the local image cache.
+
+    The ?v= parameter changes whenever the image does, so responses can be
+    cached for IMAGE_MAX_AGE. Without a cached thumbnail the request is
+    redirected to the original image while it is fetched in the background.
+    """
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT image_url FROM feed WHERE article_id = ?", (article_id,)
+        ).fetchone()
+    if row is None or not row[0]:
+        abort(404)
+    image_url = row[0]
+
+    data = get_image_cache().load(image_url) if IMAGE_CACHE_ENABLED else None
+    if data is None:
+        if IMAGE_CACHE_ENABLED:
+            request_thumbnail(image_url)
+        response = redirect(image_url, code=302)
+        # Short-lived, so the thumbnail is picked up once it exists
+        response.headers["Cache-Control"] = "public, max-age=300"
+        return response
+
+    response = Response(data, mimetype=sniff_mimetype(data) or "application/octet-stream")
+    response.set_etag(hashlib.blake2b(data, digest_size=16).hexdigest())
+    response.headers["Cache-Control"] = f"public, max-age={IMAGE_MAX_AGE}, immutable"
+    return response.make_conditional(request)
+
+
+@app.route("/api/export")
+def api_export():
+    """Stream the archive as NDJSON or CSV (see export.py for the filters).
+
+    Rows are read and sent in batches over a dedicated connection, so the
+    response is never built in memory. Not cached: exports are one-off and
+    arbitrarily large.
+    """
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(sorted(FORMATS))}"}), 400
+
+    flags = ("1", "true", "yes")
+    try:
+        filters = build_filters(
+            since_id=request.args.get("since_id"),
+            since=request.args.get("since"),
+            date_from=request.args.get("from"),
+            date_to=request.args.get("until"),
+            sources=request.args.getlist("source"),
+            categories=request.args.getlist("category"),
+            min_relevance=request.args.get("min_relevance"),
+            include_all=request.args.get("all", "").lower() in flags,
+            include_content=request.args.get("content", "").lower() in flags,
+            limit=request.args.get("limit"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    chunks = format_chunks(export_articles(**filters), fmt, filters["include_content"])
+    response = Response(chunks, mimetype=FORMATS[fmt])
+    response.headers["Content-Disposition"] = f'attachment; filename="articles.{fmt}"'
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@app.route("/api/cache-stats")
+def api_cache_stats():
+    stats = response_cache.snapshot()
+    stats["data_version"] = current_data_version()
+    return jsonify(stats)
+
+
 if __name__ == "__main__":
     app.run(debug=False, port=5001)
@@ -0,0 +1,133 @@
+"""Registry of news sources declared in config.SOURCES."""
+
+import json
+from urllib.parse import urljoin, urlparse
+
+import soupsieve
+
+from config import SOURCES, SOURCES_FILE, SOURCE_POLL_INTERVAL
+
+
+class Source:
+    """One news site: where to find headlines and how to read its articles.
+
+    CSS selectors are compiled once when the source is created.
+
+    Attributes:
+        name: Identifier stored in the articles.source column
+        listing_url: Front page scraped for headline links
+        feed_url: Optional RSS/Atom feed or news sitemap with headlines
+        domains: Host suffixes whose article URLs belong to this source
+        base_url: Base for resolving relative headline links
+            (defaults to listing_url)
+        link_selector: Headline <a> elements on the listing page
+        paragraph_selector: Body paragraphs on an article page
+        category_selector: Category link on an article page
+        image_selector: Featured image on an article page
+        rate_limit: Requests per second to this source's hosts (None = default)
+        max_connections: Concurrent requests per host (None = default)
+        stop_marker: Optional marker after which article bodies are not read
+        poll_interval: Seconds between scheduled scrapes
+            (defaults to config.SOURCE_POLL_INTERVAL)
+    """
+
+    def __init__(
+        self,
+        name,
+        listing_url,
+        link_selector,
+        paragraph_selector=None,
+        category_selector=None,
+        image_selector=None,
+        domains=(),
+        base_url=None,
+        rate_limit=None,
+        max_connections=None,
+        stop_marker=None,
+        feed_url=None,
+        poll_interval=None,
+    ):
+        self.name = name
+        self.listing_url = listing_url
+        self.feed_url = feed_url
+        self.domains = tuple(domains) or (urlparse(listing_url).hostname,)
+        self.base_url = base_url or listing_url
+        self.link_selector = soupsieve.compile(link_selector)
+        self.paragraph_selector = _compile(paragraph_selector)
+        self.category_selector = _compile(category_selector)
+        self.image_selector = _compile(image_selector)
+        self.rate_limit = rate_limit
+        self.max_connections = max_connections
+        self.stop_marker = stop_marker
+        self.poll_interval = poll_interval or SOURCE_POLL_INTERVAL
+
+    def owns(self, url):
+        """Return True if ``url`` is hosted on one of this source's domains."""
+        host = urlparse(url).hostname or ""
+        return any(host == d or host.endswith("." + d) for d in self.domains)
+
+    def normalise_url(self, href):
+        """Resolve a headline link to an absolute article URL."""
+        return urljoin(self.base_url, href)
+
+    def hosts(self):
+        """Hosts whose request limits this source configures."""
+        hosts = {urlparse(self.listing_url).hostname, *self.domains}
+        if self.feed_url:
+            hosts.add(urlparse(self.feed_url).hostname)
+        return hosts
+
+
+def _compile(selector):
+    return soupsieve.compile(selector) if selector else None
+
+
+def _load_configs():
+    if SOURCES_FILE:
+        with open(SOURCES_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    return SOURCES
+
+
+_registry = {}
+
+
+def register(source):
+    """Add or replace a source in the registry."""
+    _registry[source.name] = source
+    return source
+
+
+def load_sources(configs=None):
+    """(Re)build the registry from a list of source dictionaries.
+
+    Args:
+        configs: Source dictionaries (defaults to config.SOURCES or the
+            TECH_NEWS_SOURCES file)
+
+    Returns:
+        List of registered Source objects
+    """
+    _registry.clear()
+    return [register(Source(**cfg)) for cfg in (configs or _load_configs())]
+
+
+def all_sources():
+    """Return every registered source in declaration order."""
+    return list(_registry.values())
+
+
+def get_source(name):
+    """Return the source called ``name`` or None."""
+    return _registry.get(name)
+
+
+def source_for_url(url):
+    """Return the source whose domains include ``url``'s host, or None."""
+    for source in _registry.values():
+        if source.owns(url):
+            return source
+    return None
+
+
+load_sources()
@@ -8,6 +8,7 @@ document.addEventListener('DOMContentLoaded', () => {
   const emptyState = document.getElementById('empty-state')
   const pageSize = parseInt(container.dataset.initialLimit || '5', 10)
   let nextOffset = parseInt(container.dataset.nextOffset || '0', 10)
+  let nextCursor = container.dataset.nextCursor || ''
   let hasMore = (container.dataset.hasMore || 'false') === 'true'
   let loading = false
 
@@ -83,9 +84,14 @@ document.addEventListener('DOMContentLoaded', () => {
 
     const media = document.createElement('div')
     media.className = 'article-media'
-    if (article.image_url) {
+    if (article.image_src) {
       const img = document.createElement('img')
-      img.src = article.image_url
+      // Local thumbnail (/img/<id>); redirects to the original until cached
+      img.src = article.image_src
+      img.width = 210
+      img.height = 140
+      img.loading = 'lazy'
+      img.decoding = 'async'
       img.alt = article.image_alt || article.title || 'Article image'
       img.className = 'article-image'
       media.appendChild(img)
@@ -109,14 +115,16 @@ document.addEventListener('DOMContentLoaded', () => {
     if (loadingIndicator) loadingIndicator.style.display = 'block'
 
     try {
-      const response = await fetch(
-        `/api/articles?limit=${pageSize}&offset=${nextOffset}`
-      )
+      const page = nextCursor
+        ? `cursor=${encodeURIComponent(nextCursor)}`
+        : `offset=${nextOffset}`
+      const response = await fetch(`/api/articles?limit=${pageSize}&${page}`)
       if (!response.ok) throw new Error('Failed to load articles')
 
       const data = await response.json()
       appendArticles(data.articles || [])
       nextOffset = data.next_offset ?? nextOffset + (data.articles?.length || 0)
+      nextCursor = data.next_cursor || ''
       hasMore = Boolean(data.has_more)
 
       if (emptyState && articlesList.children.length > 0) {
@@ -0,0 +1,30 @@
+import pytest
+
+import database
+import fetcher
+from fixture_server import FixtureServer
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh news.db in a temporary working directory (caches live there too)."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(database, "DB_NEWS", str(tmp_path / "news.db"))
+    database.create_database()
+    yield database.DB_NEWS
+    database.get_pool().close()
+
+
+@pytest.fixture(scope="session")
+def site():
+    """The benchmark fixture site, serving 8 articles on a local port."""
+    with FixtureServer(articles=8) as server:
+        yield server
+
+
+@pytest.fixture
+def http(monkeypatch):
+    """A fresh process-wide Fetcher without page cache, restored afterwards."""
+    client = fetcher.Fetcher(workers=4, rate_per_host=1000, cache=None, replay=False)
+    monkeypatch.setattr(fetcher, "_default_fetcher", client)
+    return client
@@ -0,0 +1,62 @@
+import pytest
+
+from content_prep import is_boilerplate, prepare_content
+
+LEAD = (
+    "The European Commission opened an inquiry into the streaming market on Tuesday, "
+    "asking five companies to hand over pricing data."
+)
+
+
+@pytest.mark.parametrize(
+    "paragraph",
+    [
+        "Comments from regulators suggest the inquiry will take at least a year.",
+        "Analysts expect many viewers to subscribe to Netflix's ad tier before prices rise.",
+        "Users who sign up for the beta get early access to the new scheduler.",
+        "Related research from MIT showed a 40% speedup.",
+        "Our newsletter readers asked about the data, and the company declined to comment.",
+        "The licence covers the code, but all rights reserved for the trademarks stay with Arm.",
+        "Read more carefully and the filing shows a second buyer.",
+    ],
+)
+def test_content_that_mentions_promo_words_is_kept(paragraph):
+    assert not is_boilerplate(paragraph)
+    prepared = prepare_content(f"{LEAD}\n\n{paragraph}")
+    assert paragraph in prepared.text
+
+
+@pytest.mark.parametrize(
+    "paragraph",
+    [
+        "Advertisement",
+        "Related: Apple's new chip explained",
+        "Read more: The state of open source in 2024",
+        "Image Credits: Getty Images",
+        "12 Comments",
+        "Sign up for our daily newsletter.",
+        "Subscribe now!",
+        "Subscribe to our weekly security newsletter for the latest news",
+        "© 2024 Example Media. All rights reserved.",
+        "We use cookies to improve your experience.",
+    ],
+)
+def test_standalone_promo_lines_are_dropped(paragraph):
+    assert is_boilerplate(paragraph)
+    prepared = prepare_content(f"{LEAD}\n\n{paragraph}")
+    assert prepared.text == LEAD
+    assert prepared.paragraphs_total == 1
+
+
+def test_repeated_paragraph_is_dropped():
+    quote = "“We will cooperate fully with the Commission,” a spokesperson said."
+    prepared = prepare_content(f"{LEAD}\n\n{quote}\n\nThe inquiry covers pricing.\n\n{quote}")
+    assert prepared.text.count(quote) == 1
+
+
+def test_long_article_is_fit_to_budget_keeping_the_lead():
+    filler = [f"Paragraph {i} repeats background about unrelated weather {i}." for i in range(200)]
+    prepared = prepare_content("\n\n".join([LEAD] + filler), title="Streaming inquiry", max_tokens=200)
+    assert prepared.tokens <= 200
+    assert prepared.text.startswith(LEAD)
+    assert prepared.original_tokens > prepared.tokens
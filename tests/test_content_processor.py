@@ -0,0 +1,87 @@
+import threading
+
+import content_processor
+import database
+from content_processor import _ContentClaims
+
+BODY = " ".join(f"word{i} scheduler kernel release notes" for i in range(60))
+
+
+def test_copy_waits_for_claimant_and_takes_over_when_it_fails(monkeypatch):
+    monkeypatch.setattr(content_processor, "find_duplicate_content", lambda *args: None)
+    claims = _ContentClaims()
+    assert claims.claim(1, BODY) is None
+
+    result = {}
+    waiter = threading.Thread(target=lambda: result.update(copy=claims.claim(2, BODY)))
+    waiter.start()
+    waiter.join(0.2)
+    assert waiter.is_alive()
+
+    claims.settle(1, published=False)
+    waiter.join(5)
+    assert result == {"copy": None}
+
+    claims.settle(2, published=True)
+    assert claims.claim(3, BODY) == 2
+
+
+def _store(title, url):
+    page = {"category": "AI", "content": BODY, "image_url": None, "image_alt": None}
+    database.save_to_db(
+        [{"title": title, "url": url, "source": "fixture", "relevance": 9}], pages={url: page}
+    )
+
+
+def test_failed_summary_leaves_no_duplicate_pointing_at_it(db, monkeypatch):
+    _store("Kernel release", "https://example.com/a")
+    _store("Kernel release (syndicated)", "https://example.org/b")
+    calls = []
+    lock = threading.Lock()
+
+    def summarise(text, client=None):
+        with lock:
+            calls.append(text)
+            return None if len(calls) == 1 else "A kernel was released."
+
+    monkeypatch.setattr(content_processor, "summarise_content", summarise)
+    published = content_processor.process_relevant_articles(threshold=5, workers=2)
+
+    with database.get_connection() as conn:
+        rows = conn.execute("SELECT id, summary, duplicate_of FROM articles ORDER BY id").fetchall()
+    assert len(calls) == 2
+    assert [row[0] for row in rows if row[1]] == published and len(published) == 1
+    assert all(duplicate_of is None for _, _, duplicate_of in rows)
+
+
+def test_copy_of_published_article_is_marked_duplicate(db, monkeypatch):
+    _store("Kernel release", "https://example.com/a")
+    _store("Kernel release (syndicated)", "https://example.org/b")
+    monkeypatch.setattr(
+        content_processor, "summarise_content", lambda text, client=None: "A kernel was released."
+    )
+    published = content_processor.process_relevant_articles(threshold=5, workers=2)
+
+    with database.get_connection() as conn:
+        duplicates = conn.execute(
+            "SELECT duplicate_of FROM articles WHERE duplicate_of IS NOT NULL"
+        ).fetchall()
+    assert len(published) == 1
+    assert duplicates == [(published[0],)]
+
+
+def test_stub_article_is_skipped_without_a_model_call(db, monkeypatch):
+    url = "https://example.com/stub"
+    page = {"category": "AI", "content": "Subscribe to keep reading.", "image_url": None,
+            "image_alt": None}
+    database.save_to_db(
+        [{"title": "Kernel release", "url": url, "source": "fixture", "relevance": 9}],
+        pages={url: page},
+    )
+    calls = []
+    monkeypatch.setattr(
+        content_processor, "summarise_content", lambda text, client=None: calls.append(text)
+    )
+
+    assert content_processor.process_relevant_articles(threshold=5) == []
+    assert calls == []
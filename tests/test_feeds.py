@@ -0,0 +1,168 @@
+import pytest
+
+import database
+import sources
+from feeds import parse_feed
+from scraper import fetch_stats, reset_fetch_stats, scrape_articles
+
+RSS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/">
+<channel><title>Example</title>
+<item>
+  <title>Kernel 6.20 released</title>
+  <link>https://example.com/kernel</link>
+  <category>Open Source</category>
+  <pubDate>Tue, 14 Oct 2026 09:30:00 +0200</pubDate>
+  <media:thumbnail url="https://example.com/kernel.jpg"/>
+</item>
+<item>
+  <title>Quantum milestone</title>
+  <link>https://example.com/quantum</link>
+  <media:content url="https://example.com/video.mp4" medium="video"/>
+  <media:content url="https://example.com/qubit.png" medium="image">
+    <media:description>A qubit</media:description>
+  </media:content>
+</item>
+<item>
+  <title>Enclosure only</title>
+  <link>https://example.com/enclosure</link>
+  <enclosure url="https://example.com/audio.mp3" type="audio/mpeg" length="1"/>
+  <enclosure url="https://example.com/photo.webp" type="image/webp" length="1"/>
+</item>
+<item><title>No link</title></item>
+</channel></rss>"""
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:media="http://search.yahoo.com/mrss/">
+<title>Example</title>
+<entry>
+  <title>Compiler news</title>
+  <link rel="self" href="https://example.com/feed/compiler"/>
+  <link href="https://example.com/compiler"/>
+  <category term="dev" label="Developers"/>
+  <category term="second"/>
+  <updated>2026-10-14T08:00:00Z</updated>
+  <published>2026-10-13T07:00:00Z</published>
+  <media:thumbnail url="https://example.com/compiler.png"/>
+</entry>
+<entry>
+  <title>Plain entry</title>
+  <link rel="alternate" href="https://example.com/plain"/>
+  <category term="security"/>
+  <updated>2026-10-14T10:15:00+02:00</updated>
+</entry>
+</feed>"""
+
+SITEMAP = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+        xmlns:news="http://www.google.com/schemas/sitemap-news/0.9"
+        xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">
+<url>
+  <loc>https://example.com/story</loc>
+  <news:news>
+    <news:publication><news:name>Example</news:name></news:publication>
+    <news:publication_date>2026-10-14T06:00:00Z</news:publication_date>
+    <news:title>Sitemap story</news:title>
+  </news:news>
+  <image:image><image:loc>https://example.com/story.jpg</image:loc>
+    <image:caption>Story photo</image:caption></image:image>
+</url>
+<url><loc>https://example.com/untitled</loc></url>
+</urlset>"""
+
+
+def test_rss_items():
+    assert parse_feed(RSS) == [
+        {
+            "title": "Kernel 6.20 released",
+            "url": "https://example.com/kernel",
+            "category": "Open Source",
+            "published_at": "2026-10-14 07:30:00",
+            "image_url": "https://example.com/kernel.jpg",
+            "image_alt": None,
+        },
+        {
+            "title": "Quantum milestone",
+            "url": "https://example.com/quantum",
+            "category": None,
+            "published_at": None,
+            "image_url": "https://example.com/qubit.png",
+            "image_alt": "A qubit",
+        },
+        {
+            "title": "Enclosure only",
+            "url": "https://example.com/enclosure",
+            "category": None,
+            "published_at": None,
+            "image_url": "https://example.com/photo.webp",
+            "image_alt": None,
+        },
+    ]
+
+
+def test_atom_entries():
+    compiler, plain = parse_feed(ATOM)
+    assert compiler["url"] == "https://example.com/compiler"
+    assert compiler["category"] == "Developers"
+    assert compiler["published_at"] == "2026-10-13 07:00:00"
+    assert compiler["image_url"] == "https://example.com/compiler.png"
+    assert plain["category"] == "security"
+    assert plain["published_at"] == "2026-10-14 08:15:00"
+    assert plain["image_url"] is None
+
+
+def test_news_sitemap():
+    assert parse_feed(SITEMAP) == [
+        {
+            "title": "Sitemap story",
+            "url": "https://example.com/story",
+            "category": None,
+            "published_at": "2026-10-14 06:00:00",
+            "image_url": "https://example.com/story.jpg",
+            "image_alt": "Story photo",
+        }
+    ]
+
+
+@pytest.fixture
+def fixture_source(site, monkeypatch):
+    source = sources.Source(**site.source_config())
+    monkeypatch.setitem(sources._registry, source.name, source)
+    return source
+
+
+def test_feed_mode_reads_the_feed(fixture_source, http, site):
+    articles = scrape_articles([fixture_source], mode="feed")
+    assert len(articles) == site.articles
+    urls = sorted(info["url"] for info in articles.values())
+    assert urls == sorted(f"{site.base_url}/article/{n}.html" for n in range(site.articles))
+    assert all("published_at" in info for info in articles.values())
+
+
+def test_missing_feed_falls_back_to_front_page(fixture_source, http, site, monkeypatch):
+    monkeypatch.setattr(fixture_source, "feed_url", f"{site.base_url}/missing.xml")
+    articles = scrape_articles([fixture_source], mode="feed")
+    assert len(articles) == site.articles
+    assert not any("published_at" in info for info in articles.values())
+
+
+def test_pages_are_fetched_only_for_fields_the_feed_lacks(db, fixture_source, http, site):
+    articles = scrape_articles([fixture_source], mode="feed")
+    scored = [{**info, "title": title, "relevance": 1} for title, info in articles.items()]
+    # Half of the entries come with category and image, as richer feeds do
+    for item in scored[::2]:
+        item.update(category="From feed", image_url="https://example.com/feed.jpg")
+
+    reset_fetch_stats()
+    database.save_to_db(scored)
+    assert fetch_stats["fetches"] == len(scored[1::2])
+
+    with database.get_connection() as conn:
+        rows = dict(conn.execute("SELECT url, category FROM articles").fetchall())
+        images = dict(conn.execute("SELECT url, image_url FROM articles").fetchall())
+    for item in scored[::2]:
+        assert rows[item["url"]] == "From feed"
+    for item in scored[1::2]:
+        n = int(item["url"].rsplit("/", 1)[1].split(".")[0])
+        assert rows[item["url"]] not in (None, "From feed")
+        assert images[item["url"]] == f"{site.base_url}/images/{n}.png"
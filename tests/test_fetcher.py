@@ -0,0 +1,233 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import fetcher
+from fetcher import Fetcher
+from page_cache import PageCache
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """/slow/<n>: 0.1 s delay; /flaky/<n>[?status=&retry_after=]: fails n times;
+    /big/<n>[?length=0]: n bytes, with or without Content-Length."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        state = self.server.state
+        path, _, query = self.path.partition("?")
+        params = dict(part.split("=") for part in query.split("&") if part)
+        host = self.headers["Host"].split(":")[0]
+        with state.lock:
+            state.requests.append((host, path, self.headers.get("If-None-Match")))
+            state.active[host] = state.active.get(host, 0) + 1
+            state.peak[host] = max(state.peak.get(host, 0), state.active[host])
+            state.failures[path] = state.failures.get(path, 0) + 1
+            attempt = state.failures[path]
+        try:
+            if path.startswith("/slow/"):
+                time.sleep(0.1)
+            if path.startswith("/flaky/") and attempt <= int(path.rsplit("/", 1)[1]):
+                self.send_response(int(params.get("status", 503)))
+                if "retry_after" in params:
+                    self.send_header("Retry-After", params["retry_after"])
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if path.startswith("/big/"):
+                self._send_big(int(path.rsplit("/", 1)[1]), params.get("length") != "0")
+                return
+            if path == "/missing":
+                self.send_error(404)
+                return
+            body = f"body of {path}".encode("utf-8")
+            etag = '"v1"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with state.lock:
+                state.active[host] -= 1
+
+    def _send_big(self, size, with_length):
+        self.send_response(200)
+        if with_length:
+            self.send_header("Content-Length", str(size))
+        else:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        chunk = b"x" * 65536
+        try:
+            for _ in range(size // len(chunk)):
+                self.wfile.write(chunk)
+                with self.server.state.lock:
+                    self.server.state.sent += len(chunk)
+        except OSError:
+            # The client hung up
+            pass
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    httpd.state = SimpleNamespace(
+        lock=threading.Lock(), requests=[], active={}, peak={}, failures={}, sent=0
+    )
+    threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True).start()
+    port = httpd.server_address[1]
+    yield SimpleNamespace(
+        state=httpd.state,
+        url=lambda path, host="127.0.0.1": f"http://{host}:{port}{path}",
+    )
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Backoff sleeps taken by the fetcher, without actually sleeping."""
+    taken = []
+    monkeypatch.setattr(
+        fetcher, "time", SimpleNamespace(perf_counter=time.perf_counter, sleep=taken.append)
+    )
+    monkeypatch.setattr(fetcher.random, "uniform", lambda low, high: high)
+    return taken
+
+
+def test_per_host_concurrency_cap(stub):
+    client = Fetcher(workers=8, max_per_host=2, rate_per_host=0, replay=False)
+    urls = [stub.url(f"/slow/{n}", host) for n in range(4) for host in ("127.0.0.1", "localhost")]
+
+    started = time.perf_counter()
+    responses = client.map(client.get, urls)
+    elapsed = time.perf_counter() - started
+
+    assert [r.text for r in responses] == [f"body of /slow/{n}" for n in range(4) for _ in "ab"]
+    assert stub.state.peak == {"127.0.0.1": 2, "localhost": 2}
+    # Both hosts in parallel, two requests at a time each: about 0.2 s
+    assert elapsed < 0.35
+
+
+def test_configure_host_overrides_cap(stub):
+    client = Fetcher(workers=8, max_per_host=4, rate_per_host=0, replay=False)
+    client.configure_host("localhost", max_connections=1)
+    client.map(client.get, [stub.url(f"/slow/{n}", "localhost") for n in range(3)])
+    assert stub.state.peak == {"localhost": 1}
+
+
+def test_connection_pool_fits_the_largest_host_cap(stub, caplog):
+    client = Fetcher(workers=8, max_per_host=2, rate_per_host=0, replay=False)
+    client.configure_host("localhost", max_connections=6)
+    client.map(client.get, [stub.url(f"/slow/{n}", "localhost") for n in range(6)])
+
+    assert stub.state.peak == {"localhost": 6}
+    assert "Connection pool is full" not in caplog.text
+    assert client.session.get_adapter("https://")._pool_maxsize == 6
+
+    # A cap configured after the session exists grows the pools too
+    client.configure_host("example.com", max_connections=10)
+    assert client.session.get_adapter("https://")._pool_maxsize == 10
+
+
+def test_server_errors_are_retried_with_backoff(stub, sleeps):
+    client = Fetcher(rate_per_host=0, replay=False, retries=2, backoff=0.5)
+    assert client.get(stub.url("/flaky/2")).text == "body of /flaky/2"
+    assert sleeps == [0.5, 1.0]
+
+    with pytest.raises(requests.HTTPError) as error:
+        client.get(stub.url("/flaky/3"))
+    assert error.value.response.status_code == 503
+    assert len([r for r in stub.state.requests if r[1] == "/flaky/3"]) == 3
+
+
+def test_retry_after_is_honoured(stub, sleeps):
+    client = Fetcher(rate_per_host=0, replay=False, retries=2, backoff=5)
+    assert client.get(stub.url("/flaky/1?status=429&retry_after=0.25")).status_code == 200
+    assert sleeps == [0.25]
+
+
+def test_client_errors_and_connection_failures(stub, sleeps):
+    client = Fetcher(rate_per_host=0, replay=False, retries=1, backoff=0.5)
+    with pytest.raises(requests.HTTPError):
+        client.get(stub.url("/missing"))
+    assert len(stub.state.requests) == 1
+    assert sleeps == []
+
+    # Nothing listens on port 9 (discard) here; the error is retried once
+    with pytest.raises(requests.ConnectionError):
+        client.get("http://127.0.0.1:9/")
+    assert sleeps == [0.5]
+
+
+def test_etag_revalidation_serves_cached_body(stub, tmp_path):
+    client = Fetcher(rate_per_host=0, replay=False, cache=PageCache(str(tmp_path / "pages")))
+    first = client.get(stub.url("/page"))
+    second = client.get(stub.url("/page"))
+
+    assert second.status_code == 200
+    assert second.content == first.content == b"body of /page"
+    assert [etag for _, _, etag in stub.state.requests] == [None, '"v1"']
+
+
+def test_replay_mode_never_uses_the_network(stub, tmp_path):
+    cache = PageCache(str(tmp_path / "pages"))
+    Fetcher(rate_per_host=0, replay=False, cache=cache).get(stub.url("/page"))
+
+    replay = Fetcher(cache=cache, replay=True)
+    assert replay.get(stub.url("/page")).text == "body of /page"
+    with pytest.raises(requests.ConnectionError):
+        replay.get(stub.url("/other"))
+    assert len(stub.state.requests) == 1
+
+
+def test_body_cut_short_is_cached_as_partial(site, tmp_path):
+    cache = PageCache(str(tmp_path / "pages"))
+    client = Fetcher(cache=cache, replay=False)
+    url = f"{site.base_url}/article/0.html"
+
+    partial = client.get(url, stop_at="</article>")
+    assert partial.text.endswith("</article>")
+    assert cache.load(url) is None
+    assert cache.load(url, "</article>")["body"] == partial.content
+
+    full = client.get(url)
+    assert len(full.content) > len(partial.content)
+    assert cache.load(url)["body"] == full.content
+    # A whole page also serves readers that stop early
+    assert cache.load(url, "</article>")["body"] == full.content
+
+
+def test_max_bytes_rejects_large_content_length(stub, sleeps):
+    client = Fetcher(rate_per_host=0, replay=False)
+    assert len(client.get(stub.url("/big/65536"), max_bytes=100000).content) == 65536
+
+    with pytest.raises(fetcher.ResponseTooLarge):
+        client.get(stub.url("/big/1048576"), max_bytes=100000)
+    assert sleeps == []
+
+
+def test_max_bytes_stops_reading_a_body_without_length(stub):
+    client = Fetcher(rate_per_host=0, replay=False)
+    size = 64 * 1024 * 1024
+    with pytest.raises(fetcher.ResponseTooLarge):
+        client.get(stub.url(f"/big/{size}?length=0"), max_bytes=100000)
+
+    time.sleep(0.2)
+    assert stub.state.sent < size // 4
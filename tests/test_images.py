@@ -0,0 +1,99 @@
+import os
+import time
+
+import pytest
+
+import database
+import images
+import server
+
+
+def _publish(url, image_url):
+    database.save_to_db(
+        [{"title": "Kernel news", "url": url, "source": "fixture", "relevance": 9,
+          "category": "AI", "image_url": image_url}],
+        fetch_pages=False,
+    )
+    with database.get_connection() as conn:
+        article_id = conn.execute("SELECT id FROM articles WHERE url = ?", (url,)).fetchone()[0]
+    database.write_summary_batch([], [(article_id, "A kernel was released.")])
+    return article_id
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def cache(db, tmp_path, monkeypatch):
+    cache = images.ImageCache(str(tmp_path / "images"))
+    monkeypatch.setattr(images, "_default_cache", cache)
+    monkeypatch.setattr(server, "response_cache", server.ResponseCache(0))
+    return cache
+
+
+@pytest.fixture
+def client():
+    return server.app.test_client()
+
+
+def test_first_request_redirects_and_fetches_thumbnail(cache, http, site, client):
+    image_url = f"{site.base_url}/images/1.png"
+    article_id = _publish(f"{site.base_url}/article/1.html", image_url)
+
+    response = client.get(f"/img/{article_id}")
+    assert response.status_code == 302
+    assert response.headers["Location"] == image_url
+
+    _wait_for(lambda: cache.load(image_url) is not None)
+    response = client.get(f"/img/{article_id}")
+    assert response.status_code == 200
+    assert response.mimetype in ("image/webp", "image/jpeg")
+    assert len(response.data) < 20000
+
+
+def test_cached_thumbnail_is_served_with_etag(cache, http, site, client):
+    image_url = f"{site.base_url}/images/2.png"
+    article_id = _publish(f"{site.base_url}/article/2.html", image_url)
+    assert images.cache_article_images(database.retrieve_feed_images([article_id])) == 1
+
+    response = client.get(f"/img/{article_id}")
+    assert response.status_code == 200
+    assert "immutable" in response.headers["Cache-Control"]
+    assert response.data == cache.load(image_url)
+
+    etag = response.headers["ETag"]
+    response = client.get(f"/img/{article_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_unknown_article_is_404(cache, client):
+    assert client.get("/img/12345").status_code == 404
+
+
+def test_unusable_image_is_not_refetched_until_marker_expires(cache, http, site, client):
+    image_url = f"{site.base_url}/images/999.png"
+    article_id = _publish(f"{site.base_url}/article/3.html", image_url)
+
+    assert images.cache_image(image_url, cache) is False
+    assert cache.is_failed(image_url)
+    assert images.request_thumbnail(image_url, cache) is None
+    assert client.get(f"/img/{article_id}").status_code == 302
+
+    marker = cache.files.path(images.cache_key(image_url), ".failed")
+    expired = time.time() - cache.retry_seconds - 1
+    os.utime(marker, (expired, expired))
+    assert not cache.is_failed(image_url)
+    assert not os.path.exists(marker)
+
+
+def test_oversized_image_is_not_downloaded(cache, http, site, monkeypatch):
+    monkeypatch.setattr(images, "IMAGE_MAX_DOWNLOAD_BYTES", 100)
+    image_url = f"{site.base_url}/images/4.png"
+
+    assert images.cache_image(image_url, cache) is False
+    assert cache.is_failed(image_url)
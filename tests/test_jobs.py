@@ -0,0 +1,58 @@
+import time
+
+import jobs
+
+
+def test_claim_takes_highest_priority_due_job(db):
+    jobs.enqueue("fetch_article", {"url": "a"}, priority=1)
+    jobs.enqueue("fetch_article", {"url": "b"}, priority=5)
+    jobs.enqueue("fetch_article", {"url": "c"}, priority=9, delay=60)
+
+    job = jobs.claim("w1")
+    assert job.payload == {"url": "b"} and job.attempts == 1
+    assert jobs.claim("w1", kinds=["score_batch"]) is None
+
+
+def test_duplicate_key_is_ignored_while_active(db):
+    assert jobs.enqueue("cache_image", {"url": "a"}, key="image:a") is not None
+    assert jobs.enqueue("cache_image", {"url": "a"}, key="image:a") is None
+
+    jobs.complete(jobs.claim("w1"), "w1")
+    assert jobs.enqueue("cache_image", {"url": "a"}, key="image:a") is not None
+
+
+def test_failed_job_is_retried_after_backoff_then_given_up(db):
+    jobs.enqueue("score_batch", {"articles": []}, max_attempts=2)
+
+    job = jobs.claim("w1")
+    assert jobs.fail(job, "w1", "boom") is True
+    assert jobs.claim("w1") is None
+
+    with jobs.transaction() as conn:
+        conn.execute("UPDATE jobs SET available_at = 0")
+    job = jobs.claim("w1")
+    assert job.attempts == 2
+    assert jobs.fail(job, "w1", "boom again") is False
+    assert jobs.stats() == {"score_batch": {"failed": 1}}
+
+
+def test_expired_lease_is_handed_to_another_worker(db):
+    jobs.enqueue("fetch_article", {"url": "a"})
+    first = jobs.claim("w1", lease_seconds=0.05)
+    assert jobs.claim("w2") is None
+
+    time.sleep(0.1)
+    second = jobs.claim("w2")
+    assert second.id == first.id and second.attempts == 2
+    # The first worker lost its lease: its outcome is not recorded
+    assert jobs.complete(first, "w1") is False
+    assert jobs.complete(second, "w2") is True
+
+
+def test_lease_expiring_on_final_attempt_marks_job_failed(db):
+    jobs.enqueue("fetch_article", {"url": "a"}, max_attempts=1)
+    jobs.claim("w1", lease_seconds=0.05)
+
+    time.sleep(0.1)
+    assert jobs.claim("w2") is None
+    assert jobs.stats() == {"fetch_article": {"failed": 1}}
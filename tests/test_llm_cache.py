@@ -0,0 +1,40 @@
+import pytest
+
+import database
+import llm_cache
+
+
+@pytest.fixture
+def cache_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", True)
+    path = str(tmp_path / "llm_cache.db")
+    yield path
+    database.get_pool(path).close()
+
+
+def test_round_trip_reuses_pooled_connections(cache_path, monkeypatch):
+    opened = []
+    open_connection = database.ConnectionPool._open
+
+    def counting_open(pool):
+        opened.append(pool.db_path)
+        return open_connection(pool)
+
+    monkeypatch.setattr(database.ConnectionPool, "_open", counting_open)
+    key = llm_cache.make_key("model", "v1", "kernel release")
+
+    assert llm_cache.get(key, cache_path) is None
+    llm_cache.put(key, "A kernel was released.", cache_path)
+    for _ in range(20):
+        assert llm_cache.get(key, cache_path) == "A kernel was released."
+    assert opened == [cache_path]
+
+
+def test_evict_drops_least_recently_used_above_cap(cache_path):
+    for name in ("a", "b", "c"):
+        llm_cache.put(name, "x" * 100, cache_path)
+    llm_cache.get("a", cache_path)
+
+    assert llm_cache.evict(cache_path, max_bytes=200) == 1
+    assert llm_cache.get("b", cache_path) is None
+    assert llm_cache.get("a", cache_path) and llm_cache.get("c", cache_path)
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+import database
+
+
+def _state():
+    with database.get_connection() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(articles)")}
+    return version, columns
+
+
+@pytest.fixture
+def empty_db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(database, "DB_NEWS", str(tmp_path / "news.db"))
+    yield
+    database.get_pool().close()
+
+
+def test_create_database_applies_every_migration(empty_db, capsys):
+    database.create_database()
+    # Nothing was moved into article_content, so there is nothing to compact
+    assert "Compacting" not in capsys.readouterr().out
+    version, columns = _state()
+    assert version == database.MIGRATIONS[-1][0]
+    assert {"duplicate_of", "published_at", "updated_at"} <= columns
+    # Already current: a second call is a no-op
+    database.create_database()
+
+
+def test_failed_migration_is_rolled_back_and_can_be_rerun(empty_db, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("boom")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(database, "index_titles", fail)
+        with pytest.raises(RuntimeError):
+            database.create_database()
+
+    version, columns = _state()
+    assert version == 7
+    assert "duplicate_of" not in columns and "content_simhash" not in columns
+
+    database.create_database()
+    version, columns = _state()
+    assert version == database.MIGRATIONS[-1][0]
+    assert "duplicate_of" in columns
+
+
+def test_half_applied_migration_can_be_rerun(empty_db):
+    # A database left behind by a migration that failed half way, before
+    # migrations ran in one transaction
+    migrations = database.MIGRATIONS
+    with database.transaction() as conn:
+        for version, migrate in migrations[:7]:
+            migrate(conn.cursor())
+        conn.execute("ALTER TABLE articles ADD COLUMN duplicate_of INTEGER")
+        conn.execute("PRAGMA user_version = 7")
+
+    database.create_database()
+    assert _state()[0] == migrations[-1][0]
+
+
+def test_content_migration_vacuums_the_file(empty_db, capsys):
+    with database.transaction() as conn:
+        for version, migrate in database.MIGRATIONS[:5]:
+            migrate(conn.cursor())
+        conn.execute("PRAGMA user_version = 5")
+        conn.executemany(
+            "INSERT INTO articles (title, url, content) VALUES (?, ?, ?)",
+            [(f"Story {i}", f"https://example.com/{i}", "kernel news " * 2000) for i in range(50)],
+        )
+    database.get_pool().close()
+    size_before = os.path.getsize(database.DB_NEWS)
+
+    database.create_database()
+    database.get_pool().close()
+    assert "Compacting" in capsys.readouterr().out
+    assert _state()[0] == database.MIGRATIONS[-1][0]
+    assert os.path.getsize(database.DB_NEWS) < size_before / 2
@@ -0,0 +1,27 @@
+import pytest
+
+from bench_parsing import DEFAULT_CORPUS, baseline_differences, load_corpus, truncate
+from config import ARTICLE_END_MARKER
+from scraper import extract_article_page
+
+PAGES = load_corpus(DEFAULT_CORPUS)
+
+
+def test_corpus_covers_both_sources():
+    hosts = {url.split("/")[2] for url, _ in PAGES}
+    assert hosts == {"techcrunch.com", "www.wired.com"}
+
+
+@pytest.mark.parametrize("url,html", PAGES, ids=[url for url, _ in PAGES])
+def test_extraction_matches_baseline(url, html):
+    full = extract_article_page(html, url, selective=False)
+    assert full["content"] and full["category"] and full["image_url"]
+    assert baseline_differences(html, url, full) == []
+    assert extract_article_page(html, url, selective=True) == full
+
+
+@pytest.mark.parametrize("url,html", PAGES, ids=[url for url, _ in PAGES])
+def test_stop_marker_keeps_everything_extracted(url, html):
+    truncated = truncate(html, url, ARTICLE_END_MARKER)
+    assert truncated is not None and len(truncated) < len(html)
+    assert extract_article_page(truncated, url) == extract_article_page(html, url)
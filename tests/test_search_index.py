@@ -0,0 +1,84 @@
+import sqlite3
+
+import database
+
+
+def _publish(title, body):
+    url = f"https://example.com/{title.replace(' ', '-')}"
+    database.save_to_db(
+        [{"title": title, "url": url, "source": "fixture", "relevance": 9, "category": "AI"}],
+        fetch_pages=False,
+    )
+    with database.get_connection() as conn:
+        article_id = conn.execute("SELECT id FROM articles WHERE url = ?", (url,)).fetchone()[0]
+    database.write_summary_batch([(article_id, body)], [(article_id, f"All about {title}.")])
+    return article_id
+
+
+def _search(conn, query):
+    return [
+        row[0]
+        for row in conn.execute(
+            "SELECT rowid FROM articles_fts WHERE articles_fts MATCH ? ORDER BY rowid", (query,)
+        )
+    ]
+
+
+def test_bodies_are_searchable(db):
+    first = _publish("kernel release", "The scheduler is written in rust.")
+    second = _publish("quantum chips", "Logical qubits outlive physical ones.")
+    with database.get_connection() as conn:
+        assert _search(conn, "rust") == [first]
+        assert _search(conn, "qubits") == [second]
+
+
+def test_plain_sqlite_client_can_update_and_delete(db):
+    first = _publish("kernel release", "The scheduler is written in rust.")
+    second = _publish("quantum chips", "Logical qubits outlive physical ones.")
+
+    # No decompress_text() registered on this connection
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("UPDATE articles SET title = 'compiler release' WHERE id = ?", (first,))
+        conn.execute("UPDATE article_content SET raw_size = raw_size WHERE article_id = ?", (first,))
+        conn.execute("DELETE FROM article_search_text WHERE article_id = ?", (second,))
+        conn.execute("DELETE FROM articles WHERE id = ?", (second,))
+    assert _search(conn, "title: compiler") == [first]
+    assert _search(conn, "title: kernel") == []
+    assert _search(conn, "qubits") == []
+    # Raises if the index no longer matches the rows it was built from
+    conn.execute("INSERT INTO articles_fts (articles_fts, rank) VALUES ('integrity-check', 1)")
+    conn.close()
+
+
+def test_marking_a_duplicate_removes_it_from_the_index(db):
+    first = _publish("kernel release", "The scheduler is written in rust.")
+    second = _publish("kernel release again", "The scheduler is written in rust too.")
+    database.write_summary_batch([], [], duplicates=[(second, first)])
+    with database.get_connection() as conn:
+        assert _search(conn, "rust") == [first]
+
+
+def test_upgrade_copies_published_bodies(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(database, "DB_NEWS", str(tmp_path / "news.db"))
+    with monkeypatch.context() as patch:
+        patch.setattr(database, "MIGRATIONS", database.MIGRATIONS[:13])
+        database.create_database()
+    with database.transaction() as conn:
+        conn.execute(
+            "INSERT INTO articles (id, title, url, summary) "
+            "VALUES (1, 'kernel release', 'https://example.com/1', 'Summary.')"
+        )
+        conn.execute(
+            "INSERT INTO article_content (article_id, content, raw_size) VALUES (1, ?, 10)",
+            (database.compress_text("The scheduler is written in rust."),),
+        )
+
+    database.create_database()
+    database.get_pool().close()
+    conn = sqlite3.connect(database.DB_NEWS)
+    assert _search(conn, "rust") == [1]
+    conn.execute("DELETE FROM articles WHERE id = 1")
+    assert _search(conn, "kernel") == []
+    conn.close()
@@ -0,0 +1,66 @@
+import database
+
+
+def _store(title, url, relevance=8):
+    return database.save_to_db(
+        [{"title": title, "url": url, "source": "fixture", "relevance": relevance}],
+        fetch_pages=False,
+    )[0]
+
+
+def test_reworded_recent_headline_is_a_duplicate(db):
+    original = _store("OpenAI launches new reasoning model for developers", "https://a.com/1")
+    found = database.find_duplicate_titles(
+        {"https://b.com/1": "OpenAI launches new reasoning model for developers!"}
+    )
+    assert found == {"https://b.com/1": original}
+
+
+def test_headlines_with_different_numbers_are_new_stories(db):
+    _store("Apple releases iOS 18.1 with Apple Intelligence", "https://a.com/1")
+    _store("Linux 6.11 released", "https://a.com/2")
+    assert database.find_duplicate_titles({
+        "https://b.com/1": "Apple releases iOS 18.2 with Apple Intelligence",
+        "https://b.com/2": "Linux 6.12 released",
+    }) == {}
+
+
+def test_old_stored_headline_is_not_matched(db):
+    article_id = _store("OpenAI launches new reasoning model for developers", "https://a.com/1")
+    with database.transaction() as conn:
+        conn.execute(
+            "UPDATE articles SET created_at = datetime('now', '-30 days') WHERE id = ?",
+            (article_id,),
+        )
+    assert database.find_duplicate_titles(
+        {"https://b.com/1": "OpenAI launches new reasoning model for developers!"}
+    ) == {}
+
+
+def test_duplicates_are_stored_pointing_at_their_original(db):
+    stored = _store("OpenAI launches new reasoning model for developers", "https://a.com/1", 9)
+    titles = {
+        "https://b.com/1": "OpenAI launches new reasoning model for developers!",
+        "https://b.com/2": "Rust 2.0 roadmap published by the core team",
+        "https://c.com/2": "Rust 2.0 roadmap published by the core team today",
+        "https://c.com/3": "Kernel maintainers discuss a new scheduler",
+    }
+    duplicates = database.find_duplicate_titles(titles)
+    assert duplicates == {"https://b.com/1": stored, "https://c.com/2": "https://b.com/2"}
+
+    # The batch original is scored and saved first; a duplicate whose
+    # original was never saved is left for a later run
+    batch_original = _store(titles["https://b.com/2"], "https://b.com/2", 6)
+    articles = [
+        {"title": titles[url], "url": url, "source": "fixture", "duplicate_of": original}
+        for url, original in duplicates.items()
+    ] + [{"title": "Unscored copy", "url": "https://d.com/1", "duplicate_of": "https://x.com/"}]
+    assert database.save_title_duplicates(articles) == 2
+
+    with database.get_connection() as conn:
+        rows = conn.execute(
+            "SELECT url, duplicate_of, relevance_score FROM articles WHERE duplicate_of IS NOT NULL"
+        ).fetchall()
+    assert sorted(rows) == [("https://b.com/1", stored, 9), ("https://c.com/2", batch_original, 6)]
+    pending = {row[2] for row in database.retrieve_relevant_articles(5)}
+    assert pending == {"https://a.com/1", "https://b.com/2"}
@@ -0,0 +1,94 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import ai_analyzer
+import database
+import jobs
+import llm_cache
+import worker
+
+
+@pytest.fixture
+def model(db, tmp_path, monkeypatch):
+    """Fake scoring model; ``model.omit`` lists positional ids it leaves out."""
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_DB", str(tmp_path / "llm_cache.db"))
+    fake = SimpleNamespace(calls=0, omit=set())
+
+    def create_completion(client=None, **kwargs):
+        fake.calls += 1
+        titles = json.loads(kwargs["messages"][0]["content"].split("Articles:\n", 1)[1])
+        answer = {"articles": [
+            {"id": item["id"], "relevance": 7} for item in titles if item["id"] not in fake.omit
+        ]}
+        message = SimpleNamespace(content=json.dumps(answer))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    monkeypatch.setattr(ai_analyzer, "_create_completion", create_completion)
+    yield fake
+    database.get_pool(llm_cache.LLM_CACHE_DB).close()
+
+
+def _articles(count):
+    return [
+        {"title": f"Kernel story {i}", "url": f"https://example.com/{i}", "source": "fixture",
+         "category": "AI", "image_url": f"https://example.com/{i}.png"}
+        for i in range(count)
+    ]
+
+
+def _saved_urls():
+    with database.get_connection() as conn:
+        return {row[0] for row in conn.execute("SELECT url FROM articles")}
+
+
+def test_unscored_headlines_are_requeued_and_scored_ones_saved(model):
+    model.omit = {"2"}
+    worker.score_batch({"articles": _articles(3)})
+
+    assert _saved_urls() == {"https://example.com/0", "https://example.com/2"}
+    # Requeued with a delay, like a failed job
+    assert jobs.claim("w1", kinds=["score_batch"]) is None
+    with jobs.transaction() as conn:
+        conn.execute("UPDATE jobs SET available_at = 0 WHERE kind = 'score_batch'")
+    retry = jobs.claim("w1", kinds=["score_batch"])
+    assert [a["url"] for a in retry.payload["articles"]] == ["https://example.com/1"]
+
+    # The incomplete answer was not cached, so the retry asks the model again
+    model.omit = set()
+    worker.score_batch(retry.payload)
+    assert model.calls == 2
+    assert len(_saved_urls()) == 3
+
+
+def test_batch_with_nothing_scored_fails(model):
+    model.omit = {"1"}
+    with pytest.raises(RuntimeError):
+        worker.score_batch({"articles": _articles(1)})
+    assert _saved_urls() == set()
+
+
+def test_complete_answers_are_cached(model):
+    worker.score_batch({"articles": _articles(2)})
+    with database.transaction() as conn:
+        conn.execute("DELETE FROM articles")
+
+    worker.score_batch({"articles": _articles(2)})
+    assert model.calls == 1
+    assert len(_saved_urls()) == 2
+
+
+def test_duplicate_headlines_are_saved_after_their_original(model):
+    articles = _articles(2)
+    duplicate = {**articles[0], "title": "Kernel story 0!", "url": "https://example.org/0",
+                 "duplicate_of": articles[0]["url"]}
+    worker.score_batch({"articles": articles, "duplicates": [duplicate]})
+
+    with database.get_connection() as conn:
+        row = conn.execute(
+            "SELECT d.relevance_score, o.url FROM articles d JOIN articles o ON o.id = d.duplicate_of"
+        ).fetchone()
+    assert row == (7.0, articles[0]["url"])
+    assert model.calls == 1
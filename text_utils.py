@@ -0,0 +1,12 @@
+"""Small text helpers shared by the pipeline and the web server."""
+
+import re
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def first_sentence(summary):
+    text = (summary or "").strip()
+    if not text:
+        return ""
+    return _SENTENCE_END.split(text, maxsplit=1)[0]
@@ -0,0 +1,337 @@
+"""Queue worker: runs pipeline stages as jobs from jobs.py.
+
+Usage:
+    python worker.py [--processes 4] [--threads 1] [--kinds score_batch,...] [--once]
+
+Each stage of main.main() is its own job kind, and each job enqueues the
+next stage for the articles it produced:
+
+    scrape_source      one source's feed or front page -> score_batch jobs
+    score_batch        score up to SCORE_BATCH_SIZE headlines, save them
+                       -> fetch_article / summarise_article jobs
+    fetch_article      download one article page for category, image and
+                       body -> summarise_article if relevant
+    summarise_article  summarise one relevant article and publish it
+                       -> cache_image
+    cache_image        store the published article's image thumbnail
+
+A failing job is retried with backoff (see jobs.py) without holding up the
+others, and a worker that dies only loses its current job's lease. Several
+worker processes (and threads within each) drain the queue in parallel;
+scheduler.py enqueues scrape_source jobs on each source's interval.
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from config import (
+    DEFAULT_RELEVANCE_THRESHOLD,
+    INCREMENTAL_MODE,
+    URL_REFRESH_TTL_HOURS,
+    DEDUPE_ENABLED,
+    SCORE_BATCH_SIZE,
+    JOB_POLL_SECONDS,
+    JOB_PRIORITIES,
+    JOB_RETRY_BASE,
+    IMAGE_CACHE_ENABLED,
+)
+from database import (
+    create_database,
+    save_to_db,
+    save_title_duplicates,
+    fetch_known_urls,
+    find_duplicate_titles,
+    retrieve_relevant_articles,
+    retrieve_feed_images,
+)
+import jobs
+import metrics
+
+
+def _is_relevant(article):
+    relevance = article.get("relevance")
+    return relevance is not None and relevance >= DEFAULT_RELEVANCE_THRESHOLD
+
+
+def _enqueue_summaries(articles):
+    jobs.enqueue_many(
+        "summarise_article",
+        (
+            (
+                {"url": article["url"]},
+                f"summarise:{article['url']}",
+                JOB_PRIORITIES["summarise_article"] + int(article["relevance"]),
+            )
+            for article in articles
+        ),
+    )
+
+
+def scrape_source(payload):
+    """Scrape one source and queue its new headlines for scoring."""
+    from scraper import scrape_articles
+    from sources import get_source
+
+    source = get_source(payload["source"])
+    if source is None:
+        raise ValueError(f"unknown source {payload['source']!r}")
+    articles_data = scrape_articles([source])
+
+    # Same selection as main._run_pipeline: skip fresh known URLs, reuse
+    # stored scores, and leave near-duplicate headlines out of scoring
+    titles_by_url = {info["url"]: title for title, info in articles_data.items()}
+    known = fetch_known_urls(titles_by_url, ttl_hours=URL_REFRESH_TTL_HOURS)
+    if INCREMENTAL_MODE:
+        for url, row in known.items():
+            if row["fresh"]:
+                del titles_by_url[url]
+    duplicate_articles = []
+    if DEDUPE_ENABLED:
+        duplicates = find_duplicate_titles(
+            {url: title for url, title in titles_by_url.items() if url not in known}
+        )
+        for url, original in duplicates.items():
+            title = titles_by_url.pop(url)
+            duplicate_articles.append(
+                {**articles_data[title], "title": title, "duplicate_of": original}
+            )
+
+    articles = []
+    for url, title in titles_by_url.items():
+        article = {**articles_data[title], "title": title}
+        if url in known and known[url]["relevance"] is not None:
+            article["relevance"] = known[url]["relevance"]
+        articles.append(article)
+
+    # A duplicate travels with the batch that saves its original
+    payloads = [
+        {"articles": articles[start : start + SCORE_BATCH_SIZE], "duplicates": []}
+        for start in range(0, len(articles), SCORE_BATCH_SIZE)
+    ]
+    if duplicate_articles and not payloads:
+        payloads.append({"articles": [], "duplicates": []})
+    batch_of = {
+        article["url"]: index
+        for index, payload in enumerate(payloads)
+        for article in payload["articles"]
+    }
+    for article in duplicate_articles:
+        payloads[batch_of.get(article["duplicate_of"], 0)]["duplicates"].append(article)
+
+    jobs.enqueue_many("score_batch", ((payload, None, None) for payload in payloads))
+    print(
+        f"{source.name}: {len(articles_data)} headlines, {len(articles)} queued for scoring, "
+        f"{len(duplicate_articles)} near-duplicates"
+    )
+
+
+def score_batch(payload):
+    """Score a batch of headlines, save them and queue their next stage.
+
+    Headlines the model left out are saved by a new score_batch job of
+    their own, so the ones it did score are not held back. A batch in which
+    nothing was scored fails and is retried with backoff. Near-duplicate
+    headlines in the payload are stored pointing at their original.
+    """
+    from ai_analyzer import score_titles
+
+    articles = payload["articles"]
+    duplicates = payload.get("duplicates", [])
+    unscored = {a["url"]: a["title"] for a in articles if a.get("relevance") is None}
+    scores = score_titles(unscored)
+    if unscored and not scores:
+        raise RuntimeError(f"none of {len(unscored)} headlines were scored")
+
+    missing = [a for a in articles if a["url"] in unscored and a["url"] not in scores]
+    if missing:
+        # Incomplete answers are not cached, so the new job asks the model again
+        missing_urls = {a["url"] for a in missing}
+        jobs.enqueue(
+            "score_batch",
+            {
+                "articles": missing,
+                "duplicates": [d for d in duplicates if d["duplicate_of"] in missing_urls],
+            },
+            delay=JOB_RETRY_BASE,
+        )
+        duplicates = [d for d in duplicates if d["duplicate_of"] not in missing_urls]
+        print(f"{len(missing)} of {len(unscored)} headlines were not scored, queued again")
+
+    scored = [
+        {**a, "relevance": a.get("relevance", scores.get(a["url"]))}
+        for a in articles
+        if a["url"] not in unscored or a["url"] in scores
+    ]
+    save_to_db(scored, fetch_pages=False)
+    save_title_duplicates(duplicates)
+
+    # Articles whose feed entry lacked category or image get their page
+    # fetched first; that job queues the summary if the article is relevant
+    needs_page = [a for a in scored if not (a.get("category") and a.get("image_url"))]
+    jobs.enqueue_many(
+        "fetch_article",
+        ((article, f"fetch:{article['url']}", None) for article in needs_page),
+    )
+    fetched = {article["url"] for article in needs_page}
+    _enqueue_summaries(a for a in scored if a["url"] not in fetched and _is_relevant(a))
+
+
+def fetch_article(payload):
+    """Download one article page and store its category, image and body."""
+    from scraper import fetch_article_page
+
+    page = fetch_article_page(payload["url"], payload.get("source"))
+    if not (page["content"] or page["category"] or page["image_url"]):
+        raise RuntimeError(f"nothing could be extracted from {payload['url']}")
+    save_to_db([payload], pages={payload["url"]: page})
+    if _is_relevant(payload):
+        _enqueue_summaries([payload])
+
+
+def summarise_article(payload):
+    """Summarise one article unless it is already summarised or a duplicate."""
+    from content_processor import summarise_and_save
+
+    pending = retrieve_relevant_articles(DEFAULT_RELEVANCE_THRESHOLD, urls=[payload["url"]])
+    if not pending:
+        return
+    done, message = summarise_and_save(pending[0])
+    print(f"{pending[0][1][:50]}... {message}")
+    if not done:
+        raise RuntimeError(message)
+    if IMAGE_CACHE_ENABLED:
+        for _, image_url in retrieve_feed_images([pending[0][0]]):
+            jobs.enqueue("cache_image", {"url": image_url}, key=f"image:{image_url}")
+
+
+def cache_image(payload):
+    """Download a published article's image and store its thumbnail."""
+    from images import cache_image as store_thumbnail
+
+    store_thumbnail(payload["url"])
+
+
+HANDLERS = {
+    "scrape_source": scrape_source,
+    "score_batch": score_batch,
+    "fetch_article": fetch_article,
+    "summarise_article": summarise_article,
+    "cache_image": cache_image,
+}
+
+
+def run_job(job, worker):
+    """Run one claimed job and record its outcome.
+
+    Returns:
+        True if the job succeeded
+    """
+    try:
+        handler = HANDLERS.get(job.kind)
+        if handler is None:
+            raise ValueError(f"no handler for job kind {job.kind!r}")
+        with metrics.stage(f"job_{job.kind}"):
+            handler(job.payload)
+    except Exception as e:
+        retry = jobs.fail(job, worker, f"{type(e).__name__}: {e}")
+        print(
+            f"[{worker}] ✗ {job.kind} #{job.id} attempt {job.attempts}/{job.max_attempts}: "
+            f"{e} ({'will retry' if retry else 'giving up'})"
+        )
+        return False
+    jobs.complete(job, worker)
+    return True
+
+
+def work(worker, kinds=None, once=False, stop=None):
+    """Claim and run jobs until ``stop`` is set.
+
+    Args:
+        worker: Identifier recorded on claimed jobs
+        kinds: Optional iterable of job kinds to handle (default: all)
+        once: Return when no job is running or due, instead of waiting
+        stop: Optional threading.Event that ends the loop after the
+            current job
+
+    Returns:
+        Number of jobs run
+    """
+    stop = stop or threading.Event()
+    processed = 0
+    while not stop.is_set():
+        job = jobs.claim(worker, kinds)
+        if job is None:
+            if once and not jobs.outstanding():
+                break
+            stop.wait(JOB_POLL_SECONDS)
+            continue
+        run_job(job, worker)
+        processed += 1
+    return processed
+
+
+def _run_process(threads, kinds, once):
+    stop = threading.Event()
+    # Finish the current job, then exit
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    pool = [
+        threading.Thread(target=work, args=(f"{name}:{i}", kinds, once, stop))
+        for i in range(max(1, threads))
+    ]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+
+def run(processes=1, threads=1, kinds=None, once=False):
+    """Run queue workers until interrupted (or drained, with ``once``).
+
+    Args:
+        processes: Worker processes; 1 runs in this process
+        threads: Worker threads per process
+        kinds: Optional iterable of job kinds to handle
+        once: Exit when the queue has nothing left to run
+    """
+    create_database()
+    if processes <= 1:
+        _run_process(threads, kinds, once)
+        return
+
+    children = [
+        multiprocessing.Process(target=_run_process, args=(threads, kinds, once))
+        for _ in range(processes)
+    ]
+    for child in children:
+        child.start()
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        # Children got the same SIGINT and stop after their current job
+        for child in children:
+            child.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=1, help="worker threads per process")
+    parser.add_argument("--kinds", help="comma-separated job kinds to handle (default: all)")
+    parser.add_argument("--once", action="store_true", help="exit once the queue is drained")
+    args = parser.parse_args()
+
+    kinds = args.kinds.split(",") if args.kinds else None
+    run(args.processes, args.threads, kinds, args.once)
+    print(jobs.stats())
+
+
+if __name__ == "__main__":
+    main()